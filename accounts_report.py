@@ -1,38 +1,17 @@
 # accounts_report.py - Monthly Accounts Report with Property-wise filtering
 import streamlit as st
-from supabase import create_client, Client
 from datetime import date, datetime
 import calendar
 import pandas as pd
 from typing import List, Dict, Optional
 import logging
+import booking_repository
+from booking_repository import CONFIRMED_STATUSES
+from property_registry import canonical_name
 
 # ────── Logging ──────
 logging.basicConfig(filename="accounts_report.log", level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-# ────── Supabase client ──────
-try:
-    supabase: Client = create_client(st.secrets["supabase"]["url"], st.secrets["supabase"]["key"])
-except KeyError as e:
-    st.error(f"Missing Supabase secret: {e}. Please check Streamlit Cloud secrets configuration.")
-    st.stop()
-
-# ────── Property synonym mapping ──────
-property_mapping = {
-    "La Millionaire Luxury Resort": "La Millionaire Resort",
-    "Le Poshe Beach View": "Le Poshe Beach view",
-    "Le Poshe Beach view": "Le Poshe Beach view",
-    "Le Poshe Beach VIEW": "Le Poshe Beach view",
-    "Le Poshe Beachview": "Le Poshe Beach view",
-    "Millionaire": "La Millionaire Resort",
-    "Le Pondy Beach Side": "Le Pondy Beachside",
-    "Le Teera": "Le Terra"
-}
-
-def normalize_property(name: str) -> str:
-    """Normalize property names using mapping."""
-    return property_mapping.get(name.strip(), name.strip())
-
 def safe_float(v, default: float = 0.0) -> float:
     """Safely convert value to float."""
     try:
@@ -47,6 +26,13 @@ def sanitize_string(v, default: str = "") -> str:
 # ────────────────────────────────────────────────────────────────────────
 # Load bookings with pagination for entire month
 # ────────────────────────────────────────────────────────────────────────
+# Fields read when building account rows (logical names, see booking_repository.SCHEMA)
+ACCOUNT_FIELDS = (
+    "booking_id", "db_id", "property", "guest_name", "check_in", "check_out",
+    "total_amount", "gst", "tax", "commission", "advance", "balance",
+    "status", "payment_status",
+)
+
 def load_all_bookings_for_month(year: int, month: int) -> List[Dict]:
     """Load ALL bookings (both direct and online) for the given month with pagination."""
     try:
@@ -56,123 +42,87 @@ def load_all_bookings_for_month(year: int, month: int) -> List[Dict]:
         
         all_bookings = []
         
-        # ───── Load Direct Reservations with pagination ─────
-        st.info("Loading direct reservations...")
-        page_size = 1000
-        start = 0
+        # ───── Load Direct & Online Reservations (concurrently) ─────
+        st.info("Loading direct and online reservations...")
+        direct_rows, online_rows = booking_repository.fetch_both(
+            booking_repository.fetch_rows, first_day, last_day,
+            statuses=CONFIRMED_STATUSES, fields=ACCOUNT_FIELDS, order="check_in",
+        )
         
-        while True:
-            response = supabase.table("reservations")\
-                .select("*")\
-                .lte("check_in", str(last_day))\
-                .gte("check_out", str(first_day))\
-                .in_("plan_status", ["Confirmed", "Completed"])\
-                .order("check_in", desc=False)\
-                .range(start, start + page_size - 1)\
-                .execute()
-            
-            if not response.data:
-                break
-            
-            for record in response.data:
-                try:
-                    check_in = date.fromisoformat(record["check_in"])
-                    check_out = date.fromisoformat(record["check_out"])
-                    
-                    # Only include bookings that overlap with the selected month
-                    if check_out <= first_day or check_in > last_day:
-                        continue
-                    
-                    booking = {
-                        "type": "direct",
-                        "date": check_in,
-                        "property_name": normalize_property(record.get("property_name", "")),
-                        "guest_name": sanitize_string(record.get("guest_name")),
-                        "booking_id": sanitize_string(record.get("booking_id")),
-                        "total_amount": safe_float(record.get("total_tariff")),
-                        "advance": safe_float(record.get("advance_amount")),
-                        "balance": safe_float(record.get("balance_amount")),
-                        "check_in": str(check_in),
-                        "check_out": str(check_out),
-                        "booking_status": sanitize_string(record.get("plan_status")),
-                        "payment_status": sanitize_string(record.get("payment_status")),
-                    }
-                    
-                    # Calculate pending amount
-                    booking["pending"] = booking["total_amount"] - booking["advance"] - booking["balance"]
-                    
-                    all_bookings.append(booking)
-                except Exception as e:
-                    logging.warning(f"Error processing direct booking: {e}")
+        # ───── Direct Reservations ─────
+        for record in direct_rows:
+            try:
+                check_in = date.fromisoformat(record["check_in"])
+                check_out = date.fromisoformat(record["check_out"])
+                
+                # Only include bookings that overlap with the selected month
+                if check_out <= first_day or check_in > last_day:
                     continue
-            
-            if len(response.data) < page_size:
-                break
-            
-            start += page_size
+                
+                booking = {
+                    "type": "direct",
+                    "date": check_in,
+                    "property_name": canonical_name(record.get("property_name", "")),
+                    "guest_name": sanitize_string(record.get("guest_name")),
+                    "booking_id": sanitize_string(record.get("booking_id")),
+                    "total_amount": safe_float(record.get("total_tariff")),
+                    "advance": safe_float(record.get("advance_amount")),
+                    "balance": safe_float(record.get("balance_amount")),
+                    "check_in": str(check_in),
+                    "check_out": str(check_out),
+                    "booking_status": sanitize_string(record.get("plan_status")),
+                    "payment_status": sanitize_string(record.get("payment_status")),
+                }
+                
+                # Calculate pending amount
+                booking["pending"] = booking["total_amount"] - booking["advance"] - booking["balance"]
+                
+                all_bookings.append(booking)
+            except Exception as e:
+                logging.warning(f"Error processing direct booking: {e}")
+                continue
         
-        # ───── Load Online Reservations with pagination ─────
-        st.info("Loading online reservations...")
-        start = 0
-        
-        while True:
-            response = supabase.table("online_reservations")\
-                .select("*")\
-                .lte("check_in", str(last_day))\
-                .gte("check_out", str(first_day))\
-                .in_("booking_status", ["Confirmed", "Completed"])\
-                .order("check_in", desc=False)\
-                .range(start, start + page_size - 1)\
-                .execute()
-            
-            if not response.data:
-                break
-            
-            for record in response.data:
-                try:
-                    check_in = date.fromisoformat(record["check_in"])
-                    check_out = date.fromisoformat(record["check_out"])
-                    
-                    # Only include bookings that overlap with the selected month
-                    if check_out <= first_day or check_in > last_day:
-                        continue
-                    
-                    # For online bookings, calculate amounts
-                    total_amount = safe_float(record.get("booking_amount"))
-                    gst = safe_float(record.get("gst"))
-                    tax = safe_float(record.get("ota_tax"))
-                    commission = safe_float(record.get("ota_commission"))
-                    
-                    # Hotel receivable = Total - GST - Tax - Commission
-                    receivable = total_amount - gst - tax - commission
-                    
-                    booking = {
-                        "type": "online",
-                        "date": check_in,
-                        "property_name": normalize_property(record.get("property", "")),
-                        "guest_name": sanitize_string(record.get("guest_name")),
-                        "booking_id": sanitize_string(record.get("booking_id") or record.get("id")),
-                        "total_amount": total_amount,  # Use hotel receivable for online bookings
-                        "advance": safe_float(record.get("total_payment_made")),
-                        "balance": safe_float(record.get("balance_due")),
-                        "check_in": str(check_in),
-                        "check_out": str(check_out),
-                        "booking_status": sanitize_string(record.get("booking_status")),
-                        "payment_status": sanitize_string(record.get("payment_status")),
-                    }
-                    
-                    # Calculate pending amount
-                    booking["pending"] = booking["total_amount"] - booking["advance"] - booking["balance"]
-                    
-                    all_bookings.append(booking)
-                except Exception as e:
-                    logging.warning(f"Error processing online booking: {e}")
+        # ───── Online Reservations ─────
+        for record in online_rows:
+            try:
+                check_in = date.fromisoformat(record["check_in"])
+                check_out = date.fromisoformat(record["check_out"])
+                
+                # Only include bookings that overlap with the selected month
+                if check_out <= first_day or check_in > last_day:
                     continue
-            
-            if len(response.data) < page_size:
-                break
-            
-            start += page_size
+                
+                # For online bookings, calculate amounts
+                total_amount = safe_float(record.get("booking_amount"))
+                gst = safe_float(record.get("gst"))
+                tax = safe_float(record.get("ota_tax"))
+                commission = safe_float(record.get("ota_commission"))
+                
+                # Hotel receivable = Total - GST - Tax - Commission
+                receivable = total_amount - gst - tax - commission
+                
+                booking = {
+                    "type": "online",
+                    "date": check_in,
+                    "property_name": canonical_name(record.get("property", "")),
+                    "guest_name": sanitize_string(record.get("guest_name")),
+                    "booking_id": sanitize_string(record.get("booking_id") or record.get("id")),
+                    "total_amount": total_amount,  # Use hotel receivable for online bookings
+                    "advance": safe_float(record.get("total_payment_made")),
+                    "balance": safe_float(record.get("balance_due")),
+                    "check_in": str(check_in),
+                    "check_out": str(check_out),
+                    "booking_status": sanitize_string(record.get("booking_status")),
+                    "payment_status": sanitize_string(record.get("payment_status")),
+                }
+                
+                # Calculate pending amount
+                booking["pending"] = booking["total_amount"] - booking["advance"] - booking["balance"]
+                
+                all_bookings.append(booking)
+            except Exception as e:
+                logging.warning(f"Error processing online booking: {e}")
+                continue
         
         logging.info(f"Loaded {len(all_bookings)} total bookings for {year}-{month:02d}")
         return all_bookings
@@ -1,28 +1,11 @@
 # booking_date_report.py - Property-wise Booking Made Date Report
 import streamlit as st
-from supabase import create_client, Client
 from datetime import date, datetime
 import pandas as pd
 import calendar
+import booking_repository
+from property_registry import group_by_property
 
-# Initialize Supabase client
-try:
-    supabase: Client = create_client(st.secrets["supabase"]["url"], st.secrets["supabase"]["key"])
-except KeyError as e:
-    st.error(f"Missing Supabase secret: {e}. Please check Streamlit Cloud secrets configuration.")
-    st.stop()
-
-# Property synonym mapping
-property_mapping = {
-    "La Millionaire Luxury Resort": "La Millionaire Resort",
-    "Le Poshe Beach View": "Le Poshe Beach view",
-    "Le Poshe Beach view": "Le Poshe Beach view",
-    "Le Poshe Beach VIEW": "Le Poshe Beach view",
-    "Le Poshe Beachview": "Le Poshe Beach view",
-    "Millionaire": "La Millionaire Resort",
-    "Le Pondy Beach Side": "Le Pondy Beachside",
-    "Le Teera": "Le Terra"
-}
 
 # Table CSS with frozen columns till Guest Name
 TABLE_CSS = """
@@ -93,58 +76,6 @@ TABLE_CSS = """
 </style>
 """
 
-def load_direct_reservations_from_supabase():
-    """Load ALL direct reservations without any limits using pagination"""
-    try:
-        all_data = []
-        page_size = 1000
-        offset = 0
-        
-        while True:
-            response = supabase.table("reservations")\
-                .select("*")\
-                .range(offset, offset + page_size - 1)\
-                .execute()
-            
-            if response.data:
-                all_data.extend(response.data)
-                if len(response.data) < page_size:
-                    break
-                offset += page_size
-            else:
-                break
-        
-        return all_data
-    except Exception as e:
-        st.error(f"Error loading direct reservations: {e}")
-        return []
-
-def load_online_reservations_from_supabase():
-    """Load ALL online reservations without any limits using pagination"""
-    try:
-        all_data = []
-        page_size = 1000
-        offset = 0
-        
-        while True:
-            response = supabase.table("online_reservations")\
-                .select("*")\
-                .range(offset, offset + page_size - 1)\
-                .execute()
-            
-            if response.data:
-                all_data.extend(response.data)
-                if len(response.data) < page_size:
-                    break
-                offset += page_size
-            else:
-                break
-        
-        return all_data
-    except Exception as e:
-        st.error(f"Error loading online reservations: {e}")
-        return []
-
 def safe_date_parse(date_str):
     """Robust date parsing"""
     if not date_str:
@@ -224,14 +155,6 @@ def create_bookings_table(bookings):
             df[col] = df[col].apply(lambda x: f'<span title="{x}">{x}</span>' if pd.notna(x) and str(x).strip() else x)
     return df
 
-@st.cache_data(ttl=300)
-def cached_load_online_reservations():
-    return load_online_reservations_from_supabase()
-
-@st.cache_data(ttl=300)
-def cached_load_direct_reservations():
-    return load_direct_reservations_from_supabase()
-
 def show_booking_date_report():
     st.title("Property-wise Booking Made Date Report")
     st.markdown("**This report shows all bookings based on when they were created/booked, not check-in dates.**")
@@ -246,29 +169,18 @@ def show_booking_date_report():
     month = st.selectbox("Select Month", list(range(1, 13)), index=date.today().month - 1)
 
     # Load ALL bookings
-    online_bookings = cached_load_online_reservations()
-    direct_bookings = cached_load_direct_reservations()
+    direct_bookings, online_bookings = booking_repository.fetch_all_reservations(canonical=True, report_errors=True)
 
     st.info(f"Total records loaded: Online={len(online_bookings)}, Direct={len(direct_bookings)}")
 
-    # Normalize property names
-    for b in online_bookings:
-        if "property" in b:
-            b["property"] = property_mapping.get(b["property"], b["property"])
-    for b in direct_bookings:
-        if "property_name" in b:
-            b["property_name"] = property_mapping.get(b["property_name"], b["property_name"])
-
     if not online_bookings and not direct_bookings:
         st.info("No reservations available.")
         return
 
-    # Get all properties
-    online_df = pd.DataFrame(online_bookings)
-    direct_df = pd.DataFrame(direct_bookings)
-    online_props = sorted(online_df["property"].dropna().unique().tolist()) if "property" in online_df.columns else []
-    direct_props = sorted(direct_df["property_name"].dropna().unique().tolist()) if "property_name" in direct_df.columns else []
-    all_properties = sorted(list(set(online_props + direct_props)))
+    # Group by (already canonical) property once instead of rescanning per property
+    online_by_prop = group_by_property(online_bookings, "property")
+    direct_by_prop = group_by_property(direct_bookings, "property_name")
+    all_properties = sorted(set(online_by_prop) | set(direct_by_prop))
 
     if not all_properties:
         st.info("No properties found in reservations.")
@@ -284,8 +196,8 @@ def show_booking_date_report():
     for prop in all_properties:
         with st.expander(f"📍 {prop}", expanded=False):
             # Filter bookings by property
-            prop_online = [b for b in online_bookings if b.get("property") == prop]
-            prop_direct = [b for b in direct_bookings if b.get("property_name") == prop]
+            prop_online = online_by_prop.get(prop, [])
+            prop_direct = direct_by_prop.get(prop, [])
             prop_all = prop_online + prop_direct
 
             property_total = 0
@@ -1,29 +1,12 @@
 # booking_date_report_datewise.py - Date-wise Booking Made Report (All Properties)
 import streamlit as st
-from supabase import create_client, Client
 from datetime import date, datetime
 import pandas as pd
 import calendar
+import booking_repository
+import report_cache
 from io import BytesIO
 
-# Initialize Supabase client
-try:
-    supabase: Client = create_client(st.secrets["supabase"]["url"], st.secrets["supabase"]["key"])
-except KeyError as e:
-    st.error(f"Missing Supabase secret: {e}. Please check Streamlit Cloud secrets configuration.")
-    st.stop()
-
-# Property synonym mapping
-property_mapping = {
-    "La Millionaire Luxury Resort": "La Millionaire Resort",
-    "Le Poshe Beach View": "Le Poshe Beach view",
-    "Le Poshe Beach view": "Le Poshe Beach view",
-    "Le Poshe Beach VIEW": "Le Poshe Beach view",
-    "Le Poshe Beachview": "Le Poshe Beach view",
-    "Millionaire": "La Millionaire Resort",
-    "Le Pondy Beach Side": "Le Pondy Beachside",
-    "Le Teera": "Le Terra"
-}
 
 # Table CSS with frozen columns till Guest Name and DataTables integration
 TABLE_CSS = """
@@ -124,58 +107,6 @@ TABLE_CSS = """
 <link rel="stylesheet" type="text/css" href="https://cdn.datatables.net/buttons/2.2.2/css/buttons.dataTables.min.css">
 """
 
-def load_direct_reservations_from_supabase():
-    """Load ALL direct reservations without any limits using pagination"""
-    try:
-        all_data = []
-        page_size = 1000
-        offset = 0
-        
-        while True:
-            response = supabase.table("reservations")\
-                .select("*")\
-                .range(offset, offset + page_size - 1)\
-                .execute()
-            
-            if response.data:
-                all_data.extend(response.data)
-                if len(response.data) < page_size:
-                    break
-                offset += page_size
-            else:
-                break
-        
-        return all_data
-    except Exception as e:
-        st.error(f"Error loading direct reservations: {e}")
-        return []
-
-def load_online_reservations_from_supabase():
-    """Load ALL online reservations without any limits using pagination"""
-    try:
-        all_data = []
-        page_size = 1000
-        offset = 0
-        
-        while True:
-            response = supabase.table("online_reservations")\
-                .select("*")\
-                .range(offset, offset + page_size - 1)\
-                .execute()
-            
-            if response.data:
-                all_data.extend(response.data)
-                if len(response.data) < page_size:
-                    break
-                offset += page_size
-            else:
-                break
-        
-        return all_data
-    except Exception as e:
-        st.error(f"Error loading online reservations: {e}")
-        return []
-
 def safe_date_parse(date_str):
     """Robust date parsing"""
     if not date_str:
@@ -384,19 +315,14 @@ def create_bookings_table(bookings, table_id):
     return ''.join(html_parts)
 
 def convert_df_to_excel(df):
-    """Convert DataFrame to Excel file"""
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='Bookings')
-    return output.getvalue()
-
-@st.cache_data(ttl=300)
-def cached_load_online_reservations():
-    return load_online_reservations_from_supabase()
-
-@st.cache_data(ttl=300)
-def cached_load_direct_reservations():
-    return load_direct_reservations_from_supabase()
+    """Convert DataFrame to Excel file (served from the report cache while the table is unchanged)"""
+    def build():
+        output = BytesIO()
+        with pd.ExcelWriter(output, engine='openpyxl') as writer:
+            df.to_excel(writer, index=False, sheet_name='Bookings')
+        return output.getvalue()
+    # The table already reflects the month and filters, so its digest is the whole key
+    return report_cache.cached_artifact("booking_datewise", (), "", report_cache.frame_version(df), build)
 
 def show_datewise_booking_report():
     """Main function to display the date-wise booking report"""
@@ -404,9 +330,8 @@ def show_datewise_booking_report():
     st.markdown("**This report shows all bookings across all properties based on when they were created/booked.**")
 
     if st.button("Refresh Bookings"):
-        # Clear only the specific cached functions instead of all cache
-        cached_load_online_reservations.clear()
-        cached_load_direct_reservations.clear()
+        # Clear only the booking reads instead of all cache
+        booking_repository.clear_cache()
         st.success("Cache cleared! Refreshing bookings...")
         st.rerun()
 
@@ -421,19 +346,10 @@ def show_datewise_booking_report():
         month = st.selectbox("Select Month", list(range(1, 13)), index=date.today().month - 1)
 
     # Load ALL bookings
-    online_bookings = cached_load_online_reservations()
-    direct_bookings = cached_load_direct_reservations()
+    direct_bookings, online_bookings = booking_repository.fetch_all_reservations(canonical=True, report_errors=True)
 
     st.info(f"Total records loaded: Online={len(online_bookings)}, Direct={len(direct_bookings)}")
 
-    # Normalize property names
-    for b in online_bookings:
-        if "property" in b:
-            b["property"] = property_mapping.get(b["property"], b["property"])
-    for b in direct_bookings:
-        if "property_name" in b:
-            b["property_name"] = property_mapping.get(b["property_name"], b["property_name"])
-
     if not online_bookings and not direct_bookings:
         st.info("No reservations available.")
         return
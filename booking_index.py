@@ -0,0 +1,92 @@
+"""
+booking_index.py - Interval index over loaded bookings
+
+Reports ask the same question for every day of a month: which bookings are
+in-house on day D (check_in <= D < check_out)? Scanning the whole list and
+re-parsing both dates per booking per day makes a month render cost
+days x bookings. BookingIndex parses each booking's dates once and keeps the
+stays sorted by check-in ordinal, so each lookup is a binary search plus the
+bookings actually returned.
+"""
+
+from bisect import bisect_left, bisect_right
+from datetime import date
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Stays longer than this many nights are kept in a separate list that every
+# lookup scans; shorter stays are found by binary search on check-in.
+LONG_STAY_NIGHTS = 31
+
+
+def _parse_iso(value) -> date:
+    return date.fromisoformat(value)
+
+
+class BookingIndex:
+    """
+    Bookings indexed by stay interval [check_in, check_out).
+
+    Lookups return the original booking dicts (not copies) in the order they
+    were given. Bookings whose dates `parse` maps to None are left out.
+    """
+
+    def __init__(self, bookings: Iterable[Dict] = (),
+                 parse: Callable[[object], Optional[date]] = _parse_iso):
+        self._bookings: List[Dict] = []
+        short: List[Tuple[int, int, int]] = []
+        self._long: List[Tuple[int, int, int]] = []
+
+        for booking in bookings:
+            start = getattr(booking, "check_in_ordinal", None)
+            if start is not None:
+                # booking_records.BookingRecord: dates already parsed
+                end = booking.check_out_ordinal
+            else:
+                check_in = parse(booking.get("check_in"))
+                check_out = parse(booking.get("check_out"))
+                if check_in is None or check_out is None:
+                    continue
+                start, end = check_in.toordinal(), check_out.toordinal()
+            position = len(self._bookings)
+            self._bookings.append(booking)
+            stay = (start, end, position)
+            if stay[1] - stay[0] > LONG_STAY_NIGHTS:
+                self._long.append(stay)
+            else:
+                short.append(stay)
+
+        short.sort()
+        self._starts = [stay[0] for stay in short]
+        self._short = short
+
+    def __len__(self) -> int:
+        return len(self._bookings)
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(self._bookings)
+
+    def _overlapping(self, start: int, end: int) -> List[Dict]:
+        """Bookings whose stay overlaps the ordinal range [start, end)."""
+        # A short stay overlapping the range checked in after start - LONG_STAY_NIGHTS
+        lo = bisect_right(self._starts, start - LONG_STAY_NIGHTS)
+        hi = bisect_left(self._starts, end)
+        positions = [pos for _, check_out, pos in self._short[lo:hi] if check_out > start]
+        positions.extend(pos for check_in, check_out, pos in self._long
+                         if check_in < end and check_out > start)
+        positions.sort()
+        return [self._bookings[pos] for pos in positions]
+
+    def active_on(self, day: date) -> List[Dict]:
+        """Bookings in-house on `day`: check_in <= day < check_out."""
+        ordinal = day.toordinal()
+        return self._overlapping(ordinal, ordinal + 1)
+
+    def active_between(self, start: date, end: date) -> List[Dict]:
+        """Bookings in-house on at least one day of [start, end)."""
+        return self._overlapping(start.toordinal(), end.toordinal())
+
+
+def index_by_property(bookings: Dict[str, List[Dict]],
+                      parse: Callable[[object], Optional[date]] = _parse_iso) -> Dict[str, BookingIndex]:
+    """Build one BookingIndex per property of a {property: bookings} mapping."""
+    return {prop: BookingIndex(rows, parse) for prop, rows in bookings.items()}
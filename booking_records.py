@@ -0,0 +1,137 @@
+"""
+booking_records.py - Compact normalized bookings and per-room allocations
+
+inventory.normalize_booking and nrd_report.normalize_booking used to return
+a ~35-key dict per booking, and every day a booking was in-house the room
+assignment copied that dict once per room. A month export therefore built
+hundreds of thousands of short-lived dicts.
+
+BookingRecord keeps the same fields in __slots__ (no per-instance dict) plus
+the stay dates as ordinals, and RoomAllocation is a five-slot view of one
+assigned room that reads everything else from its parent booking. Both are
+read-only Mappings, so report code keeps using b["guest_name"] / b.get(...)
+and pandas / dict() accept them unchanged.
+"""
+
+from collections.abc import Mapping
+from datetime import date
+from typing import Any, Iterator, List
+
+# Fields of a normalized booking, in the order the old dicts listed them
+BOOKING_RECORD_FIELDS = (
+    "type", "property", "booking_id", "guest_name", "mobile_no", "total_pax",
+    "check_in", "check_out", "days", "room_no", "mob", "plan",
+    "room_charges", "gst", "tax", "total_amount", "commission", "receivable",
+    "advance", "advance_mop", "balance", "balance_mop",
+    "booking_status", "payment_status", "submitted_by", "modified_by", "remarks",
+    "advance_remarks", "balance_remarks", "accounts_status", "ota_booking_id", "db_id",
+)
+
+# Keys a RoomAllocation adds to (or overrides on) its booking
+ALLOCATION_FIELDS = ("assigned_room", "room_no", "total_pax", "per_night", "is_primary")
+
+
+class BookingRecord(Mapping):
+    """
+    One normalized booking.
+
+    Fields a normalizer does not set are simply absent, as they were from
+    the dict. check_in / check_out stay ISO strings for display;
+    check_in_ordinal / check_out_ordinal are the parsed dates.
+    """
+
+    __slots__ = BOOKING_RECORD_FIELDS + ("check_in_ordinal", "check_out_ordinal")
+
+    def __init__(self, check_in: date, check_out: date, **fields: Any):
+        set_field = object.__setattr__
+        set_field(self, "check_in", check_in.isoformat())
+        set_field(self, "check_out", check_out.isoformat())
+        set_field(self, "check_in_ordinal", check_in.toordinal())
+        set_field(self, "check_out_ordinal", check_out.toordinal())
+        for name, value in fields.items():
+            set_field(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("BookingRecord is read-only")
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in BOOKING_RECORD_FIELDS:
+            raise KeyError(key)
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __iter__(self) -> Iterator[str]:
+        return (name for name in BOOKING_RECORD_FIELDS if hasattr(self, name))
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"BookingRecord({dict(self)!r})"
+
+    def __reduce__(self):
+        fields = {k: v for k, v in self.items() if k not in ("check_in", "check_out")}
+        return (_restore_record, (self.check_in_ordinal, self.check_out_ordinal, fields))
+
+
+def _restore_record(check_in: int, check_out: int, fields: dict) -> BookingRecord:
+    return BookingRecord(date.fromordinal(check_in), date.fromordinal(check_out), **fields)
+
+
+class RoomAllocation(Mapping):
+    """
+    One room of a booking on the days it is assigned.
+
+    Reads ALLOCATION_FIELDS from itself and every other key from `booking`
+    (a BookingRecord or a plain dict), so it equals the copy-and-override
+    dict the allocators used to build without copying the booking.
+    """
+
+    __slots__ = ("booking", "assigned_room", "total_pax", "per_night", "is_primary")
+
+    def __init__(self, booking: Mapping, room: str, total_pax: int, per_night: float, is_primary: bool):
+        self.booking = booking
+        self.assigned_room = room
+        self.total_pax = total_pax
+        self.per_night = per_night
+        self.is_primary = is_primary
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "room_no":
+            return self.assigned_room
+        if key in ALLOCATION_FIELDS:
+            return getattr(self, key)
+        return self.booking[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self.booking
+        for key in ALLOCATION_FIELDS:
+            if key not in self.booking:
+                yield key
+
+    def __len__(self) -> int:
+        return len(self.booking) + sum(1 for key in ALLOCATION_FIELDS if key not in self.booking)
+
+    def __repr__(self) -> str:
+        return f"RoomAllocation({self.booking.get('booking_id')!r}, {self.assigned_room!r})"
+
+
+def room_allocations(booking: Mapping, rooms: List[str]) -> List[RoomAllocation]:
+    """
+    One allocation per assigned room: pax split as evenly as possible (extra
+    guests on the first rooms), receivable spread over days x rooms, and the
+    first room marked primary.
+    """
+    days = max(booking.get("days", 1), 1)
+    receivable = booking.get("receivable", 0.0)
+    num_rooms = len(rooms)
+    total_nights = days * num_rooms
+    per_night = receivable / total_nights if total_nights > 0 else 0.0
+    base_pax = booking["total_pax"] // num_rooms if num_rooms else 0
+    rem = booking["total_pax"] % num_rooms if num_rooms else 0
+    return [
+        RoomAllocation(booking, room, base_pax + (1 if idx < rem else 0), per_night, idx == 0)
+        for idx, room in enumerate(rooms)
+    ]
@@ -0,0 +1,447 @@
+"""
+booking_repository.py - Shared read access to the reservation tables
+
+Every page that reports on bookings reads `reservations` (direct) and
+`online_reservations` (OTA) through this module.  Results are held in one
+process-wide cache keyed by (table, date window, filters), so moving between
+the Daily Status, NRD, Summary and Target pages reuses rows that were already
+fetched instead of downloading the same month again.
+"""
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from supabase import create_client, Client
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import logging
+import os
+import threading
+import property_registry
+import utils
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+DIRECT_TABLE = "reservations"
+ONLINE_TABLE = "online_reservations"
+
+# PostgREST returns at most this many rows per request
+PAGE_SIZE = utils.PAGE_SIZE
+
+# Seconds a cached read stays valid
+CACHE_TTL = 600
+
+# Upper bound on concurrent requests issued by one repository call
+MAX_WORKERS = 4
+
+# Concurrent page requests per paginated read
+PAGE_WORKERS = 4
+
+# Unique key appended to every paginated read's ordering, so page ranges
+# fetched in parallel neither overlap nor skip rows
+DEFAULT_ORDER = {
+    DIRECT_TABLE: "booking_id",
+    ONLINE_TABLE: "id",
+}
+
+# Physical column behind each logical booking field, per table.  Fields not
+# listed have the same column name in both tables; None means the table has
+# no such column and it is left out of the projection.
+SCHEMA = {
+    DIRECT_TABLE: {
+        "property": "property_name",
+        "status": "plan_status",
+        "db_id": "booking_id",
+        "mobile_no": "mobile_no",
+        "days": "no_of_days",
+        "total_amount": "total_tariff",
+        "gst": None,
+        "tax": None,
+        "commission": None,
+        "mob": "mob",
+        "plan": "breakfast",
+        "advance": "advance_amount",
+        "balance": "balance_amount",
+        "ota_booking_id": None,
+    },
+    ONLINE_TABLE: {
+        "property": "property",
+        "status": "booking_status",
+        "db_id": "id",
+        "mobile_no": "guest_phone",
+        "days": "room_nights",
+        "total_amount": "booking_amount",
+        "gst": "gst",
+        "tax": "ota_tax",
+        "commission": "ota_commission",
+        "mob": "mode_of_booking",
+        "plan": "rate_plans",
+        "advance": "total_payment_made",
+        "balance": "balance_due",
+        "ota_booking_id": "ota_booking_id",
+    },
+}
+
+# Fields read by inventory/nrd normalize_booking
+BOOKING_FIELDS = (
+    "booking_id", "db_id", "property", "status", "payment_status",
+    "check_in", "check_out", "days", "guest_name", "mobile_no", "total_pax",
+    "room_no", "mob", "plan", "total_amount", "gst", "tax", "commission",
+    "advance", "advance_mop", "balance", "balance_mop", "submitted_by",
+    "modified_by", "remarks", "advance_remarks", "balance_remarks",
+    "accounts_status", "ota_booking_id",
+)
+
+# Fields read from raw rows by the summary/target metrics
+METRIC_FIELDS = (
+    "booking_id", "property", "check_in", "check_out", "room_no",
+    "total_amount", "tax", "commission",
+)
+
+# Fields read by the duplicate-guest check
+GUEST_FIELDS = ("booking_id", "guest_name", "mobile_no", "room_no", "mob")
+
+CONFIRMED_STATUSES = ("Confirmed", "Completed")
+PAID_STATUSES = ("Partially Paid", "Fully Paid")
+
+# Date window modes:
+#   "stay"     - bookings whose stay overlaps [start, end]
+#   "check_in" - bookings checking in within [start, end]
+#   "within"   - bookings checking in on/after start and out on/before end
+WINDOW_STAY = "stay"
+WINDOW_CHECK_IN = "check_in"
+WINDOW_WITHIN = "within"
+
+# ============================================================================
+# CLIENT
+# ============================================================================
+
+@st.cache_resource
+def get_supabase_client() -> Client:
+    """Create one Supabase client shared by every repository read."""
+    try:
+        return create_client(st.secrets["supabase"]["url"], st.secrets["supabase"]["key"])
+    except (KeyError, FileNotFoundError):
+        return create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"])
+
+# ============================================================================
+# QUERY BUILDING
+# ============================================================================
+
+def _as_key(values: Optional[Iterable[str]]) -> Optional[Tuple[str, ...]]:
+    """Turn a filter list into a sorted tuple so equal filters share a cache entry."""
+    if values is None:
+        return None
+    return tuple(sorted({v for v in values if v}))
+
+def column_for(table: str, field: str) -> Optional[str]:
+    """Physical column of a logical field in `table` (None if the table lacks it)."""
+    return SCHEMA[table].get(field, field)
+
+def columns_for(table: str, fields: Optional[Iterable[str]]) -> str:
+    """PostgREST select list for the logical `fields` of `table` ("*" when fields is None)."""
+    if fields is None:
+        return "*"
+    columns = {column_for(table, f) for f in fields}
+    columns.discard(None)
+    return ",".join(sorted(columns))
+
+def _build_query(table: str, columns: str, start: Optional[date], end: Optional[date],
+                 window: str, properties: Optional[Tuple[str, ...]],
+                 statuses: Optional[Tuple[str, ...]],
+                 payment_statuses: Optional[Tuple[str, ...]],
+                 order: Optional[str], count: Optional[str] = None):
+    """Build the filtered select. `order` is a comma list of columns, "-" prefix for descending."""
+    q = get_supabase_client().table(table).select(columns, count=count)
+    if properties is not None:
+        q = q.in_(column_for(table, "property"), list(properties))
+    if window == WINDOW_STAY:
+        if end is not None:
+            q = q.lte("check_in", str(end))
+        if start is not None:
+            q = q.gte("check_out", str(start))
+    elif window == WINDOW_CHECK_IN:
+        if start is not None:
+            q = q.gte("check_in", str(start))
+        if end is not None:
+            q = q.lte("check_in", str(end))
+    elif window == WINDOW_WITHIN:
+        if start is not None:
+            q = q.gte("check_in", str(start))
+        if end is not None:
+            q = q.lte("check_out", str(end))
+    else:
+        raise ValueError(f"Unknown date window: {window}")
+    if statuses is not None:
+        q = q.in_(column_for(table, "status"), list(statuses))
+    if payment_statuses is not None:
+        q = q.in_("payment_status", list(payment_statuses))
+    for column in (order.split(",") if order else []):
+        q = q.order(column.lstrip("-"), desc=column.startswith("-"))
+    return q
+
+# ============================================================================
+# CONCURRENCY
+# ============================================================================
+
+def gather(*calls: Callable[[], Any], return_exceptions: bool = False) -> List[Any]:
+    """
+    Run zero-argument callables on a bounded thread pool, results in call order.
+
+    Worker threads inherit the Streamlit script context so cached reads behave
+    as they do on the main thread. With return_exceptions=True a failing call
+    yields its exception in place of a result; otherwise the first one is raised.
+    """
+    ctx = get_script_run_ctx()
+
+    def run(call):
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return call()
+
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_WORKERS, len(calls)))) as pool:
+        futures = [pool.submit(run, call) for call in calls]
+    results = []
+    for future in futures:
+        e = future.exception()
+        if e is not None:
+            if not return_exceptions:
+                raise e
+            results.append(e)
+        else:
+            results.append(future.result())
+    return results
+
+def fetch_both(fetch: Callable[..., Any], *args, return_exceptions: bool = False, **kwargs) -> Tuple[Any, Any]:
+    """
+    Call `fetch(DIRECT_TABLE, ...)` and `fetch(ONLINE_TABLE, ...)` concurrently.
+
+    Returns (direct_result, online_result), so a combined load takes as long
+    as the slower table rather than both added together.
+    """
+    direct, online = gather(
+        lambda: fetch(DIRECT_TABLE, *args, **kwargs),
+        lambda: fetch(ONLINE_TABLE, *args, **kwargs),
+        return_exceptions=return_exceptions,
+    )
+    return direct, online
+
+# ============================================================================
+# PAGINATED READS
+# ============================================================================
+
+def _iter_pages(table: str, columns: str, start: Optional[date], end: Optional[date],
+                window: str, properties: Optional[Tuple[str, ...]],
+                statuses: Optional[Tuple[str, ...]],
+                payment_statuses: Optional[Tuple[str, ...]],
+                order: Optional[str], max_workers: int = PAGE_WORKERS) -> Iterator[List[Dict]]:
+    """
+    Yield pages of matching rows in order.
+
+    The first request also asks for count="exact"; the remaining page ranges
+    are then requested together on a pool of `max_workers` threads and each
+    page is yielded as soon as it (and the pages before it) has arrived.
+    """
+    key = DEFAULT_ORDER[table]
+    if not order:
+        order = key
+    elif key not in [c.lstrip("-") for c in order.split(",")]:
+        order = f"{order},{key}"
+
+    def page_query(offset: int, count: Optional[str] = None):
+        q = _build_query(table, columns, start, end, window, properties,
+                         statuses, payment_statuses, order, count=count)
+        return q.range(offset, offset + PAGE_SIZE - 1)
+
+    first = page_query(0, count="exact").execute()
+    page = first.data or []
+    yield page
+    if len(page) < PAGE_SIZE:
+        return
+
+    total = first.count if first.count is not None else PAGE_SIZE
+    offsets = list(range(PAGE_SIZE, total, PAGE_SIZE))
+    if offsets:
+        queries = [page_query(offset) for offset in offsets]
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(queries)))) as pool:
+            futures = [pool.submit(q.execute) for q in queries]
+            for future in futures:
+                page = future.result().data or []
+                yield page
+        offset = offsets[-1] + PAGE_SIZE
+    else:
+        offset = PAGE_SIZE
+
+    # Rows inserted after the count was taken: keep reading until a short page
+    while len(page) == PAGE_SIZE:
+        page = page_query(offset).execute().data or []
+        yield page
+        offset += PAGE_SIZE
+
+def iter_pages(table: str, start: Optional[date] = None, end: Optional[date] = None,
+               window: str = WINDOW_STAY, properties: Optional[Iterable[str]] = None,
+               statuses: Optional[Iterable[str]] = None,
+               payment_statuses: Optional[Iterable[str]] = None,
+               fields: Optional[Iterable[str]] = None, order: Optional[str] = None,
+               max_workers: int = PAGE_WORKERS) -> Iterator[List[Dict]]:
+    """
+    Stream pages of raw rows straight from the database, bypassing the cache.
+
+    Arguments match fetch_rows. Use this when the caller transforms rows page
+    by page and has no use for a cached copy of the raw table.
+    """
+    if table not in SCHEMA:
+        raise ValueError(f"Unknown reservation table: {table}")
+    return _iter_pages(
+        table, columns_for(table, fields), start, end, window,
+        _as_key(properties), _as_key(statuses), _as_key(payment_statuses), order,
+        max_workers=max_workers,
+    )
+
+# ============================================================================
+# CACHED READS
+# ============================================================================
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def _cached_rows(table: str, columns: str, start: Optional[date], end: Optional[date],
+                 window: str, properties: Optional[Tuple[str, ...]],
+                 statuses: Optional[Tuple[str, ...]],
+                 payment_statuses: Optional[Tuple[str, ...]],
+                 order: Optional[str], canonical: bool = False) -> List[Dict]:
+    """Fetch every matching row (pages in parallel). Errors propagate so they are never cached."""
+    rows: List[Dict] = []
+    for page in _iter_pages(table, columns, start, end, window, properties, statuses, payment_statuses, order):
+        rows.extend(page)
+    if canonical:
+        property_registry.canonicalize(rows, column_for(table, "property"))
+    logging.info(f"booking_repository: fetched {len(rows)} rows from {table} ({start} → {end}, {window})")
+    return rows
+
+def fetch_rows(table: str, start: Optional[date] = None, end: Optional[date] = None,
+               window: str = WINDOW_STAY, properties: Optional[Iterable[str]] = None,
+               statuses: Optional[Iterable[str]] = None,
+               payment_statuses: Optional[Iterable[str]] = None,
+               fields: Optional[Iterable[str]] = None,
+               order: Optional[str] = None, canonical: bool = False) -> List[Dict]:
+    """
+    Return raw rows of `table` matching the window and filters.
+
+    `fields` lists the logical fields the caller reads (see SCHEMA); only
+    their columns are requested. Rows keep the table's own column names.
+    `order` is a comma list of columns to sort by, "-" prefix for descending.
+    With `canonical`, the property column holds canonical names and rows
+    carry property_registry.PROPERTY_ID_FIELD; this is done once per cache
+    fill rather than by every caller on every render.
+    Filters left as None are not applied, so `fetch_rows(DIRECT_TABLE)` reads
+    the whole table. The returned list is a private copy and may be mutated.
+    Raises on query failure; callers decide how to surface the error.
+    """
+    if table not in SCHEMA:
+        raise ValueError(f"Unknown reservation table: {table}")
+    return _cached_rows(
+        table, columns_for(table, fields), start, end, window,
+        _as_key(properties), _as_key(statuses), _as_key(payment_statuses), order, canonical,
+    )
+
+def fetch_confirmed_bookings(table: str, properties: Iterable[str], start: date, end: date,
+                             window: str = WINDOW_STAY,
+                             fields: Optional[Iterable[str]] = None) -> List[Dict]:
+    """Confirmed/Completed, Partially/Fully Paid bookings of `properties` in the window."""
+    return fetch_rows(
+        table, start, end, window=window, properties=properties,
+        statuses=CONFIRMED_STATUSES, payment_statuses=PAID_STATUSES, fields=fields,
+    )
+
+def partition_by_property(table: str, rows: Iterable[Dict],
+                          synonyms: Dict[str, Iterable[str]]) -> Dict[str, List[Dict]]:
+    """
+    Group raw rows by property.
+
+    `synonyms` maps each wanted property to the raw names it is stored under;
+    rows whose property matches none of them are dropped.
+    """
+    column = column_for(table, "property")
+    owner = {raw: prop for prop, names in synonyms.items() for raw in names}
+    grouped: Dict[str, List[Dict]] = {prop: [] for prop in synonyms}
+    for row in rows:
+        prop = owner.get(row.get(column))
+        if prop is not None:
+            grouped[prop].append(row)
+    return grouped
+
+def fetch_confirmed_bookings_by_property(table: str, synonyms: Dict[str, Iterable[str]],
+                                         start: date, end: date, window: str = WINDOW_STAY,
+                                         fields: Optional[Iterable[str]] = None) -> Dict[str, List[Dict]]:
+    """
+    Confirmed, paid bookings of several properties in one paginated query.
+
+    All raw names in `synonyms` go into a single `.in_()` filter and the rows
+    are split per property in memory, instead of one request per property.
+    """
+    names = {raw for raw_names in synonyms.values() for raw in raw_names}
+    rows = fetch_confirmed_bookings(table, names, start, end, window=window, fields=fields)
+    return partition_by_property(table, rows, synonyms)
+
+def fetch_all_direct() -> List[Dict]:
+    """Every row of the reservations table."""
+    return fetch_rows(DIRECT_TABLE)
+
+def fetch_all_online() -> List[Dict]:
+    """Every row of the online_reservations table."""
+    return fetch_rows(ONLINE_TABLE)
+
+def fetch_all_reservations(return_exceptions: bool = False, canonical: bool = False,
+                           report_errors: bool = False) -> Tuple[Any, Any]:
+    """
+    Every row of both tables, read concurrently: (direct_rows, online_rows).
+
+    With `report_errors`, a table that fails to load is shown with st.error
+    and returned as an empty list, so a page can still render the other one.
+    """
+    direct, online = fetch_both(fetch_rows, canonical=canonical,
+                                return_exceptions=return_exceptions or report_errors)
+    if report_errors:
+        if isinstance(direct, Exception):
+            st.error(f"Error loading direct reservations: {direct}")
+            direct = []
+        if isinstance(online, Exception):
+            st.error(f"Error loading online reservations: {online}")
+            online = []
+    return direct, online
+
+# ============================================================================
+# DUPLICATE-GUEST LOOKUP
+# ============================================================================
+
+def find_guest_bookings(table: str, guest_name: str, mobile_no: Optional[str],
+                        room_no: Optional[str], exclude_booking_id: Optional[str] = None) -> List[Dict]:
+    """
+    Bookings of `table` with the same guest name (case-insensitive), mobile
+    number and room, other than `exclude_booking_id`.
+
+    One filtered query that returns only the matching rows, always current.
+    A missing mobile number or room matches rows where it is NULL.
+    Raises on query failure.
+    """
+    query = (
+        get_supabase_client().table(table)
+        .select(columns_for(table, GUEST_FIELDS))
+        .ilike("guest_name", utils.escape_like(guest_name))
+    )
+    for column, value in ((column_for(table, "mobile_no"), mobile_no), ("room_no", room_no)):
+        # eq() would send the string "None"
+        query = query.is_(column, "null") if value is None else query.eq(column, value)
+    response = query.execute()
+    # ILIKE still treats characters such as "*" as wildcards; confirm the exact name
+    rows = [
+        row for row in response.data or []
+        if (row.get("guest_name") or "").lower() == guest_name.lower()
+    ]
+    if exclude_booking_id:
+        rows = [row for row in rows if row.get("booking_id") != exclude_booking_id]
+    return rows
+
+def clear_cache():
+    """Drop all cached reads, e.g. after a booking was edited."""
+    _cached_rows.clear()
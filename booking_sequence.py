@@ -0,0 +1,147 @@
+"""
+booking_sequence.py - Per-day booking ID sequence
+
+Booking IDs look like TIE20250101001 (direct) or SFX20250101001 (online):
+prefix, day, and a zero-padded counter. The counter lives in Postgres and is
+advanced by one RPC call, so two front-desk users saving at the same moment
+get different IDs and no request has to download the day's existing IDs.
+
+Run once in the Supabase SQL editor to install the counter:
+
+    CREATE TABLE IF NOT EXISTS booking_id_counters (
+        prefix     TEXT NOT NULL,
+        day        TEXT NOT NULL,
+        last_value INTEGER NOT NULL,
+        PRIMARY KEY (prefix, day)
+    );
+
+    CREATE OR REPLACE FUNCTION reserve_booking_sequence(p_prefix TEXT, p_day TEXT, p_count INTEGER)
+    RETURNS INTEGER LANGUAGE plpgsql AS $$
+    DECLARE
+        seeded INTEGER;
+        result INTEGER;
+    BEGIN
+        -- Existing counter: one indexed row update, no scan of the booking tables
+        UPDATE booking_id_counters SET last_value = last_value + p_count
+         WHERE prefix = p_prefix AND day = p_day
+        RETURNING last_value INTO result;
+        IF FOUND THEN
+            RETURN result;
+        END IF;
+        -- First ID of the day: start after any IDs created before the counter existed
+        SELECT COALESCE(MAX(substring(booking_id FROM length(p_prefix || p_day) + 1)::INTEGER), 0)
+          INTO seeded
+          FROM (SELECT booking_id FROM reservations
+                UNION ALL SELECT booking_id FROM online_reservations) ids
+         WHERE booking_id LIKE p_prefix || p_day || '%'
+           AND substring(booking_id FROM length(p_prefix || p_day) + 1) ~ '^[0-9]+$';
+        -- A concurrent first call may have inserted the row meanwhile
+        INSERT INTO booking_id_counters AS c (prefix, day, last_value)
+             VALUES (p_prefix, p_day, seeded + p_count)
+        ON CONFLICT (prefix, day) DO UPDATE SET last_value = c.last_value + p_count
+        RETURNING last_value INTO result;
+        RETURN result;
+    END $$;
+
+The booking tables are only scanned for a day's first ID. Until the
+function is installed, single IDs fall back to one prefix query per call
+(the old behaviour, without the per-ID probing). That path is not atomic,
+so the operator is warned, and bulk reservations are refused on it. Any
+other RPC failure (timeout, 5xx, permissions) is raised, never papered over
+with the fallback.
+"""
+
+from datetime import datetime
+from typing import List, Optional
+import logging
+import streamlit as st
+import booking_repository
+from utils import execute_guarded
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+DIRECT_PREFIX = "TIE"
+ONLINE_PREFIX = "SFX"
+
+# Table holding the IDs of each prefix (used by the fallback scan)
+PREFIX_TABLES = {
+    DIRECT_PREFIX: booking_repository.DIRECT_TABLE,
+    ONLINE_PREFIX: booking_repository.ONLINE_TABLE,
+}
+
+SEQUENCE_RPC = "reserve_booking_sequence"
+
+# Error codes meaning the function is not installed: PostgREST found no
+# matching function (PGRST202), or Postgres has none (undefined_function)
+MISSING_FUNCTION_CODES = ("PGRST202", "42883")
+
+# Minimum width of the counter part of an ID
+SEQUENCE_WIDTH = 3
+
+# ============================================================================
+# SEQUENCE
+# ============================================================================
+
+def format_booking_id(prefix: str, day: str, sequence: int) -> str:
+    """Booking ID for the `sequence`-th booking of `day` (YYYYMMDD)."""
+    return f"{prefix}{day}{sequence:0{SEQUENCE_WIDTH}d}"
+
+def is_missing_function(error) -> bool:
+    """Whether an RPC error says the function does not exist (rather than that the call failed)."""
+    return getattr(error, "code", None) in MISSING_FUNCTION_CODES
+
+def _scan_last_sequence(supabase, prefix: str, day: str) -> int:
+    """Highest counter already used for `day`, read from the booking table (fallback path)."""
+    table = PREFIX_TABLES[prefix]
+    stem = f"{prefix}{day}"
+    rows = execute_guarded(
+        supabase.table(table).select("booking_id").like("booking_id", f"{stem}%"),
+        f"booking_sequence({table})",
+    )
+    last = 0
+    for record in rows:
+        suffix = (record.get("booking_id") or "")[len(stem):]
+        if suffix.isdigit():
+            last = max(last, int(suffix))
+    return last
+
+def reserve_booking_ids(prefix: str = DIRECT_PREFIX, count: int = 1,
+                        day: Optional[str] = None, supabase=None) -> List[str]:
+    """
+    Reserve `count` consecutive booking IDs for `day` (default: today).
+
+    One RPC call advances the day's counter by `count`, so bulk imports can
+    reserve all their IDs up front. IDs that end up unused are simply skipped.
+    Raises on database errors, and for count > 1 when the RPC is not installed.
+    """
+    if prefix not in PREFIX_TABLES:
+        raise ValueError(f"Unknown booking ID prefix: {prefix}")
+    if count < 1:
+        return []
+    day = day or datetime.now().strftime('%Y%m%d')
+    supabase = supabase or booking_repository.get_supabase_client()
+    try:
+        last = int(
+            supabase.rpc(SEQUENCE_RPC, {"p_prefix": prefix, "p_day": day, "p_count": count})
+            .execute().data
+        )
+    except Exception as e:
+        if not is_missing_function(e):
+            raise
+        if count > 1:
+            raise RuntimeError(
+                f"{SEQUENCE_RPC} is not installed ({e}); bulk booking IDs can only be reserved atomically"
+            ) from e
+        logging.warning(f"{SEQUENCE_RPC} is not installed ({e}); falling back to a prefix scan")
+        st.warning(
+            "⚠️ Booking ID counter unavailable: using a non-atomic fallback. "
+            "Bookings saved at the same moment may get the same ID; install reserve_booking_sequence."
+        )
+        last = _scan_last_sequence(supabase, prefix, day) + count
+    return [format_booking_id(prefix, day, sequence) for sequence in range(last - count + 1, last + 1)]
+
+def next_booking_id(prefix: str = DIRECT_PREFIX, supabase=None) -> str:
+    """Reserve a single booking ID for today."""
+    return reserve_booking_ids(prefix, 1, supabase=supabase)[0]
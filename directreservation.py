@@ -3,6 +3,8 @@ import pandas as pd
 import plotly.express as px
 from datetime import datetime, date, timedelta
 from supabase import create_client, Client
+import booking_repository
+import booking_sequence
 
 # Initialize Supabase client
 try:
@@ -166,15 +168,9 @@ def load_property_room_map():
     }
 
 def generate_booking_id():
-    """Generate a unique booking ID by checking existing IDs in Supabase."""
+    """Reserve the next booking ID from the per-day sequence."""
     try:
-        today = datetime.now().strftime('%Y%m%d')
-        response = supabase.table("reservations").select("booking_id").like("booking_id", f"TIE{today}%").execute()
-        existing_ids = [record["booking_id"] for record in response.data]
-        sequence = 1
-        while f"TIE{today}{sequence:03d}" in existing_ids:
-            sequence += 1
-        return f"TIE{today}{sequence:03d}"
+        return booking_sequence.next_booking_id(booking_sequence.DIRECT_PREFIX, supabase=supabase)
     except Exception as e:
         st.error(f"Error generating booking ID: {e}")
         return None
@@ -182,16 +178,14 @@ def generate_booking_id():
 def check_duplicate_guest(guest_name, mobile_no, room_no, exclude_booking_id=None, mob=None):
     """Check for duplicate guest based on name, mobile number, and room number, allowing 'Stay-back' if MOB differs."""
     try:
-        response = supabase.table("reservations").select("*").execute()
-        for reservation in response.data:
-            if exclude_booking_id and reservation["booking_id"] == exclude_booking_id:
+        matches = booking_repository.find_guest_bookings(
+            booking_repository.DIRECT_TABLE, guest_name, mobile_no, room_no,
+            exclude_booking_id=exclude_booking_id,
+        )
+        for reservation in matches:
+            if mob == "Stay-back" and reservation["mob"] != "Stay-back":
                 continue
-            if (reservation["guest_name"].lower() == guest_name.lower() and
-                    reservation["mobile_no"] == mobile_no and
-                    reservation["room_no"] == room_no):
-                if mob == "Stay-back" and reservation["mob"] != "Stay-back":
-                    continue
-                return True, reservation["booking_id"]
+            return True, reservation["booking_id"]
         return False, None
     except Exception as e:
         st.error(f"Error checking duplicate guest: {e}")
@@ -219,19 +213,13 @@ def safe_float(value, default=0.0):
         return default
 
 def load_reservations_from_supabase():
-    """Load ALL reservations from Supabase with pagination, handling potential None values."""
+    """Load ALL reservations from Supabase with parallel pagination, handling potential None values."""
     try:
         reservations = []
-        page_size = 1000
-        start = 0
         
-        while True:
-            response = supabase.table("reservations").select("*").order("booking_id", desc=True).range(start, start + page_size - 1).execute()
-            
-            if not response.data:
-                break
-            
-            for record in response.data:
+        # Pages are requested in parallel and arrive in booking_id order
+        for page in booking_repository.iter_pages(booking_repository.DIRECT_TABLE, order="-booking_id"):
+            for record in page:
                 reservation = {
                     "Booking ID": record["booking_id"],
                     "Property Name": record["property_name"] or "",
@@ -266,13 +254,6 @@ def load_reservations_from_supabase():
                     "Payment Status": record.get("payment_status", "Not Paid")
                 }
                 reservations.append(reservation)
-            
-            # If we got less than page_size records, we've reached the end
-            if len(response.data) < page_size:
-                break
-            
-            # Move to next page
-            start += page_size
         
         print(f"✅ Loaded {len(reservations)} reservations from Supabase")
         return reservations
@@ -318,6 +299,7 @@ def save_reservation_to_supabase(reservation):
         }
         response = supabase.table("reservations").insert(supabase_reservation).execute()
         if response.data:
+            booking_repository.clear_cache()
             st.session_state.reservations = load_reservations_from_supabase()
             return True
         return False
@@ -363,6 +345,7 @@ def update_reservation_in_supabase(booking_id, updated_reservation):
         }
         response = supabase.table("reservations").update(supabase_reservation).eq("booking_id", booking_id).execute()
         if response.data:
+            booking_repository.clear_cache()
             return True
         return False
     except Exception as e:
@@ -374,6 +357,7 @@ def delete_reservation_in_supabase(booking_id):
     try:
         response = supabase.table("reservations").delete().eq("booking_id", booking_id).execute()
         if response.data:
+            booking_repository.clear_cache()
             return True
         return False
     except Exception as e:
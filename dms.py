@@ -1,28 +1,12 @@
 # dms.py – FINAL WORKING VERSION (All Properties + La Antilia Fixed + Correct Logic + Date Range Fix)
 import streamlit as st
-from supabase import create_client, Client
 from datetime import date, timedelta, datetime
 import pandas as pd
 import calendar
+import booking_repository
+from property_registry import group_by_property
+from booking_index import BookingIndex
 
-# Initialize Supabase client
-try:
-    supabase: Client = create_client(st.secrets["supabase"]["url"], st.secrets["supabase"]["key"])
-except KeyError as e:
-    st.error(f"Missing Supabase secret: {e}. Please check Streamlit Cloud secrets configuration.")
-    st.stop()
-
-# Property synonym mapping
-property_mapping = {
-  "La Millionaire Luxury Resort": "La Millionaire Resort",
-    "Le Poshe Beach View": "Le Poshe Beach view",
-    "Le Poshe Beach view": "Le Poshe Beach view",
-    "Le Poshe Beach VIEW": "Le Poshe Beach view",
-    "Le Poshe Beachview": "Le Poshe Beach view",
-    "Millionaire": "La Millionaire Resort",
-    "Le Pondy Beach Side": "Le Pondy Beachside",
-    "Le Teera": "Le Terra"
-}
 
 # Table CSS (your exact original)
 TABLE_CSS = """
@@ -54,58 +38,6 @@ TABLE_CSS = """
 </style>
 """
 
-def load_direct_reservations_from_supabase():
-    """Load ALL direct reservations without any limits using pagination"""
-    try:
-        all_data = []
-        page_size = 1000
-        offset = 0
-        
-        while True:
-            response = supabase.table("reservations")\
-                .select("*")\
-                .range(offset, offset + page_size - 1)\
-                .execute()
-            
-            if response.data:
-                all_data.extend(response.data)
-                if len(response.data) < page_size:
-                    break
-                offset += page_size
-            else:
-                break
-        
-        return all_data
-    except Exception as e:
-        st.error(f"Error loading direct reservations: {e}")
-        return []
-
-def load_online_reservations_from_supabase():
-    """Load ALL online reservations without any limits using pagination"""
-    try:
-        all_data = []
-        page_size = 1000
-        offset = 0
-        
-        while True:
-            response = supabase.table("online_reservations")\
-                .select("*")\
-                .range(offset, offset + page_size - 1)\
-                .execute()
-            
-            if response.data:
-                all_data.extend(response.data)
-                if len(response.data) < page_size:
-                    break
-                offset += page_size
-            else:
-                break
-        
-        return all_data
-    except Exception as e:
-        st.error(f"Error loading online reservations: {e}")
-        return []
-
 # ROBUST DATE PARSING – THIS FIXES LA ANTILIA & ALL DATES
 def safe_date_parse(date_str):
     if not date_str:
@@ -136,19 +68,6 @@ def should_show_in_dms(booking):
         return payment == "Not Paid"
     return False
 
-def filter_bookings_for_day(bookings, target_date):
-    """Filter bookings that are active on the target date"""
-    filtered = []
-    for b in bookings:
-        if not should_show_in_dms(b):
-            continue
-        ci = safe_date_parse(b.get("check_in"))
-        co = safe_date_parse(b.get("check_out"))
-        if ci and co and ci <= target_date < co:
-            b["source"] = "direct" if "property_name" in b else "online"
-            filtered.append(b)
-    return filtered
-
 def create_bookings_table(bookings):
     columns = [
         "Source", "Booking ID", "Guest Name", "Mobile No", "Check-in Date", "Check-out Date", "Room No",
@@ -184,14 +103,6 @@ def create_bookings_table(bookings):
             df[col] = df[col].apply(lambda x: f'<span title="{x}">{x}</span>' if pd.notna(x) and str(x).strip() else x)
     return df
 
-@st.cache_data(ttl=300)
-def cached_load_online_reservations():
-    return load_online_reservations_from_supabase()
-
-@st.cache_data(ttl=300)
-def cached_load_direct_reservations():
-    return load_direct_reservations_from_supabase()
-
 def show_dms():
     st.title("Daily Management Status")
 
@@ -205,8 +116,7 @@ def show_dms():
     month = st.selectbox("Select Month", list(range(1, 13)), index=date.today().month - 1)
 
     # Load ALL bookings without date restrictions
-    online_bookings = cached_load_online_reservations()
-    direct_bookings = cached_load_direct_reservations()
+    direct_bookings, online_bookings = booking_repository.fetch_all_reservations(canonical=True, report_errors=True)
 
     # Debug info to see what's being loaded
     st.info(f"Total records loaded: Online={len(online_bookings)}, Direct={len(direct_bookings)}")
@@ -216,24 +126,14 @@ def show_dms():
         if "plan_status" in b:
             b["booking_status"] = b["plan_status"]
 
-    # Normalize property names
-    for b in online_bookings:
-        if "property" in b:
-            b["property"] = property_mapping.get(b["property"], b["property"])
-    for b in direct_bookings:
-        if "property_name" in b:
-            b["property_name"] = property_mapping.get(b["property_name"], b["property_name"])
-
     if not online_bookings and not direct_bookings:
         st.info("No reservations available.")
         return
 
-    # Get all properties
-    online_df = pd.DataFrame(online_bookings)
-    direct_df = pd.DataFrame(direct_bookings)
-    online_props = sorted(online_df["property"].dropna().unique().tolist()) if "property" in online_df.columns else []
-    direct_props = sorted(direct_df["property_name"].dropna().unique().tolist()) if "property_name" in direct_df.columns else []
-    all_properties = sorted(list(set(online_props + direct_props)))
+    # Group by (already canonical) property once instead of rescanning per property
+    online_by_prop = group_by_property(online_bookings, "property")
+    direct_by_prop = group_by_property(direct_bookings, "property_name")
+    all_properties = sorted(set(online_by_prop) | set(direct_by_prop))
 
     if not all_properties:
         st.info("No properties found in reservations.")
@@ -247,14 +147,17 @@ def show_dms():
             month_dates = generate_month_dates(year, month)
 
             # Filter only relevant bookings using the correct logic
-            relevant_online = [b for b in online_bookings if b.get("property") == prop and should_show_in_dms(b)]
-            relevant_direct = [b for b in direct_bookings if b.get("property_name") == prop and should_show_in_dms(b)]
+            relevant_online = [b for b in online_by_prop.get(prop, []) if should_show_in_dms(b)]
+            relevant_direct = [b for b in direct_by_prop.get(prop, []) if should_show_in_dms(b)]
             relevant_all = relevant_online + relevant_direct
+            for b in relevant_all:
+                b["source"] = "direct" if "property_name" in b else "online"
+            relevant_index = BookingIndex(relevant_all, parse=safe_date_parse)
 
             st.info(f"Total bookings requiring follow-up: **{len(relevant_all)}** (Online: {len(relevant_online)}, Direct: {len(relevant_direct)})")
 
             for day in month_dates:
-                daily_bookings = filter_bookings_for_day(relevant_all, day)
+                daily_bookings = relevant_index.active_on(day)
                 st.subheader(f"{prop} - {day.strftime('%B %d, %Y')}")
 
                 if daily_bookings:
@@ -3,14 +3,17 @@ Eden Beach Resort API Integration Module
 Handles API connections, authentication, data fetching, and synchronization
 """
 
-import requests
 import streamlit as st
 import pandas as pd
-from datetime import datetime
+from datetime import date, datetime
 from typing import Dict, List, Optional, Tuple
 import json
 import logging
 from functools import wraps
+import booking_repository
+import pms_backfill
+import pms_http
+from utils import UPSERT_BATCH_SIZE, upsert_rows
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -62,7 +65,8 @@ class EdenBeachAPIClient:
     
     def __init__(self, config: EdenBeachAPIConfig):
         self.config = config
-        self.session = requests.Session()
+        self.session = pms_http.get_session()
+        self.headers = config.get_headers()
         self.last_error = None
         self.last_sync_time = None
     
@@ -78,79 +82,22 @@ class EdenBeachAPIClient:
             return False, None, "API not configured. Please set API key and URL."
         
         url = f"{self.config.api_base_url}{endpoint}"
-        headers = self.config.get_headers()
         
-        for attempt in range(self.config.max_retries):
-            try:
-                if method.upper() == "GET":
-                    response = self.session.get(
-                        url, 
-                        headers=headers, 
-                        params=params,
-                        timeout=self.config.timeout
-                    )
-                elif method.upper() == "POST":
-                    response = self.session.post(
-                        url, 
-                        headers=headers, 
-                        json=data,
-                        params=params,
-                        timeout=self.config.timeout
-                    )
-                elif method.upper() == "PUT":
-                    response = self.session.put(
-                        url, 
-                        headers=headers, 
-                        json=data,
-                        params=params,
-                        timeout=self.config.timeout
-                    )
-                else:
-                    return False, None, f"Unsupported HTTP method: {method}"
-                
-                # Handle response
-                if response.status_code == 401:
-                    return False, None, "Authentication failed. Check your API key."
-                elif response.status_code == 403:
-                    return False, None, "Access forbidden. Check your permissions."
-                elif response.status_code == 404:
-                    return False, None, "Endpoint not found."
-                elif response.status_code >= 500:
-                    if attempt < self.config.max_retries - 1:
-                        logger.warning(f"Server error (attempt {attempt + 1}): {response.status_code}")
-                        continue
-                    return False, None, "Server error. Please try again later."
-                elif response.status_code >= 400:
-                    try:
-                        error_msg = response.json().get("message", response.text)
-                    except:
-                        error_msg = response.text
-                    return False, None, f"Request failed: {error_msg}"
-                
-                # Success
-                if response.status_code == 204:  # No content
-                    return True, {"status": "success"}, "Operation successful"
-                
-                try:
-                    return True, response.json(), "Success"
-                except:
-                    return True, {"raw_response": response.text}, "Success"
-                    
-            except requests.Timeout:
-                if attempt < self.config.max_retries - 1:
-                    logger.warning(f"Timeout (attempt {attempt + 1}/{self.config.max_retries})")
-                    continue
-                return False, None, "Request timeout. Server may be unavailable."
-            except requests.ConnectionError as e:
-                if attempt < self.config.max_retries - 1:
-                    logger.warning(f"Connection error (attempt {attempt + 1}): {str(e)}")
-                    continue
-                return False, None, f"Connection error: {str(e)}"
-            except Exception as e:
-                logger.error(f"Unexpected error: {str(e)}")
-                return False, None, f"Unexpected error: {str(e)}"
+        method = method.upper()
+        if method not in ("GET", "POST", "PUT"):
+            return False, None, f"Unsupported HTTP method: {method}"
         
-        return False, None, "Failed after multiple retry attempts"
+        return pms_http.request(
+            self.session,
+            method,
+            url,
+            "Eden Beach API",
+            attempts=self.config.max_retries,
+            headers=self.headers,
+            json=data if method != "GET" else None,
+            params=params,
+            timeout=self.config.timeout
+        )
     
     def test_connection(self) -> Tuple[bool, str]:
         """Test API connection and authentication"""
@@ -233,17 +180,40 @@ class EdenBeachAPIClient:
 class EdenBeachDataSync:
     """Handle data synchronization between Eden Beach API and Supabase"""
     
-    def __init__(self, api_client: EdenBeachAPIClient, supabase_client):
+    def __init__(self, api_client: EdenBeachAPIClient, supabase_client, batch_size: int = UPSERT_BATCH_SIZE):
         self.api_client = api_client
         self.supabase = supabase_client
+        self.batch_size = batch_size
         self.sync_status = {
             "bookings": False,
             "guests": False,
             "rooms": False,
             "last_sync": None,
-            "error_count": 0
+            "error_count": 0,
+            "invalid_count": 0
         }
     
+    def _upsert_all(self, table: str, key: str, items: List[Dict], transform) -> int:
+        """Transform API records and upsert them into `table` in chunks keyed on `key`; returns rows written"""
+        rows = {}
+        for item in items:
+            try:
+                transformed = transform(item)
+                # A record listed twice is written once, last copy wins
+                rows[transformed[key]] = transformed
+            except Exception as e:
+                logger.error(f"Error transforming {table} record {item.get('id')}: {str(e)}")
+                self.sync_status["invalid_count"] += 1
+        
+        stats = upsert_rows(
+            self.supabase, table, rows.values(), on_conflict=key,
+            batch_size=self.batch_size, label=f"EdenBeachDataSync.{table}",
+        )
+        self.sync_status["error_count"] += len(stats["failed"])
+        if stats["written"] and table in booking_repository.SCHEMA:
+            booking_repository.clear_cache()
+        return stats["written"]
+    
     def sync_bookings(self) -> Dict:
         """Sync bookings from Eden Beach to Supabase"""
         try:
@@ -257,23 +227,8 @@ class EdenBeachDataSync:
                     "count": 0
                 }
             
-            # Transform and insert bookings
-            synced_count = 0
-            for booking in bookings:
-                try:
-                    # Transform API format to Supabase format
-                    transformed = self._transform_booking(booking)
-                    
-                    # Upsert to Supabase
-                    self.supabase.table("reservations").upsert(
-                        transformed,
-                        on_conflict="booking_id"
-                    ).execute()
-                    
-                    synced_count += 1
-                except Exception as e:
-                    logger.error(f"Error syncing booking {booking.get('id')}: {str(e)}")
-                    self.sync_status["error_count"] += 1
+            # Transform API format to Supabase format, then upsert in chunks
+            synced_count = self._upsert_all("reservations", "booking_id", bookings, self._transform_booking)
             
             self.sync_status["bookings"] = True
             self.sync_status["last_sync"] = datetime.now()
@@ -293,6 +248,32 @@ class EdenBeachDataSync:
                 "count": 0
             }
     
+    def backfill_bookings(self, start_date: date, end_date: date,
+                          chunk_days: int = pms_backfill.DEFAULT_CHUNK_DAYS,
+                          max_seconds: Optional[float] = None, on_chunk=None) -> Dict:
+        """
+        Sync a long booking range one chunk at a time (see pms_backfill).
+        Finished chunks are checkpointed, so calling again with the same range
+        and chunk size resumes an interrupted backfill.
+        """
+        def fetch(chunk_from: date, chunk_to: date):
+            return self.api_client.fetch_bookings(chunk_from.isoformat(), chunk_to.isoformat())
+        
+        def write(bookings: List[Dict]):
+            errors_before = self.sync_status["error_count"]
+            written = self._upsert_all("reservations", "booking_id", bookings, self._transform_booking)
+            return written, self.sync_status["error_count"] - errors_before
+        
+        result = pms_backfill.run_backfill(
+            self.supabase, f"eden_beach:{self.api_client.config.property_id}:reservations",
+            start_date, end_date, fetch, write,
+            chunk_days=chunk_days, max_seconds=max_seconds, on_chunk=on_chunk,
+        )
+        if result["complete"]:
+            self.sync_status["bookings"] = True
+            self.sync_status["last_sync"] = datetime.now()
+        return result
+    
     def sync_guests(self) -> Dict:
         """Sync guest information"""
         try:
@@ -306,18 +287,7 @@ class EdenBeachDataSync:
                     "count": 0
                 }
             
-            synced_count = 0
-            for guest in guests:
-                try:
-                    transformed = self._transform_guest(guest)
-                    self.supabase.table("guests").upsert(
-                        transformed,
-                        on_conflict="guest_id"
-                    ).execute()
-                    synced_count += 1
-                except Exception as e:
-                    logger.error(f"Error syncing guest {guest.get('id')}: {str(e)}")
-                    self.sync_status["error_count"] += 1
+            synced_count = self._upsert_all("guests", "guest_id", guests, self._transform_guest)
             
             self.sync_status["guests"] = True
             return {
@@ -348,18 +318,7 @@ class EdenBeachDataSync:
                     "count": 0
                 }
             
-            synced_count = 0
-            for room in rooms:
-                try:
-                    transformed = self._transform_room(room)
-                    self.supabase.table("rooms").upsert(
-                        transformed,
-                        on_conflict="room_id"
-                    ).execute()
-                    synced_count += 1
-                except Exception as e:
-                    logger.error(f"Error syncing room {room.get('id')}: {str(e)}")
-                    self.sync_status["error_count"] += 1
+            synced_count = self._upsert_all("rooms", "room_id", rooms, self._transform_room)
             
             self.sync_status["rooms"] = True
             return {
@@ -11,6 +11,7 @@ from eden_beach_integration import (
     EdenBeachAPIClient,
     EdenBeachDataSync
 )
+import pms_backfill
 
 
 def initialize_eden_beach_session():
@@ -234,7 +235,8 @@ def show_sync_controls(supabase):
             st.metric(
                 "Errors",
                 status["error_count"],
-                help="Total errors during sync"
+                help=f"Rows that failed to write; {status.get('invalid_count', 0)} "
+                     f"records without usable data were left out"
             )
         
         st.info(f"⏱️ Last sync: {status['last_sync_formatted']}")
@@ -289,6 +291,36 @@ def show_booking_fetch_interface(supabase):
                                 st.error(f"❌ {result['message']}")
             else:
                 st.error(f"❌ {message}")
+    
+    # Long ranges are imported chunk by chunk and can be resumed
+    st.markdown("---")
+    st.subheader("📦 Backfill Bookings")
+    chunk_days = st.number_input(
+        "Days per request", min_value=1, max_value=366,
+        value=pms_backfill.DEFAULT_CHUNK_DAYS, key="eden_beach_backfill_chunk_days"
+    )
+    st.caption(
+        f"Imports the range above in {chunk_days}-day chunks. Each run stops after about "
+        f"{pms_backfill.UI_RUN_SECONDS // 60} minutes; run it again with the same range to resume."
+    )
+    if st.button("📦 Run / Resume Backfill", use_container_width=True, key="eden_beach_backfill"):
+        if st.session_state.eden_beach_sync is None:
+            st.session_state.eden_beach_sync = EdenBeachDataSync(st.session_state.eden_beach_client, supabase)
+        progress = st.progress(0.0, text="Starting backfill...")
+        result = st.session_state.eden_beach_sync.backfill_bookings(
+            start_date, end_date, chunk_days=int(chunk_days),
+            max_seconds=pms_backfill.UI_RUN_SECONDS,
+            on_chunk=lambda i, total, chunk_from, chunk_to: progress.progress(
+                i / total, text=f"Chunk {i + 1} of {total}: {chunk_from} to {chunk_to}"
+            ),
+        )
+        progress.progress(1.0 if result["complete"] else (result["chunks"] - result["remaining"]) / result["chunks"])
+        if result["complete"] and result["success"]:
+            st.success(f"✅ {result['message']}")
+        else:
+            st.warning(f"⚠️ {result['message']}")
+        for chunk_from, chunk_to, error in result["failed"]:
+            st.error(f"❌ {chunk_from} to {chunk_to}: {error}")
 
 
 def show_eden_beach_page(supabase):
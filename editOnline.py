@@ -3,6 +3,7 @@ import pandas as pd
 from datetime import date
 from supabase import create_client, Client
 from utils import safe_int, safe_float
+import booking_repository
 
 # Initialize Supabase client
 try:
@@ -35,6 +36,8 @@ def update_online_reservation_in_supabase(booking_id, updated_reservation):
             truncated_reservation["remarks"] = str(truncated_reservation["remarks"]).strip()[:500] if truncated_reservation["remarks"] else ""
         
         response = supabase.table("online_reservations").update(truncated_reservation).eq("booking_id", booking_id).execute()
+        if response.data:
+            booking_repository.clear_cache()
         return bool(response.data)
     except Exception as e:
         st.error(f"Error updating online reservation {booking_id}: {e}")
@@ -46,31 +49,17 @@ def delete_online_reservation_in_supabase(booking_id):
         # Trim booking_id before delete
         booking_id = booking_id.strip()
         response = supabase.table("online_reservations").delete().eq("booking_id", booking_id).execute()
+        if response.data:
+            booking_repository.clear_cache()
         return bool(response.data)
     except Exception as e:
         st.error(f"Error deleting online reservation {booking_id}: {e}")
         return False
 
 def load_online_reservations_from_supabase():
-    """Load ALL online reservations from Supabase without any limit using pagination."""
+    """Load ALL online reservations through the shared booking repository."""
     try:
-        all_data = []
-        page_size = 1000
-        offset = 0
-        
-        while True:
-            response = supabase.table("online_reservations")\
-                .select("*")\
-                .range(offset, offset + page_size - 1)\
-                .execute()
-            
-            if response.data:
-                all_data.extend(response.data)
-                if len(response.data) < page_size:
-                    break
-                offset += page_size
-            else:
-                break
+        all_data = booking_repository.fetch_all_online()
         
         if not all_data:
             st.warning("No online reservations found in the database.")
@@ -115,23 +104,7 @@ def search_booking_by_id(booking_id):
 def load_properties():
     """Load unique properties from reservations table (direct reservations)."""
     try:
-        all_data = []
-        page_size = 1000
-        offset = 0
-        
-        while True:
-            response = supabase.table("reservations")\
-                .select("property_name")\
-                .range(offset, offset + page_size - 1)\
-                .execute()
-            
-            if response.data:
-                all_data.extend(response.data)
-                if len(response.data) < page_size:
-                    break
-                offset += page_size
-            else:
-                break
+        all_data = booking_repository.fetch_rows(booking_repository.DIRECT_TABLE, fields=("property",))
         
         properties = set()
         for r in all_data:
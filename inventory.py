@@ -6,10 +6,16 @@ import calendar
 import pandas as pd
 from typing import Any, List, Dict, Optional
 import logging
-import io
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
+import booking_repository
+from booking_repository import BOOKING_FIELDS
+from booking_index import BookingIndex
+from booking_records import BookingRecord, room_allocations
+from month_allocator import allocate_month
+from monthly_report import TABLE_VISIBLE_COLS, TABLE_HIDDEN_COLS, inventory_rows, generate_monthly_report
+from property_inventory import INVENTORY, get_inventory
+from property_registry import canonical_name, stored_names
+import report_cache
+import report_jobs
 
 # ────── Logging ──────
 logging.basicConfig(filename="app.log", level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -21,21 +27,6 @@ except KeyError as e:
     st.error(f"Missing Supabase secret: {e}. Please check Streamlit Cloud secrets.")
     st.stop()
 
-# ────── Property synonym mapping ──────
-property_mapping = {
-    "La Millionaire Luxury Resort": "La Millionaire Resort",
-    "Le Poshe Beach View": "Le Poshe Beach view",
-    "Le Poshe Beach view": "Le Poshe Beach view",
-    "Le Poshe Beach VIEW": "Le Poshe Beach view",
-    "Le Poshe Beachview": "Le Poshe Beach view",
-    "Millionaire": "La Millionaire Resort",
-    "Le Pondy Beach Side": "Le Pondy Beachside",
-    "Le Teera": "Le Terra"
-}
-reverse_mapping = {c: [] for c in set(property_mapping.values())}
-for v, c in property_mapping.items():
-    reverse_mapping[c].append(v)
-
 # ────── MOP / MOB mappings ──────
 mop_mapping = {
     "UPI": ["UPI"],
@@ -66,34 +57,10 @@ mob_mapping = {
     "Website": ["Stayflexi Booking Engine"],
 }
 
-# ────── Full inventory ──────
-PROPERTY_INVENTORY = {
-    "Le Poshe Beach view": {"all": ["101","102","201","202","203","204","301","302","303","304","Day Use 1","Day Use 2","No Show"],"three_bedroom":["203","204"]},
-    "La Millionaire Resort": {"all": ["101","102","103","105","201","202","203","204","205","206","207","208","301","302","303","304","305","306","307","308","401","402","Day Use 1","Day Use 2","Day Use 3","Day Use 4","Day Use 5","No Show"],"three_bedroom":["203","204","205"]},
-    "Le Poshe Luxury": {"all": ["101","102","201","202","203","204","205","301","302","303","304","305","401","402","403","404","405","501","Day Use 1","Day Use 2","No Show"],"three_bedroom":["203","204","205"]},
-    "Le Poshe Suite": {"all": ["601","602","603","604","701","702","703","704","801","Day Use 1","Day Use 2","No Show"],"three_bedroom":[]},
-    "La Paradise Residency": {"all": ["101","102","103","201","202","203","301","302","303","304","Day Use 1","Day Use 2","No Show"],"three_bedroom":["203"]},
-    "La Paradise Luxury": {"all": ["101","102","103","201","202","203","Day Use 1","Day Use 2","No Show"],"three_bedroom":["203"]},
-    "La Villa Heritage": {"all": ["101","102","103","201","202","203","301","Day Use 1","Day Use 2","No Show"],"three_bedroom":["203"]},
-    "Le Pondy Beachside": {"all": ["101","102","201","202","Day Use 1","Day Use 2","No Show"],"three_bedroom":[]},
-    "Le Royce Villa": {"all": ["101","102","201","202","Day Use 1","Day Use 2","No Show"],"three_bedroom":[]},
-    "La Tamara Luxury": {"all": ["101","102","103","104","105","106","201","202","203","204","205","206","301","302","303","304","305","306","401","402","403","404","Day Use 1","Day Use 2","No Show"],"three_bedroom":["203","204","205","206"]},
-    "La Antilia Luxury": {"all": ["101","201","202","203","204","301","302","303","304","401","Day Use 1","Day Use 2","No Show"],"three_bedroom":["203","204"]},
-    "La Tamara Suite": {"all": ["101","102","103","104","201","202","203","204","205","206","Day Use 1","Day Use 2","No Show"],"three_bedroom":["203","204","205","206"]},
-    "Le Park Resort": {"all": ["111","222","333","444","555","666","Day Use 1","Day Use 2","No Show"],"three_bedroom":[]},
-    "Villa Shakti": {"all": ["101","102","201","201A","202","203","301","301A","302","303","401","Day Use 1","Day Use 2","No Show"],"three_bedroom":["203"]},
-    "Eden Beach Resort": {"all": ["101","102","103","201","202","Day Use 1","Day Use 2","No Show"],"three_bedroom":[]},
-    "Le Terra": {"all": ["101","102","103","104","105","106","107","Day Use 1","Day Use 2","No Show"],"three_bedroom":[]},
-    "La Coromandel Luxury": {"all": ["101","102","103","201","202","203","204","205","206","301","Day Use 1","Day Use 2","No Show"],"three_bedroom":[]},
-    "Happymates Forest Retreat": {"all": ["101","102","Day Use 1","Day Use 2","No Show"],"three_bedroom":[]}
-}
 
 # ═══════════════════════════════════════════════════════════════════════════
 # Helpers
 # ═══════════════════════════════════════════════════════════════════════════
-def normalize_property(name: str) -> str:
-    return property_mapping.get(name.strip(), name.strip())
-
 def sanitize_string(v: Any, default: str = "") -> str:
     return str(v).strip() if v is not None else default
 
@@ -127,63 +94,52 @@ def highlight_columns(df):
 # ═══════════════════════════════════════════════════════════════════════════
 @st.cache_data(ttl=3600)
 def load_properties() -> List[str]:
-    try:
-        direct = supabase.table("reservations").select("property_name").execute()
-        online = supabase.table("online_reservations").select("property").execute()
-        props = set()
-        for r in direct.data or []:
-            p = normalize_property(r.get("property_name", ""))
-            if p: props.add(p)
-        for r in online.data or []:
-            p = normalize_property(r.get("property", ""))
-            if p: props.add(p)
-        return sorted(list(PROPERTY_INVENTORY.keys()))
-    except Exception as e:
-        logging.error(f"load_properties: {e}")
-        return []
+    # The report covers exactly the properties with a known room inventory
+    return sorted(INVENTORY.keys())
 
-@st.cache_data(ttl=600)
 def load_combined_bookings(property: str, start_date: date, end_date: date) -> List[Dict]:
-    prop = normalize_property(property)
-    query_props = [prop] + reverse_mapping.get(prop, [])
+    query_props = stored_names(property)
     combined: List[Dict] = []
 
-    try:
-        q = supabase.table("reservations")\
-            .select("*")\
-            .in_("property_name", query_props)\
-            .lte("check_in", str(end_date))\
-            .gte("check_out", str(start_date))\
-            .in_("plan_status", ["Confirmed", "Completed"])\
-            .in_("payment_status", ["Partially Paid", "Fully Paid"])\
-            .execute()
-        for r in q.data or []:
-            norm = normalize_booking(r, is_online=False)
-            if norm: combined.append(norm)
-    except Exception as e:
-        logging.error(f"Direct query error: {e}")
+    direct, online = booking_repository.fetch_both(
+        booking_repository.fetch_confirmed_bookings, query_props, start_date, end_date,
+        fields=BOOKING_FIELDS, return_exceptions=True)
 
-    try:
-        q = supabase.table("online_reservations")\
-            .select("*")\
-            .in_("property", query_props)\
-            .lte("check_in", str(end_date))\
-            .gte("check_out", str(start_date))\
-            .in_("booking_status", ["Confirmed", "Completed"])\
-            .in_("payment_status", ["Partially Paid", "Fully Paid"])\
-            .execute()
-        for r in q.data or []:
-            norm = normalize_booking(r, is_online=True)
+    for rows, is_online in ((direct, False), (online, True)):
+        if isinstance(rows, Exception):
+            logging.error(f"{'Online' if is_online else 'Direct'} query error: {rows}")
+            continue
+        for r in rows:
+            norm = normalize_booking(r, is_online=is_online)
             if norm: combined.append(norm)
-    except Exception as e:
-        logging.error(f"Online query error: {e}")
+
+    return combined
+
+def load_combined_bookings_by_property(properties: List[str], start_date: date, end_date: date) -> Dict[str, List[Dict]]:
+    synonyms = {}
+    for p in properties:
+        synonyms[p] = stored_names(p)
+    combined: Dict[str, List[Dict]] = {p: [] for p in properties}
+
+    direct, online = booking_repository.fetch_both(
+        booking_repository.fetch_confirmed_bookings_by_property, synonyms, start_date, end_date,
+        fields=BOOKING_FIELDS, return_exceptions=True)
+
+    for rows_by_prop, is_online in ((direct, False), (online, True)):
+        if isinstance(rows_by_prop, Exception):
+            logging.error(f"{'Online' if is_online else 'Direct'} query error: {rows_by_prop}")
+            continue
+        for p, rows in rows_by_prop.items():
+            for r in rows:
+                norm = normalize_booking(r, is_online=is_online)
+                if norm: combined[p].append(norm)
 
     return combined
 
 # ═══════════════════════════════════════════════════════════════════════════
 # Normalize booking
 # ═══════════════════════════════════════════════════════════════════════════
-def normalize_booking(row: Dict, is_online: bool) -> Optional[Dict]:
+def normalize_booking(row: Dict, is_online: bool) -> Optional[BookingRecord]:
     try:
         bid = sanitize_string(row.get("booking_id") or row.get("id"))
         status_field = "booking_status" if is_online else "plan_status"
@@ -197,7 +153,7 @@ def normalize_booking(row: Dict, is_online: bool) -> Optional[Dict]:
         days_field = "room_nights" if is_online else "no_of_days"
         days = safe_int(row.get(days_field)) or (co - ci).days
         if days <= 0: days = 1
-        p = normalize_property(row.get("property_name") if not is_online else row.get("property"))
+        p = canonical_name(row.get("property_name") if not is_online else row.get("property"))
 
         if is_online:
             total_amount = safe_float(row.get("booking_amount")) or 0.0
@@ -216,40 +172,39 @@ def normalize_booking(row: Dict, is_online: bool) -> Optional[Dict]:
         identifier = row.get("id") if is_online else row.get("booking_id")
         identifier_str = str(identifier) if identifier is not None else ""
 
-        return {
-            "type": "online" if is_online else "direct",
-            "property": p,
-            "booking_id": bid,
-            "guest_name": sanitize_string(row.get("guest_name")),
-            "mobile_no": sanitize_string(row.get("guest_phone") if is_online else row.get("mobile_no")),
-            "total_pax": safe_int(row.get("total_pax")),
-            "check_in": str(ci),
-            "check_out": str(co),
-            "days": days,
-            "room_no": sanitize_string(row.get("room_no")).title(),
-            "mob": sanitize_string(row.get("mode_of_booking") if is_online else row.get("mob")),
-            "plan": sanitize_string(row.get("rate_plans") if is_online else row.get("breakfast")),
-            "room_charges": room_charges,
-            "gst": gst,
-            "tax": tax,
-            "total_amount": total_amount,
-            "commission": commission,
-            "receivable": receivable,
-            "advance": safe_float(row.get("total_payment_made") if is_online else row.get("advance_amount")),
-            "advance_mop": sanitize_string(row.get("advance_mop")),
-            "balance": safe_float(row.get("balance_due") if is_online else row.get("balance_amount")),
-            "balance_mop": sanitize_string(row.get("balance_mop")),
-            "booking_status": status,
-            "payment_status": pay,
-            "submitted_by": sanitize_string(row.get("submitted_by")),
-            "modified_by": sanitize_string(row.get("modified_by")),
-            "remarks": sanitize_string(row.get("remarks")),
-            "advance_remarks": sanitize_string(row.get("advance_remarks", "")),
-            "balance_remarks": sanitize_string(row.get("balance_remarks", "")),
-            "accounts_status": sanitize_string(row.get("accounts_status", "Pending")).title(),
-            "ota_booking_id": sanitize_string(row.get("ota_booking_id", "")) if is_online else "",
-            "db_id": identifier_str,
-        }
+        return BookingRecord(
+            ci, co,
+            type="online" if is_online else "direct",
+            property=p,
+            booking_id=bid,
+            guest_name=sanitize_string(row.get("guest_name")),
+            mobile_no=sanitize_string(row.get("guest_phone") if is_online else row.get("mobile_no")),
+            total_pax=safe_int(row.get("total_pax")),
+            days=days,
+            room_no=sanitize_string(row.get("room_no")).title(),
+            mob=sanitize_string(row.get("mode_of_booking") if is_online else row.get("mob")),
+            plan=sanitize_string(row.get("rate_plans") if is_online else row.get("breakfast")),
+            room_charges=room_charges,
+            gst=gst,
+            tax=tax,
+            total_amount=total_amount,
+            commission=commission,
+            receivable=receivable,
+            advance=safe_float(row.get("total_payment_made") if is_online else row.get("advance_amount")),
+            advance_mop=sanitize_string(row.get("advance_mop")),
+            balance=safe_float(row.get("balance_due") if is_online else row.get("balance_amount")),
+            balance_mop=sanitize_string(row.get("balance_mop")),
+            booking_status=status,
+            payment_status=pay,
+            submitted_by=sanitize_string(row.get("submitted_by")),
+            modified_by=sanitize_string(row.get("modified_by")),
+            remarks=sanitize_string(row.get("remarks")),
+            advance_remarks=sanitize_string(row.get("advance_remarks", "")),
+            balance_remarks=sanitize_string(row.get("balance_remarks", "")),
+            accounts_status=sanitize_string(row.get("accounts_status", "Pending")).title(),
+            ota_booking_id=sanitize_string(row.get("ota_booking_id", "")) if is_online else "",
+            db_id=identifier_str,
+        )
     except Exception as e:
         logging.warning(f"normalize failed: {e}")
         return None
@@ -257,13 +212,9 @@ def normalize_booking(row: Dict, is_online: bool) -> Optional[Dict]:
 # ═══════════════════════════════════════════════════════════════════════════
 # Filter & Assign
 # ═══════════════════════════════════════════════════════════════════════════
-def filter_bookings_for_day(bookings: List[Dict], day: date) -> List[Dict]:
-    return [b.copy() for b in bookings if date.fromisoformat(b["check_in"]) <= day < date.fromisoformat(b["check_out"])]
-
 def assign_inventory_numbers(daily_bookings: List[Dict], property: str):
     assigned, over = [], []
-    inv = PROPERTY_INVENTORY.get(property, {"all": []})["all"]
-    inv_lookup = {i.strip().lower(): i for i in inv}
+    inv_lookup = get_inventory(property).lookup
 
     room_bookings = {}
     sorted_bookings = sorted(daily_bookings, key=lambda x: (x.get("check_in", ""), x.get("booking_id", "")))
@@ -298,22 +249,7 @@ def assign_inventory_numbers(daily_bookings: List[Dict], property: str):
         for room in assigned_rooms:
             room_bookings[room] = booking_id
 
-        days = max(b.get("days", 1), 1)
-        receivable = b.get("receivable", 0.0)
-        num_rooms = len(assigned_rooms)
-        total_nights = days * num_rooms
-        per_night = receivable / total_nights if total_nights > 0 else 0.0
-        base_pax = b["total_pax"] // num_rooms if num_rooms else 0
-        rem = b["total_pax"] % num_rooms if num_rooms else 0
-
-        for idx, room in enumerate(assigned_rooms):
-            nb = b.copy()
-            nb["assigned_room"] = room
-            nb["room_no"] = room
-            nb["total_pax"] = base_pax + (1 if idx < rem else 0)
-            nb["per_night"] = per_night
-            nb["is_primary"] = (idx == 0)
-            assigned.append(nb)
+        assigned.extend(room_allocations(b, assigned_rooms))
 
     return assigned, over
 
@@ -321,71 +257,8 @@ def assign_inventory_numbers(daily_bookings: List[Dict], property: str):
 # Build Table
 # ═══════════════════════════════════════════════════════════════════════════
 def create_inventory_table(assigned: List[Dict], over: List[Dict], prop: str, target_date: date):
-    visible_cols = ["Inventory No","Room No","Booking ID","OTA Booking ID","Guest Name","Mobile No","Total Pax",
-                    "Check In","Check Out","Days","MOB","Room Charges","GST","TAX","Total","Commission",
-                    "Hotel Receivable","Per Night","Advance","Advance Mop","Balance","Balance Mop",
-                    "Plan","Booking Status","Payment Status","Submitted by","Modified by","Remarks",
-                    "Advance Remarks","Balance Remarks","Accounts Status"]
-    hidden_cols = ["type", "db_id"]
-
-    all_inventory = PROPERTY_INVENTORY.get(prop, {}).get("all", [])
-    rows = []
-
-    for inventory_no in all_inventory:
-        row = {c: "" for c in visible_cols + hidden_cols}
-        row["Inventory No"] = inventory_no
-
-        match = next((a for a in assigned if str(a.get("assigned_room", "")).strip() == inventory_no.strip()), None)
-
-        if match:
-            check_in_date = date.fromisoformat(match["check_in"])
-            is_check_in_day = (target_date == check_in_date)
-            is_primary = match.get("is_primary", False)
-
-            row["type"] = match["type"]
-            row["db_id"] = str(match["db_id"]) if match["db_id"] else ""
-            row["Room No"] = match["room_no"]
-            row["Booking ID"] = match["booking_id"]
-            row["OTA Booking ID"] = match.get("ota_booking_id", "")
-            row["Guest Name"] = match["guest_name"]
-            row["Mobile No"] = match["mobile_no"]
-            row["Total Pax"] = match["total_pax"]
-            row["Check In"] = match["check_in"]
-            row["Check Out"] = match["check_out"]
-            row["Days"] = match["days"]
-            row["MOB"] = match["mob"]
-            row["Per Night"] = f"{match.get('per_night', 0):.2f}"
-
-            if is_check_in_day and is_primary:
-                row["Room Charges"] = f"{match.get('room_charges', 0):.2f}"
-                row["GST"] = f"{match.get('gst', 0):.2f}"
-                row["TAX"] = f"{match.get('tax', 0):.2f}"
-                row["Total"] = f"{match.get('total_amount', 0):.2f}"
-                row["Commission"] = f"{match.get('commission', 0):.2f}"
-                row["Hotel Receivable"] = f"{match.get('receivable', 0):.2f}"
-                row["Advance"] = f"{match.get('advance', 0):.2f}"
-                row["Advance Mop"] = match.get("advance_mop", "")
-                row["Balance"] = f"{match.get('balance', 0):.2f}"
-                row["Balance Mop"] = match.get("balance_mop", "")
-                row["Plan"] = match["plan"]
-                row["Booking Status"] = match["booking_status"]
-                row["Payment Status"] = match["payment_status"]
-                row["Submitted by"] = match["submitted_by"]
-                row["Modified by"] = match["modified_by"]
-                row["Remarks"] = match.get("remarks", "")
-
-            row["Advance Remarks"] = match.get("advance_remarks", "")
-            row["Balance Remarks"] = match.get("balance_remarks", "")
-            row["Accounts Status"] = match.get("accounts_status", "Pending")
-
-        rows.append(row)
-
-    if over:
-        over_row = {c: "" for c in visible_cols + hidden_cols}
-        over_row["Inventory No"] = "Overbookings"
-        over_row["Room No"] = ", ".join(f"{b.get('room_no','')} ({b.get('booking_id','')})" for b in over)
-        rows.append(over_row)
-
+    visible_cols, hidden_cols = TABLE_VISIBLE_COLS, TABLE_HIDDEN_COLS
+    rows = inventory_rows(assigned, over, prop, target_date)
     df = pd.DataFrame(rows, columns=visible_cols + hidden_cols)
     display_df = df[visible_cols].copy()
     full_df = df
@@ -465,128 +338,6 @@ def extract_stats_from_table(df: pd.DataFrame, mob_types: List[str]) -> Dict:
     return {"mop": mop_data, "dtd": dtd}
 
 
-# ═══════════════════════════════════════════════════════════════════════════
-# Monthly Report Excel Generator — ONE single sheet
-# ═══════════════════════════════════════════════════════════════════════════
-def generate_monthly_report(props_list: List[str], year: int, month: int, bookings_by_prop: Dict[str, List[Dict]]) -> bytes:
-    """
-    All properties × all dates in a single sheet.
-    Columns: Property, Date, + all 30 booking columns.
-    Rows are color-coded by property for easy scanning.
-    """
-    month_dates = [date(year, month, d) for d in range(1, calendar.monthrange(year, month)[1] + 1)]
-    month_label = calendar.month_name[month]
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = f"{month_label} {year}"
-
-    # ── Styles ──
-    HEADER_FILL = PatternFill("solid", fgColor="1F4E79")
-    SUBHDR_FILL = PatternFill("solid", fgColor="2E75B6")
-    GRAY_FILL   = PatternFill("solid", fgColor="D3D3D3")
-    WHITE_FILL  = PatternFill("solid", fgColor="FFFFFF")
-    PROP_FILLS  = [
-        PatternFill("solid", fgColor="DAEEF3"),
-        PatternFill("solid", fgColor="EBF1DE"),
-        PatternFill("solid", fgColor="FDE9D9"),
-        PatternFill("solid", fgColor="E6E0EC"),
-        PatternFill("solid", fgColor="FDEBD0"),
-        PatternFill("solid", fgColor="D5E8D4"),
-    ]
-
-    HEADER_FONT = Font(bold=True, color="FFFFFF", name="Arial", size=10)
-    BOLD_FONT   = Font(bold=True, name="Arial", size=9)
-    NORMAL_FONT = Font(name="Arial", size=9)
-    BIG_TITLE   = Font(bold=True, name="Arial", size=15, color="1F4E79")
-
-    CENTER = Alignment(horizontal="center", vertical="center", wrap_text=True)
-    LEFT   = Alignment(horizontal="left",   vertical="center", wrap_text=True)
-    thin   = Side(style="thin", color="BFBFBF")
-    BORDER = Border(left=thin, right=thin, top=thin, bottom=thin)
-
-    visible_cols = [
-        "Inventory No", "Room No", "Booking ID", "OTA Booking ID", "Guest Name", "Mobile No", "Total Pax",
-        "Check In", "Check Out", "Days", "MOB", "Room Charges", "GST", "TAX", "Total",
-        "Commission", "Hotel Receivable", "Per Night", "Advance", "Advance Mop",
-        "Balance", "Balance Mop", "Plan", "Booking Status", "Payment Status",
-        "Submitted by", "Modified by", "Remarks", "Advance Remarks", "Balance Remarks",
-        "Accounts Status"
-    ]
-    highlight_cols = {"Total", "Advance", "Balance Mop"}
-    all_cols = ["Property", "Date"] + visible_cols
-
-    col_widths = {
-        "Property": 26, "Date": 13,
-        "Inventory No": 12, "Room No": 10, "Booking ID": 14, "OTA Booking ID": 16, "Guest Name": 20,
-        "Mobile No": 14, "Total Pax": 9, "Check In": 11, "Check Out": 11,
-        "Days": 6, "MOB": 14, "Room Charges": 13, "GST": 10, "TAX": 10,
-        "Total": 12, "Commission": 12, "Hotel Receivable": 16, "Per Night": 11,
-        "Advance": 12, "Advance Mop": 14, "Balance": 12, "Balance Mop": 14,
-        "Plan": 14, "Booking Status": 15, "Payment Status": 15,
-        "Submitted by": 15, "Modified by": 15, "Remarks": 22,
-        "Advance Remarks": 22, "Balance Remarks": 22, "Accounts Status": 15,
-    }
-
-    # ── Row 1: Title ──
-    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=len(all_cols))
-    title_cell = ws.cell(row=1, column=1,
-                         value=f"All Properties — {month_label} {year} — Complete Booking Data")
-    title_cell.font      = BIG_TITLE
-    title_cell.alignment = CENTER
-    ws.row_dimensions[1].height = 30
-
-    # ── Row 2: Headers ──
-    for ci, col_name in enumerate(all_cols, start=1):
-        c = ws.cell(row=2, column=ci, value=col_name)
-        c.font      = HEADER_FONT
-        c.fill      = SUBHDR_FILL if col_name in highlight_cols else HEADER_FILL
-        c.alignment = CENTER
-        c.border    = BORDER
-        ws.column_dimensions[get_column_letter(ci)].width = col_widths.get(col_name, 14)
-    ws.row_dimensions[2].height = 28
-    ws.freeze_panes = "E3"   # freeze Property, Date, Inventory No, Room No
-
-    # ── Data rows ──
-    prop_fill_map = {p: PROP_FILLS[i % len(PROP_FILLS)] for i, p in enumerate(props_list)}
-    write_row = 3
-
-    for prop in props_list:
-        bookings  = bookings_by_prop.get(prop, [])
-        prop_fill = prop_fill_map[prop]
-
-        for day in month_dates:
-            daily = filter_bookings_for_day(bookings, day)
-            assigned, over = assign_inventory_numbers(daily, prop)
-            display_df, _ = create_inventory_table(assigned, over, prop, day)
-            day_label = day.strftime("%d-%b-%Y")
-
-            for df_row in display_df.itertuples(index=False):
-                row_data = list(df_row)
-                has_bk   = str(row_data[2]).strip() != ""  # Booking ID at index 2
-                full_row = [prop, day_label] + row_data
-
-                for ci, (col_name, value) in enumerate(zip(all_cols, full_row), start=1):
-                    cell           = ws.cell(row=write_row, column=ci, value=value)
-                    cell.font      = BOLD_FONT if has_bk else NORMAL_FONT
-                    cell.alignment = LEFT
-                    cell.border    = BORDER
-                    if col_name in highlight_cols:
-                        cell.fill = GRAY_FILL
-                    elif has_bk:
-                        cell.fill = prop_fill
-                    else:
-                        cell.fill = WHITE_FILL
-
-                write_row += 1
-
-    # ── Save ──
-    buffer = io.BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
-    return buffer.getvalue()
-
-
 # ═══════════════════════════════════════════════════════════════════════════
 # UI – Dashboard with single table (editable for Accounts Team)
 # ═══════════════════════════════════════════════════════════════════════════
@@ -701,10 +452,11 @@ def show_daily_status():
                         try:
                             start_d = date(dl_year, m, 1)
                             end_d   = date(dl_year, m, calendar.monthrange(dl_year, m)[1])
-                            bookings_by_prop = {}
-                            for dl_prop in dl_props_selected:
-                                bookings_by_prop[dl_prop] = load_combined_bookings(dl_prop, start_d, end_d)
-                            report_bytes = generate_monthly_report(dl_props_selected, dl_year, m, bookings_by_prop)
+                            bookings_by_prop = load_combined_bookings_by_property(dl_props_selected, start_d, end_d)
+                            report_bytes = report_cache.cached_artifact(
+                                "inventory_month", dl_props_selected, f"{dl_year}-{m:02d}",
+                                report_cache.data_version(bookings_by_prop),
+                                lambda: generate_monthly_report(dl_props_selected, dl_year, m, bookings_by_prop))
                             prop_tag  = "All_Properties" if prop_count > 1 else dl_props_selected[0].replace(' ', '_')
                             filename  = f"{prop_tag}_{month_label_dl}_{dl_year}_Report.xlsx"
                             st.download_button(
@@ -727,24 +479,23 @@ def show_daily_status():
                     f"2 sheets each: All Data + Summary)."
                 )
                 if st.button(f"📥 Generate {len(months_to_download)} Monthly Reports", key="dl_generate_btn", type="primary"):
-                    for m in months_to_download:
-                        month_label_dl = month_names[m]
-                        start_d = date(dl_year, m, 1)
-                        end_d   = date(dl_year, m, calendar.monthrange(dl_year, m)[1])
-                        with st.spinner(f"Generating {month_label_dl} {dl_year}…"):
+                    # Bookings are loaded here; the workbooks are built in parallel by report_jobs
+                    prop_tag = "All_Properties" if prop_count > 1 else dl_props_selected[0].replace(' ', '_')
+                    with st.spinner(f"Loading bookings for {len(months_to_download)} months…"):
+                        for m in months_to_download:
+                            month_label_dl = month_names[m]
+                            start_d = date(dl_year, m, 1)
+                            end_d   = date(dl_year, m, calendar.monthrange(dl_year, m)[1])
                             try:
-                                bookings_by_prop = {}
-                                for dl_prop in dl_props_selected:
-                                    bookings_by_prop[dl_prop] = load_combined_bookings(dl_prop, start_d, end_d)
-                                report_bytes = generate_monthly_report(dl_props_selected, dl_year, m, bookings_by_prop)
-                                prop_tag  = "All_Properties" if prop_count > 1 else dl_props_selected[0].replace(' ', '_')
-                                filename  = f"{prop_tag}_{month_label_dl}_{dl_year}_Report.xlsx"
-                                st.download_button(
-                                    label=f"⬇️ {month_label_dl} {dl_year} — {prop_count} {'Property' if prop_count == 1 else 'Properties'}",
-                                    data=report_bytes,
-                                    file_name=filename,
-                                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                                    key=f"dl_multi_save_{m}"
+                                bookings_by_prop = load_combined_bookings_by_property(dl_props_selected, start_d, end_d)
+                                report_jobs.submit_report(
+                                    f"{dl_year}_{m:02d}_{'|'.join(dl_props_selected)}",
+                                    f"{month_label_dl} {dl_year} — {prop_count} {'Property' if prop_count == 1 else 'Properties'}",
+                                    f"{prop_tag}_{month_label_dl}_{dl_year}_Report.xlsx",
+                                    generate_monthly_report, dl_props_selected, dl_year, m, bookings_by_prop,
+                                    cache_key=report_cache.artifact_key(
+                                        "inventory_month", dl_props_selected, f"{dl_year}-{m:02d}",
+                                        report_cache.data_version(bookings_by_prop)),
                                 )
                             except Exception as e:
                                 st.error(f"❌ Failed for {month_label_dl}: {e}")
@@ -752,6 +503,9 @@ def show_daily_status():
         else:
             st.warning("Please select at least one property and one month to enable downloads.")
 
+        # Reports queued above (or earlier in this session), downloadable as each one finishes
+        report_jobs.show_report_jobs(key_prefix="dl_multi_save")
+
     st.markdown("---")
 
     # ═══════════════════════════════════════════════════════
@@ -789,20 +543,18 @@ def show_daily_status():
     prop = selected_prop
     month_dates = [date(year, month, d) for d in range(1, calendar.monthrange(year, month)[1] + 1)]
     start, end = month_dates[0], month_dates[-1]
-    bookings = load_combined_bookings(prop, start, end)
+    bookings = BookingIndex(load_combined_bookings(prop, start, end))
 
     # MTD aggregation
     mtd = {m: {"rooms": 0, "value": 0.0, "comm": 0.0} for m in mob_types}
     mtd_rooms = mtd_value = mtd_comm = 0
 
-    for day in month_dates:
-        daily = filter_bookings_for_day(bookings, day)
+    for day, assigned, over in allocate_month(bookings, month_dates, get_inventory(prop)):
         st.markdown(f"### {prop} — {day.strftime('%d %B %Y')}")
 
-        assigned, over = assign_inventory_numbers(daily, prop)
         display_df, full_df = create_inventory_table(assigned, over, prop, day)
 
-        if daily:
+        if assigned or over:
             is_accounts_team = st.session_state.get('role', '') == "Accounts Team"
             st.subheader("📊 Booking Overview")
 
@@ -978,8 +730,7 @@ def show_daily_status():
                   "M.T.D Comm": f"₹{mtd_comm:,.2f}"}],
                 columns=["MOB", "M.T.D Rooms", "M.T.D Value", "M.T.D ARR", "M.T.D Comm"])
 
-            total_inventory = len([i for i in PROPERTY_INVENTORY.get(prop, {}).get("all", [])
-                                   if not i.startswith(("Day Use", "No Show"))])
+            total_inventory = get_inventory(prop).sellable_count
             occ_pct = (dtd["Total"]["rooms"] / total_inventory * 100) if total_inventory else 0.0
             mtd_occ_pct = (mtd_rooms / (total_inventory * day.day) * 100) if total_inventory and day.day > 0 else 0.0
 
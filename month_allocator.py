@@ -0,0 +1,126 @@
+"""
+month_allocator.py - Room assignment for a whole month in one sweep
+
+inventory.assign_inventory_numbers (copied in nrd_report.py) works on one
+day at a time: it sorts the day's bookings by (check_in, booking_id), hands
+each booking its requested rooms unless a room is unknown or already held by
+another booking, and emits one row per assigned room. A multi-night stay
+gets the same treatment on every night, so a month repeats most of the work.
+
+allocate_month() gives the same (assigned, over) lists for every day, but
+sweeps the days carrying the previous day's outcome forward:
+
+- each booking's rooms and output rows are resolved once, not per night;
+- the day's order is kept sorted by inserting arrivals and dropping
+  departures instead of re-sorting;
+- allocation is sequential, so bookings ahead of the first arrival or
+  departure keep yesterday's outcome and only the rest are re-checked.
+
+Rows are shared between the days a booking is in-house; callers must treat
+them as read-only. tests/test_month_allocator.py checks the sweep against
+the per-day function.
+"""
+
+from bisect import bisect_left, insort
+from datetime import date
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+from booking_index import BookingIndex
+from booking_records import room_allocations
+from property_inventory import PropertyInventory
+
+
+class _Entry:
+    """One booking's place in the sweep."""
+
+    __slots__ = ("key", "booking", "booking_id", "rooms", "rows", "assigned")
+
+    def __init__(self, key, booking: Dict, rooms: Optional[List[str]]):
+        self.key = key
+        self.booking = booking
+        self.booking_id = booking.get("booking_id", "Unknown")
+        self.rooms = rooms          # resolved inventory rooms, None if never assignable
+        self.rows = None            # output rows, built the first time it is assigned
+        self.assigned = False
+
+
+def _resolve_rooms(booking: Dict, lookup: Mapping[str, str]) -> Optional[List[str]]:
+    """Inventory rooms requested by `booking`, or None if it can never be assigned."""
+    raw_room = str(booking.get("room_no", "") or "").strip()
+    if not raw_room:
+        return None
+    rooms = []
+    for r in (r.strip() for r in raw_room.split(",") if r.strip()):
+        if r.lower() not in lookup:
+            return None
+        rooms.append(lookup[r.lower()])
+    return rooms or None
+
+
+def allocate_month(bookings: BookingIndex, dates: Iterable[date],
+                   inventory: PropertyInventory) -> Iterator[Tuple[date, List[Dict], List[Dict]]]:
+    """Yield (day, assigned, over) for each of `dates`, best in ascending order."""
+    lookup = inventory.lookup
+    entries: Dict[int, _Entry] = {}     # id(booking) -> entry
+    order: List[tuple] = []             # sorted keys of the bookings in-house
+    by_key: Dict[tuple, _Entry] = {}
+    claims: Dict[str, List] = {}        # room -> [booking_id, number of holders]
+    # Input order breaks (check_in, booking_id) ties, as the per-day stable sort does
+    position = {id(b): i for i, b in enumerate(bookings)}
+
+    def release(entry: _Entry):
+        for room in entry.rooms:
+            claim = claims[room]
+            claim[1] -= 1
+            if not claim[1]:
+                del claims[room]
+
+    for day in dates:
+        active = bookings.active_on(day)
+        active_ids = {id(b) for b in active}
+
+        # Departures: drop them, remembering the earliest position touched
+        first_changed = len(order)
+        for key in [k for k in order if id(by_key[k].booking) not in active_ids]:
+            first_changed = min(first_changed, bisect_left(order, key))
+            order.pop(bisect_left(order, key))
+            entry = by_key.pop(key)
+            del entries[id(entry.booking)]
+            if entry.assigned:
+                release(entry)
+
+        # Arrivals: insert in (check_in, booking_id, input order) position
+        for b in active:
+            if id(b) in entries:
+                continue
+            key = (b.get("check_in", ""), b.get("booking_id", ""), position[id(b)])
+            entry = _Entry(key, b, _resolve_rooms(b, lookup))
+            entries[id(b)] = entry
+            by_key[key] = entry
+            insort(order, key)
+            first_changed = min(first_changed, bisect_left(order, key))
+
+        # Bookings from first_changed on are re-checked against the rooms held before them
+        suffix = [by_key[k] for k in order[first_changed:]]
+        for entry in suffix:
+            if entry.assigned:
+                release(entry)
+                entry.assigned = False
+        for entry in suffix:
+            if entry.rooms is None:
+                continue
+            if any(room in claims and claims[room][0] != entry.booking_id for room in entry.rooms):
+                continue
+            entry.assigned = True
+            for room in entry.rooms:
+                claims.setdefault(room, [entry.booking_id, 0])[1] += 1
+            if entry.rows is None:
+                entry.rows = room_allocations(entry.booking, entry.rooms)
+
+        assigned, over = [], []
+        for key in order:
+            entry = by_key[key]
+            if entry.assigned:
+                assigned.extend(entry.rows)
+            else:
+                over.append(entry.booking)
+        yield day, assigned, over
@@ -0,0 +1,207 @@
+"""
+monthly_report.py - Monthly inventory Excel report
+
+Builds the "All Properties — <Month> — Complete Booking Data" workbook that
+the Daily Status page offers for download. It has no Streamlit or database
+imports, so report_jobs can run it in worker processes: callers load the
+bookings and pass them in.
+"""
+
+from datetime import date
+from typing import Dict, List
+import calendar
+import io
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
+from openpyxl.utils import get_column_letter
+from booking_index import BookingIndex
+from month_allocator import allocate_month
+from property_inventory import get_inventory
+
+# ═══════════════════════════════════════════════════════════════════════════
+# Inventory rows
+# ═══════════════════════════════════════════════════════════════════════════
+TABLE_VISIBLE_COLS = ["Inventory No","Room No","Booking ID","OTA Booking ID","Guest Name","Mobile No","Total Pax",
+                      "Check In","Check Out","Days","MOB","Room Charges","GST","TAX","Total","Commission",
+                      "Hotel Receivable","Per Night","Advance","Advance Mop","Balance","Balance Mop",
+                      "Plan","Booking Status","Payment Status","Submitted by","Modified by","Remarks",
+                      "Advance Remarks","Balance Remarks","Accounts Status"]
+TABLE_HIDDEN_COLS = ["type", "db_id"]
+
+def inventory_rows(assigned: List[Dict], over: List[Dict], prop: str, target_date: date) -> List[Dict]:
+    """One row dict per inventory room (plus an Overbookings row), keyed by table column."""
+    visible_cols, hidden_cols = TABLE_VISIBLE_COLS, TABLE_HIDDEN_COLS
+    all_inventory = get_inventory(prop).rooms
+    rows = []
+
+    # First assigned row per room, instead of scanning `assigned` for every room
+    matches = {}
+    for a in assigned:
+        matches.setdefault(str(a.get("assigned_room", "")).strip(), a)
+
+    for inventory_no in all_inventory:
+        row = {c: "" for c in visible_cols + hidden_cols}
+        row["Inventory No"] = inventory_no
+
+        match = matches.get(inventory_no.strip())
+
+        if match:
+            check_in_date = date.fromisoformat(match["check_in"])
+            is_check_in_day = (target_date == check_in_date)
+            is_primary = match.get("is_primary", False)
+
+            row["type"] = match["type"]
+            row["db_id"] = str(match["db_id"]) if match["db_id"] else ""
+            row["Room No"] = match["room_no"]
+            row["Booking ID"] = match["booking_id"]
+            row["OTA Booking ID"] = match.get("ota_booking_id", "")
+            row["Guest Name"] = match["guest_name"]
+            row["Mobile No"] = match["mobile_no"]
+            row["Total Pax"] = match["total_pax"]
+            row["Check In"] = match["check_in"]
+            row["Check Out"] = match["check_out"]
+            row["Days"] = match["days"]
+            row["MOB"] = match["mob"]
+            row["Per Night"] = f"{match.get('per_night', 0):.2f}"
+
+            if is_check_in_day and is_primary:
+                row["Room Charges"] = f"{match.get('room_charges', 0):.2f}"
+                row["GST"] = f"{match.get('gst', 0):.2f}"
+                row["TAX"] = f"{match.get('tax', 0):.2f}"
+                row["Total"] = f"{match.get('total_amount', 0):.2f}"
+                row["Commission"] = f"{match.get('commission', 0):.2f}"
+                row["Hotel Receivable"] = f"{match.get('receivable', 0):.2f}"
+                row["Advance"] = f"{match.get('advance', 0):.2f}"
+                row["Advance Mop"] = match.get("advance_mop", "")
+                row["Balance"] = f"{match.get('balance', 0):.2f}"
+                row["Balance Mop"] = match.get("balance_mop", "")
+                row["Plan"] = match["plan"]
+                row["Booking Status"] = match["booking_status"]
+                row["Payment Status"] = match["payment_status"]
+                row["Submitted by"] = match["submitted_by"]
+                row["Modified by"] = match["modified_by"]
+                row["Remarks"] = match.get("remarks", "")
+
+            row["Advance Remarks"] = match.get("advance_remarks", "")
+            row["Balance Remarks"] = match.get("balance_remarks", "")
+            row["Accounts Status"] = match.get("accounts_status", "Pending")
+
+        rows.append(row)
+
+    if over:
+        over_row = {c: "" for c in visible_cols + hidden_cols}
+        over_row["Inventory No"] = "Overbookings"
+        over_row["Room No"] = ", ".join(f"{b.get('room_no','')} ({b.get('booking_id','')})" for b in over)
+        rows.append(over_row)
+    return rows
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# Monthly Report Excel Generator — ONE single sheet
+# ═══════════════════════════════════════════════════════════════════════════
+REPORT_PROP_COLORS = ["DAEEF3", "EBF1DE", "FDE9D9", "E6E0EC", "FDEBD0", "D5E8D4"]
+REPORT_HIGHLIGHT_COLS = {"Total", "Advance", "Balance Mop"}
+REPORT_COLS = ["Property", "Date"] + TABLE_VISIBLE_COLS
+REPORT_COL_WIDTHS = {
+    "Property": 26, "Date": 13,
+    "Inventory No": 12, "Room No": 10, "Booking ID": 14, "OTA Booking ID": 16, "Guest Name": 20,
+    "Mobile No": 14, "Total Pax": 9, "Check In": 11, "Check Out": 11,
+    "Days": 6, "MOB": 14, "Room Charges": 13, "GST": 10, "TAX": 10,
+    "Total": 12, "Commission": 12, "Hotel Receivable": 16, "Per Night": 11,
+    "Advance": 12, "Advance Mop": 14, "Balance": 12, "Balance Mop": 14,
+    "Plan": 14, "Booking Status": 15, "Payment Status": 15,
+    "Submitted by": 15, "Modified by": 15, "Remarks": 22,
+    "Advance Remarks": 22, "Balance Remarks": 22, "Accounts Status": 15,
+}
+
+def _report_styles() -> List[NamedStyle]:
+    """Named styles of the monthly report; every cell references one of these."""
+    center = Alignment(horizontal="center", vertical="center", wrap_text=True)
+    left = Alignment(horizontal="left", vertical="center", wrap_text=True)
+    thin = Side(style="thin", color="BFBFBF")
+    border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    header_font = Font(bold=True, color="FFFFFF", name="Arial", size=10)
+    bold_font = Font(bold=True, name="Arial", size=9)
+    normal_font = Font(name="Arial", size=9)
+
+    def fill(color):
+        return PatternFill("solid", fgColor=color)
+
+    styles = [
+        NamedStyle("report_title", font=Font(bold=True, name="Arial", size=15, color="1F4E79"), alignment=center),
+        NamedStyle("report_header", font=header_font, fill=fill("1F4E79"), alignment=center, border=border),
+        NamedStyle("report_header_hl", font=header_font, fill=fill("2E75B6"), alignment=center, border=border),
+        NamedStyle("report_empty", font=normal_font, fill=fill("FFFFFF"), alignment=left, border=border),
+        NamedStyle("report_empty_hl", font=normal_font, fill=fill("D3D3D3"), alignment=left, border=border),
+        NamedStyle("report_booked_hl", font=bold_font, fill=fill("D3D3D3"), alignment=left, border=border),
+    ]
+    styles += [
+        NamedStyle(f"report_booked_{i}", font=bold_font, fill=fill(color), alignment=left, border=border)
+        for i, color in enumerate(REPORT_PROP_COLORS)
+    ]
+    return styles
+
+def generate_monthly_report(props_list: List[str], year: int, month: int, bookings_by_prop: Dict[str, List[Dict]]) -> bytes:
+    """
+    All properties × all dates in a single sheet.
+    Columns: Property, Date, + all 30 booking columns.
+    Rows are color-coded by property for easy scanning.
+
+    The sheet is written in openpyxl write-only mode: each row is serialized
+    as soon as it is computed and cells only reference shared named styles,
+    so memory stays flat however many properties and months are exported.
+    """
+    month_dates = [date(year, month, d) for d in range(1, calendar.monthrange(year, month)[1] + 1)]
+    month_label = calendar.month_name[month]
+
+    wb = Workbook(write_only=True)
+    for style in _report_styles():
+        wb.add_named_style(style)
+    ws = wb.create_sheet(f"{month_label} {year}")
+
+    def styled(value, style):
+        cell = WriteOnlyCell(ws, value=value)
+        cell.style = style
+        return cell
+
+    # Column widths, frozen panes and merges must be set before the first row
+    for ci, col_name in enumerate(REPORT_COLS, start=1):
+        ws.column_dimensions[get_column_letter(ci)].width = REPORT_COL_WIDTHS.get(col_name, 14)
+    ws.freeze_panes = "E3"   # freeze Property, Date, Inventory No, Room No
+    ws.merged_cells.add(f"A1:{get_column_letter(len(REPORT_COLS))}1")
+    ws.row_dimensions[1].height = 30
+    ws.row_dimensions[2].height = 28
+
+    # ── Row 1: Title, Row 2: Headers ──
+    ws.append([styled(f"All Properties — {month_label} {year} — Complete Booking Data", "report_title")])
+    ws.append([
+        styled(col_name, "report_header_hl" if col_name in REPORT_HIGHLIGHT_COLS else "report_header")
+        for col_name in REPORT_COLS
+    ])
+
+    # Style of every column for booked / empty rows of each property colour
+    highlight = [col_name in REPORT_HIGHLIGHT_COLS for col_name in REPORT_COLS]
+    empty_styles = ["report_empty_hl" if hl else "report_empty" for hl in highlight]
+    booked_styles = [
+        ["report_booked_hl" if hl else f"report_booked_{i}" for hl in highlight]
+        for i in range(len(REPORT_PROP_COLORS))
+    ]
+
+    # ── Data rows ──
+    for pi, prop in enumerate(props_list):
+        bookings = BookingIndex(bookings_by_prop.get(prop, []))
+        prop_styles = booked_styles[pi % len(REPORT_PROP_COLORS)]
+
+        for day, assigned, over in allocate_month(bookings, month_dates, get_inventory(prop)):
+            day_label = day.strftime("%d-%b-%Y")
+            for row in inventory_rows(assigned, over, prop, day):
+                values = [prop, day_label] + [row[c] for c in TABLE_VISIBLE_COLS]
+                has_bk = str(row["Booking ID"]).strip() != ""
+                row_styles = prop_styles if has_bk else empty_styles
+                ws.append([styled(value, style) for value, style in zip(values, row_styles)])
+
+    # ── Save ──
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
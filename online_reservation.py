@@ -3,7 +3,8 @@ import pandas as pd
 from datetime import datetime
 import re
 from supabase import create_client, Client
-from utils import safe_int, safe_float, get_property_name
+from utils import safe_int, safe_float, get_property_name, iter_rows, upsert_rows
+import booking_repository
 from stayflexi_sync_ui import show_stayflexi_quick_sync_button
 from eden_beach_integration import EdenBeachAPIConfig, EdenBeachAPIClient
 
@@ -121,6 +122,8 @@ def insert_online_reservation(reservation):
         if "remarks" in truncated:
             truncated["remarks"] = truncate_string(truncated["remarks"], 500)
         response = supabase.table("online_reservations").insert(truncated).execute()
+        if response.data:
+            booking_repository.clear_cache()
         return bool(response.data)
     except Exception as e:
         if '23505' in str(e) and 'duplicate key value' in str(e).lower():
@@ -132,8 +135,11 @@ def insert_online_reservation(reservation):
 def load_online_reservations_from_supabase():
     """Load online reservations from Supabase."""
     try:
-        response = supabase.table("online_reservations").select("*").order("check_in", desc=True).execute()
-        return response.data if response.data else []
+        return list(iter_rows(
+            lambda: supabase.table("online_reservations").select("*")
+            .order("check_in", desc=True).order("id"),
+            label="load_online_reservations_from_supabase",
+        ))
     except Exception as e:
         st.error(f"Error loading online reservations: {e}")
         return []
@@ -146,8 +152,12 @@ def process_and_sync_excel(uploaded_file):
         if df.empty:
             st.warning("Uploaded file is empty.")
             return 0, 0
-        existing_reservations = load_online_reservations_from_supabase()
-        existing_ids = {r["booking_id"] for r in existing_reservations}
+        existing_ids = {
+            r["booking_id"] for r in iter_rows(
+                lambda: supabase.table("online_reservations").select("booking_id").order("booking_id"),
+                label="process_and_sync_excel.existing_ids",
+            )
+        }
         inserted = skipped = 0
         for _, row in df.iterrows():
             hotel_id = str(safe_int(row.get("hotel id", "")))
@@ -243,12 +253,13 @@ def process_and_sync_excel(uploaded_file):
 
 def sync_eden_beach_bookings_to_online_reservations(start_date=None, end_date=None):
     """
-    Fetch bookings from the Eden Beach API and upsert them into online_reservations.
-    Returns (inserted, updated, errors, error_message).
+    Fetch bookings from the Eden Beach API and upsert them into online_reservations
+    in chunks, one request per chunk keyed on booking_id.
+    Returns (synced, errors, error_message).
     """
     client, err = _get_eden_beach_client()
     if client is None:
-        return 0, 0, 0, err
+        return 0, 0, err
 
     success, bookings, message = client.fetch_bookings(
         start_date=str(start_date) if start_date else None,
@@ -256,12 +267,13 @@ def sync_eden_beach_bookings_to_online_reservations(start_date=None, end_date=No
     )
 
     if not success:
-        return 0, 0, 0, message
+        return 0, 0, message
     if not bookings:
-        return 0, 0, 0, None
+        return 0, 0, None
 
-    existing_ids = {r["booking_id"] for r in load_online_reservations_from_supabase()}
-    inserted = updated = errors = 0
+    # Keyed by booking_id: a booking listed twice is written once, last copy wins
+    reservations = {}
+    errors = 0
 
     for booking in bookings:
         try:
@@ -329,22 +341,23 @@ def sync_eden_beach_bookings_to_online_reservations(start_date=None, end_date=No
                 "room_revenue":               safe_float(booking.get("room_revenue")),
             }
 
-            if booking_id in existing_ids:
-                supabase.table("online_reservations") \
-                    .update(reservation) \
-                    .eq("booking_id", booking_id) \
-                    .execute()
-                updated += 1
-            else:
-                if insert_online_reservation(reservation):
-                    inserted += 1
-                    existing_ids.add(booking_id)
+            reservations[reservation["booking_id"]] = reservation
 
         except Exception as e:
             errors += 1
             st.warning(f"⚠️ Could not sync booking {booking.get('id', '?')}: {e}")
 
-    return inserted, updated, errors, None
+    # New bookings are inserted and existing ones overwritten in the same request
+    stats = upsert_rows(
+        supabase, "online_reservations", reservations.values(),
+        on_conflict="booking_id", label="sync_eden_beach_bookings",
+    )
+    if stats["written"]:
+        booking_repository.clear_cache()
+    for row, error in stats["failed"]:
+        st.warning(f"⚠️ Could not sync booking {row.get('booking_id', '?')}: {error}")
+
+    return stats["written"], errors + len(stats["failed"]), None
 
 
 # ──────────────────────────────────────────────────────────────────[...]
@@ -406,7 +419,7 @@ def show_eden_beach_sync_section():
     with col_sync:
         if st.button("🔄 Sync Eden Beach API → Database", key="eb_sync_btn", type="primary"):
             with st.spinner("Fetching & syncing Eden Beach bookings…"):
-                inserted, updated, errors, err_msg = sync_eden_beach_bookings_to_online_reservations(
+                synced, errors, err_msg = sync_eden_beach_bookings_to_online_reservations(
                     start_date=eb_start if eb_start else None,
                     end_date=eb_end   if eb_end   else None,
                 )
@@ -415,7 +428,7 @@ def show_eden_beach_sync_section():
             else:
                 st.success(
                     f"✅ Eden Beach sync complete!  "
-                    f"Inserted: **{inserted}** | Updated: **{updated}** | Errors: **{errors}**"
+                    f"Inserted or updated: **{synced}** | Errors: **{errors}**"
                 )
                 st.session_state.online_reservations = load_online_reservations_from_supabase()
 
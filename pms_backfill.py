@@ -0,0 +1,172 @@
+"""
+pms_backfill.py - Chunked, resumable backfills for the PMS syncs
+
+Requesting a year of bookings in one call either timed out or held the whole
+response (and its transformed rows) in the Streamlit worker. run_backfill()
+splits the range into date windows, and for each one fetches, transforms and
+upserts before moving on, so memory is bounded by one window. Every window
+that is written without errors is checkpointed; running the same backfill
+again skips finished windows, so a run cut short by a crash, a timeout or
+`max_seconds` resumes where it stopped.
+
+Run once in the Supabase SQL editor to install the checkpoint table:
+
+    CREATE TABLE IF NOT EXISTS pms_backfill_checkpoints (
+        job_id       TEXT NOT NULL,
+        chunk_start  DATE NOT NULL,
+        chunk_end    DATE NOT NULL,
+        rows_written INTEGER NOT NULL DEFAULT 0,
+        completed_at TIMESTAMP NOT NULL DEFAULT now(),
+        PRIMARY KEY (job_id, chunk_start)
+    );
+
+Until the table exists, checkpoints are kept in process memory, which still
+covers retries after a timeout but not a server restart.
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Set, Tuple
+import logging
+import time
+from utils import iter_rows
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+CHECKPOINT_TABLE = "pms_backfill_checkpoints"
+
+DEFAULT_CHUNK_DAYS = 31
+
+# Seconds a backfill started from the UI runs before stopping; running it again continues
+UI_RUN_SECONDS = 240
+
+# Fallback checkpoints (job_id -> finished chunk starts) when the table is missing
+_local_checkpoints: Dict[str, Set[str]] = {}
+
+# fetch(chunk_from, chunk_to) -> (success, records, message)
+FetchChunk = Callable[[date, date], Tuple[bool, Optional[List[Dict]], str]]
+# write(records) -> (rows written, rows that failed to write); unusable records are not errors
+WriteChunk = Callable[[List[Dict]], Tuple[int, int]]
+
+# ============================================================================
+# CHUNKS & CHECKPOINTS
+# ============================================================================
+
+def date_chunks(start: date, end: date, days: int) -> List[Tuple[date, date]]:
+    """Consecutive inclusive (from, to) ranges of at most `days` days covering start..end."""
+    chunks = []
+    while start <= end:
+        stop = min(end, start + timedelta(days=days - 1))
+        chunks.append((start, stop))
+        start = stop + timedelta(days=1)
+    return chunks
+
+def backfill_job_id(source: str, start: date, end: date, chunk_days: int) -> str:
+    """Checkpoint key of one backfill; re-running the same range and chunk size resumes it."""
+    return f"{source}|{start.isoformat()}|{end.isoformat()}|{chunk_days}"
+
+def completed_chunks(supabase, job_id: str) -> Set[str]:
+    """Start dates (ISO) of the chunks of `job_id` already written."""
+    done = set(_local_checkpoints.get(job_id, ()))
+    try:
+        rows = iter_rows(
+            lambda: supabase.table(CHECKPOINT_TABLE).select("chunk_start")
+            .eq("job_id", job_id).order("chunk_start"),
+            label="completed_chunks",
+        )
+        done.update(str(row["chunk_start"]) for row in rows)
+    except Exception as e:
+        logging.warning(f"{CHECKPOINT_TABLE} unavailable ({e}); using in-memory checkpoints")
+    return done
+
+def mark_chunk_done(supabase, job_id: str, chunk_from: date, chunk_to: date, rows_written: int) -> None:
+    _local_checkpoints.setdefault(job_id, set()).add(chunk_from.isoformat())
+    try:
+        supabase.table(CHECKPOINT_TABLE).upsert({
+            "job_id": job_id,
+            "chunk_start": chunk_from.isoformat(),
+            "chunk_end": chunk_to.isoformat(),
+            "rows_written": rows_written,
+            "completed_at": datetime.now().isoformat(timespec="seconds"),
+        }, on_conflict="job_id,chunk_start").execute()
+    except Exception as e:
+        logging.warning(f"Could not checkpoint {job_id} {chunk_from}: {e}")
+
+def clear_checkpoints(supabase, job_id: str) -> None:
+    """Forget a backfill's progress so the next run starts over."""
+    _local_checkpoints.pop(job_id, None)
+    try:
+        supabase.table(CHECKPOINT_TABLE).delete().eq("job_id", job_id).execute()
+    except Exception as e:
+        logging.warning(f"Could not clear checkpoints of {job_id}: {e}")
+
+# ============================================================================
+# BACKFILL
+# ============================================================================
+
+def run_backfill(supabase, source: str, start: date, end: date, fetch: FetchChunk, write: WriteChunk,
+                 chunk_days: int = DEFAULT_CHUNK_DAYS, max_seconds: Optional[float] = None,
+                 on_chunk: Optional[Callable[[int, int, date, date], None]] = None) -> Dict:
+    """
+    Fetch and write start..end one chunk at a time, skipping checkpointed chunks.
+
+    A chunk that fails to fetch or has write errors is not checkpointed and
+    the backfill moves on; it is retried by the next run. With `max_seconds`,
+    no new chunk is started once that much time has passed. `on_chunk(i,
+    total, chunk_from, chunk_to)` is called before each chunk (for progress).
+
+    Returns a dict: success, complete, message, job_id, chunks, done (this
+    run), resumed (finished earlier), remaining, rows and failed (list of
+    (chunk_from, chunk_to, message)).
+    """
+    started = time.perf_counter()
+    job_id = backfill_job_id(source, start, end, chunk_days)
+    chunks = date_chunks(start, end, chunk_days)
+    finished = completed_chunks(supabase, job_id)
+    resumed = sum(1 for chunk_from, _ in chunks if chunk_from.isoformat() in finished)
+    done, rows, failed = 0, 0, []
+
+    for i, (chunk_from, chunk_to) in enumerate(chunks):
+        if chunk_from.isoformat() in finished:
+            continue
+        if max_seconds is not None and time.perf_counter() - started >= max_seconds:
+            logging.info(f"Backfill {job_id}: time budget reached, stopping before {chunk_from}")
+            break
+        if on_chunk:
+            on_chunk(i, len(chunks), chunk_from, chunk_to)
+        try:
+            success, records, message = fetch(chunk_from, chunk_to)
+            if not success:
+                failed.append((chunk_from, chunk_to, message))
+                continue
+            written, errors = write(records or [])
+        except Exception as e:
+            logging.error(f"Backfill {job_id}: chunk {chunk_from}..{chunk_to} failed: {e}")
+            failed.append((chunk_from, chunk_to, str(e)))
+            continue
+        # The chunk's records go out of scope here, before the next fetch
+        records = None
+        rows += written
+        if errors:
+            failed.append((chunk_from, chunk_to, f"{errors} rows failed"))
+            continue
+        mark_chunk_done(supabase, job_id, chunk_from, chunk_to, written)
+        done += 1
+
+    remaining = len(chunks) - resumed - done
+    seconds = round(time.perf_counter() - started, 1)
+    logging.info(f"Backfill {job_id}: {done} chunks written, {resumed} resumed, {remaining} remaining in {seconds}s")
+    return {
+        "success": not failed,
+        "complete": remaining == 0,
+        "message": f"{resumed + done} of {len(chunks)} chunks done ({done} this run, {rows} rows written); "
+                   f"{remaining} remaining, {len(failed)} failed",
+        "job_id": job_id,
+        "chunks": len(chunks),
+        "done": done,
+        "resumed": resumed,
+        "remaining": remaining,
+        "rows": rows,
+        "failed": failed,
+    }
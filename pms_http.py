@@ -0,0 +1,384 @@
+"""
+pms_http.py - Shared request throttling and retry policy for the PMS API clients
+
+Syncing several hotels at once fans requests out over a thread pool, and
+the PMS must not see more than it tolerates. Every client request goes
+through throttled(url), which per host:
+
+- takes a token from a token bucket (HOST_LIMITS rate per second, with a
+  burst allowance), so the request rate stays flat however many threads run;
+- holds one of max_concurrent slots while the request is in flight.
+
+send() wraps one request in the retry policy all clients share. Timeouts,
+connection errors, 429 and 5xx responses are retried with exponential
+backoff and full jitter (a random wait up to BACKOFF_BASE * 2^attempt,
+capped at BACKOFF_MAX); a Retry-After header is honoured instead, up to
+RETRY_AFTER_MAX. After FAILURES_TO_OPEN consecutive failures a host's
+circuit opens and requests fail fast with CircuitOpenError for
+OPEN_SECONDS, then a trial request decides whether it closes again.
+request() is what the clients call: send() plus the mapping of transport
+errors and status codes to the (success, data, message) tuples they return.
+
+All clients send over get_session(), one requests.Session cached with
+st.cache_resource: its mounted HTTPAdapter keeps a sized pool of keep-alive
+connections per host and asks for compressed responses, so recreating a
+client on a Streamlit rerun no longer opens new TLS connections.
+connection_stats() reports how often connections were reused.
+
+Limits, circuits and the session are process-wide: all Streamlit sessions
+and sync threads share them.
+"""
+
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+import logging
+import threading
+import time
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from tenacity import Retrying, retry_if_exception_type, stop_after_attempt, wait_random_exponential
+import stayflexi_config
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+class HostLimit(NamedTuple):
+    rate: float            # requests per second
+    burst: int             # requests allowed back to back
+    max_concurrent: int    # requests in flight at once
+
+
+HOST_LIMITS: Dict[str, HostLimit] = {
+    "api.stayflexi.com": HostLimit(
+        stayflexi_config.STAYFLEXI_RATE_PER_SECOND,
+        stayflexi_config.STAYFLEXI_RATE_BURST,
+        stayflexi_config.STAYFLEXI_MAX_PER_HOST,
+    ),
+}
+
+# Hosts without an entry above
+DEFAULT_LIMIT = HostLimit(rate=5.0, burst=5, max_concurrent=4)
+
+# Retries: full-jitter exponential backoff, and the longest Retry-After obeyed
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+RETRY_AFTER_MAX = 60.0
+
+# Circuit breaker: consecutive failures that open a host's circuit, and for how long
+FAILURES_TO_OPEN = 5
+OPEN_SECONDS = 60.0
+
+# Hosts whose connection pools are kept, and keep-alive connections per host
+# (one per request the throttle lets in flight)
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = max(limit.max_concurrent for limit in (DEFAULT_LIMIT, *HOST_LIMITS.values()))
+
+USER_AGENT = "TIE-Reservation-System/1.0"
+
+# Seconds spent waiting for a token or a slot, by host
+THROTTLE_WAITS = Counter()
+
+# Responses received, and those sent compressed, by host
+RESPONSES = Counter()
+COMPRESSED_RESPONSES = Counter()
+
+# Retries made and circuits opened, by host
+RETRIES = Counter()
+CIRCUIT_OPENS = Counter()
+
+# ============================================================================
+# LIMITERS
+# ============================================================================
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, holding at most `capacity`."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token, sleeping until one is available; returns the seconds waited."""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while its host's circuit is open."""
+
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"{host} is failing; requests paused for another {retry_in:.0f}s")
+        self.host = host
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker. Open for OPEN_SECONDS after
+    FAILURES_TO_OPEN failures; afterwards requests go through again, and the
+    first failure re-opens it while the first success closes it.
+    """
+
+    def __init__(self, host: str, failures_to_open: int = FAILURES_TO_OPEN, open_seconds: float = OPEN_SECONDS):
+        self.host = host
+        self.failures_to_open = failures_to_open
+        self.open_seconds = open_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.lock = threading.Lock()
+
+    def check(self) -> None:
+        """Raise CircuitOpenError while the circuit is open."""
+        with self.lock:
+            if self.opened_at is None:
+                return
+            retry_in = self.opened_at + self.open_seconds - time.monotonic()
+        if retry_in > 0:
+            raise CircuitOpenError(self.host, retry_in)
+
+    def record_success(self) -> None:
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self) -> None:
+        with self.lock:
+            now = time.monotonic()
+            self.failures += 1
+            is_open = self.opened_at is not None and now - self.opened_at < self.open_seconds
+            trial = self.opened_at is not None and not is_open
+            if trial or self.failures >= self.failures_to_open:
+                if not is_open:
+                    CIRCUIT_OPENS[self.host] += 1
+                    logging.warning(f"pms_http: circuit for {self.host} opened after {self.failures} failures")
+                self.opened_at = now
+
+
+class _HostThrottle:
+    __slots__ = ("bucket", "slots", "breaker")
+
+    def __init__(self, host: str, limit: HostLimit):
+        self.bucket = TokenBucket(limit.rate, limit.burst)
+        self.slots = threading.BoundedSemaphore(limit.max_concurrent)
+        self.breaker = CircuitBreaker(host)
+
+
+_throttles: Dict[str, _HostThrottle] = {}
+_throttles_lock = threading.Lock()
+
+def _throttle_for(host: str) -> _HostThrottle:
+    with _throttles_lock:
+        throttle = _throttles.get(host)
+        if throttle is None:
+            throttle = _throttles[host] = _HostThrottle(host, HOST_LIMITS.get(host, DEFAULT_LIMIT))
+        return throttle
+
+@contextmanager
+def throttled(url: str):
+    """Hold a concurrency slot and a rate token for `url`'s host for the duration of one request."""
+    host = urlsplit(url).hostname or ""
+    throttle = _throttle_for(host)
+    started = time.monotonic()
+    with throttle.slots:
+        throttle.bucket.acquire()
+        waited = time.monotonic() - started
+        if waited > 0.01:
+            THROTTLE_WAITS[host] += waited
+            logging.debug(f"pms_http: waited {waited:.2f}s for {host}")
+        yield
+
+# ============================================================================
+# TRANSPORT
+# ============================================================================
+
+@st.cache_resource(show_spinner=False)
+def get_session() -> requests.Session:
+    """HTTP session shared by every PMS client: pooled keep-alive connections, compressed responses."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "Accept-Encoding": "gzip, deflate",
+        "Connection": "keep-alive",
+        "User-Agent": USER_AGENT,
+    })
+    return session
+
+def connection_stats() -> List[Dict]:
+    """Per host: connections opened, requests sent, requests on a reused connection and compressed responses."""
+    by_host: Dict[str, Dict] = {}
+    for adapter in dict.fromkeys(get_session().adapters.values()):
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            entry = by_host.setdefault(pool.host, {"host": pool.host, "connections": 0, "requests": 0})
+            entry["connections"] += pool.num_connections
+            entry["requests"] += pool.num_requests
+    for entry in by_host.values():
+        entry["reused"] = max(0, entry["requests"] - entry["connections"])
+        entry["reuse_ratio"] = round(entry["reused"] / entry["requests"], 3) if entry["requests"] else 0.0
+        entry["compressed"] = COMPRESSED_RESPONSES[entry["host"]]
+        entry["responses"] = RESPONSES[entry["host"]]
+    return sorted(by_host.values(), key=lambda entry: entry["host"])
+
+# ============================================================================
+# RETRY POLICY
+# ============================================================================
+
+class RetryableStatus(Exception):
+    """A 429 or 5xx response, raised so the retry policy sees it."""
+
+    def __init__(self, response: requests.Response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+
+
+def retry_after_seconds(response: requests.Response) -> Optional[float]:
+    """Seconds asked for by a Retry-After header (delta-seconds or HTTP date), or None."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+_backoff = wait_random_exponential(multiplier=BACKOFF_BASE, max=BACKOFF_MAX)
+
+def _wait(retry_state) -> float:
+    """Retry-After when the server sent one, full-jitter exponential backoff otherwise."""
+    error = retry_state.outcome.exception()
+    if isinstance(error, RetryableStatus):
+        retry_after = retry_after_seconds(error.response)
+        if retry_after is not None:
+            return min(retry_after, RETRY_AFTER_MAX)
+    return _backoff(retry_state)
+
+def send(session: requests.Session, method: str, url: str, attempts: int = 3, **kwargs) -> requests.Response:
+    """
+    Send one request under the shared throttle, retry policy and circuit breaker.
+
+    Returns the final response, which is a 429/5xx one if every attempt got
+    one. Timeouts and connection errors are re-raised after the last attempt;
+    CircuitOpenError is raised without sending while the host's circuit is open.
+    """
+    host = urlsplit(url).hostname or ""
+    breaker = _throttle_for(host).breaker
+
+    def attempt() -> requests.Response:
+        breaker.check()
+        try:
+            with throttled(url):
+                response = session.request(method, url, **kwargs)
+        except (requests.Timeout, requests.ConnectionError):
+            breaker.record_failure()
+            raise
+        RESPONSES[host] += 1
+        if response.headers.get("Content-Encoding"):
+            COMPRESSED_RESPONSES[host] += 1
+        if response.status_code >= 500:
+            breaker.record_failure()
+            raise RetryableStatus(response)
+        # A 429 means slow down, not that the host is down
+        breaker.record_success()
+        if response.status_code == 429:
+            raise RetryableStatus(response)
+        return response
+
+    def log_retry(retry_state) -> None:
+        RETRIES[host] += 1
+        logging.warning(
+            f"pms_http: {method} {url} failed ({retry_state.outcome.exception()}), "
+            f"attempt {retry_state.attempt_number}/{attempts}; retrying in {retry_state.next_action.sleep:.1f}s"
+        )
+
+    retrying = Retrying(
+        stop=stop_after_attempt(max(1, attempts)),
+        wait=_wait,
+        retry=retry_if_exception_type((RetryableStatus, requests.Timeout, requests.ConnectionError)),
+        before_sleep=log_retry,
+        reraise=True,
+    )
+    try:
+        return retrying(attempt)
+    except RetryableStatus as e:
+        return e.response
+
+# ============================================================================
+# CLIENT REQUESTS
+# ============================================================================
+
+def request(session: requests.Session, method: str, url: str, label: str,
+            attempts: int = 3, **kwargs) -> Tuple[bool, Optional[Dict], str]:
+    """
+    send() one request for a PMS client and describe the outcome.
+
+    `label` names the service in messages (e.g. "StayFlexi"). Returns
+    (success, parsed JSON body or None, message); a body that is not JSON
+    comes back as {"raw_response": text}. Never raises.
+    """
+    try:
+        response = send(session, method, url, attempts=attempts, **kwargs)
+    except CircuitOpenError as e:
+        return False, None, f"{label} unavailable: {str(e)}"
+    except requests.Timeout:
+        return False, None, f"Request timeout. {label} server may be unavailable."
+    except requests.ConnectionError as e:
+        return False, None, f"Connection error: {str(e)}"
+    except Exception as e:
+        logging.error(f"pms_http: unexpected error calling {label}: {str(e)}")
+        return False, None, f"Unexpected error: {str(e)}"
+
+    status = response.status_code
+    if status == 401:
+        return False, None, f"Authentication failed. Check your {label} credentials."
+    elif status == 403:
+        return False, None, "Access forbidden. Check your permissions."
+    elif status == 404:
+        return False, None, "Endpoint not found."
+    elif status == 429:
+        return False, None, f"Rate limited by {label}. Please try again later."
+    elif status >= 500:
+        return False, None, f"{label} server error. Please try again later."
+    elif status >= 400:
+        try:
+            error_msg = response.json().get("message", response.text)
+        except Exception:
+            error_msg = response.text
+        return False, None, f"Request failed: {error_msg}"
+
+    if status == 204:
+        return True, {"status": "success"}, "Operation successful"
+    try:
+        return True, response.json(), "Success"
+    except ValueError:
+        return True, {"raw_response": response.text}, "Success"
@@ -0,0 +1,85 @@
+"""
+property_inventory.py - Room inventory of every property
+
+One immutable model of each property's rooms, built once at import and
+shared by Daily Status, NRD, Summary, Target and the Dashboard. Occupancy
+code asks it "is this a room of the property?", "how many rooms can be
+sold?" and "is it a three-bedroom?" as dict/set lookups instead of
+re-deriving lower-cased lists and Day Use / No Show exclusions per call.
+"""
+
+from types import MappingProxyType
+from typing import Iterable, Mapping, Optional, Tuple
+from property_registry import canonical_name
+
+# Rooms per property, in display order. "Day Use n" and "No Show" are
+# pseudo-rooms: bookings can be placed on them but they are not sold stock.
+ROOM_LISTS = {
+    "Le Poshe Beach view": {"all": ["101","102","201","202","203","204","301","302","303","304","Day Use 1","Day Use 2","No Show"],"three_bedroom":["203","204"]},
+    "La Millionaire Resort": {"all": ["101","102","103","105","201","202","203","204","205","206","207","208","301","302","303","304","305","306","307","308","401","402","Day Use 1","Day Use 2","Day Use 3","Day Use 4","Day Use 5","No Show"],"three_bedroom":["203","204","205"]},
+    "Le Poshe Luxury": {"all": ["101","102","201","202","203","204","205","301","302","303","304","305","401","402","403","404","405","501","Day Use 1","Day Use 2","No Show"],"three_bedroom":["203","204","205"]},
+    "Le Poshe Suite": {"all": ["601","602","603","604","701","702","703","704","801","Day Use 1","Day Use 2","No Show"],"three_bedroom":[]},
+    "La Paradise Residency": {"all": ["101","102","103","201","202","203","301","302","303","304","Day Use 1","Day Use 2","No Show"],"three_bedroom":["203"]},
+    "La Paradise Luxury": {"all": ["101","102","103","201","202","203","Day Use 1","Day Use 2","No Show"],"three_bedroom":["203"]},
+    "La Villa Heritage": {"all": ["101","102","103","201","202","203","301","Day Use 1","Day Use 2","No Show"],"three_bedroom":["203"]},
+    "Le Pondy Beachside": {"all": ["101","102","201","202","Day Use 1","Day Use 2","No Show"],"three_bedroom":[]},
+    "Le Royce Villa": {"all": ["101","102","201","202","Day Use 1","Day Use 2","No Show"],"three_bedroom":[]},
+    "La Tamara Luxury": {"all": ["101","102","103","104","105","106","201","202","203","204","205","206","301","302","303","304","305","306","401","402","403","404","Day Use 1","Day Use 2","No Show"],"three_bedroom":["203","204","205","206"]},
+    "La Antilia Luxury": {"all": ["101","201","202","203","204","301","302","303","304","401","Day Use 1","Day Use 2","No Show"],"three_bedroom":["203","204"]},
+    "La Tamara Suite": {"all": ["101","102","103","104","201","202","203","204","205","206","Day Use 1","Day Use 2","No Show"],"three_bedroom":["203","204","205","206"]},
+    "Le Park Resort": {"all": ["111","222","333","444","555","666","Day Use 1","Day Use 2","No Show"],"three_bedroom":[]},
+    "Villa Shakti": {"all": ["101","102","201","201A","202","203","301","301A","302","303","401","Day Use 1","Day Use 2","No Show"],"three_bedroom":["203"]},
+    "Eden Beach Resort": {"all": ["101","102","103","201","202","Day Use 1","Day Use 2","No Show"],"three_bedroom":[]},
+    "Le Terra": {"all": ["101","102","103","104","105","106","107","Day Use 1","Day Use 2","No Show"],"three_bedroom":[]},
+    "La Coromandel Luxury": {"all": ["101","102","103","201","202","203","204","205","206","301","Day Use 1","Day Use 2","No Show"],"three_bedroom":[]},
+    "Happymates Forest Retreat": {"all": ["101","102","Day Use 1","Day Use 2","No Show"],"three_bedroom":[]}
+}
+
+DAY_USE_PREFIX = "Day Use"
+NO_SHOW_PREFIX = "No Show"
+
+
+class PropertyInventory:
+    """Precompiled, read-only room inventory of one property."""
+
+    __slots__ = ("name", "rooms", "room_index", "lookup", "day_use", "no_show",
+                 "three_bedroom", "sellable", "sellable_count")
+
+    def __init__(self, name: str, rooms: Iterable[str], three_bedroom: Iterable[str] = ()):
+        self.name = name
+        self.rooms: Tuple[str, ...] = tuple(rooms)
+        # room -> position in display order
+        self.room_index: Mapping[str, int] = MappingProxyType({room: i for i, room in enumerate(self.rooms)})
+        # stripped, lower-cased room number as typed on a booking -> inventory room
+        self.lookup: Mapping[str, str] = MappingProxyType({room.strip().lower(): room for room in self.rooms})
+        self.day_use = frozenset(room for room in self.rooms if room.startswith(DAY_USE_PREFIX))
+        self.no_show = frozenset(room for room in self.rooms if room.startswith(NO_SHOW_PREFIX))
+        self.three_bedroom = frozenset(three_bedroom)
+        self.sellable: Tuple[str, ...] = tuple(
+            room for room in self.rooms if room not in self.day_use and room not in self.no_show
+        )
+        self.sellable_count = len(self.sellable)
+
+    def __setattr__(self, attr, value):
+        if hasattr(self, attr):
+            raise AttributeError(f"PropertyInventory.{attr} is read-only")
+        object.__setattr__(self, attr, value)
+
+    def resolve(self, room_no) -> Optional[str]:
+        """Inventory room for a room number as entered on a booking (None if unknown)."""
+        return self.lookup.get(str(room_no).strip().lower())
+
+    def is_sellable(self, room: str) -> bool:
+        return room in self.room_index and room not in self.day_use and room not in self.no_show
+
+
+INVENTORY: Mapping[str, PropertyInventory] = MappingProxyType({
+    prop: PropertyInventory(prop, data["all"], data.get("three_bedroom", ()))
+    for prop, data in ROOM_LISTS.items()
+})
+
+EMPTY_INVENTORY = PropertyInventory("", ())
+
+def get_inventory(prop: str) -> PropertyInventory:
+    """Inventory of `prop` under any of its registered names; empty if unknown."""
+    return INVENTORY.get(prop) or INVENTORY.get(canonical_name(prop), EMPTY_INVENTORY)
@@ -0,0 +1,116 @@
+"""
+property_registry.py - Canonical property identities
+
+Bookings carry the property name as whoever entered it typed it, or as the
+PMS spells it ("Le Poshe Beach View", "La Millionaire Luxury Resort",
+"Le Pondy Beach Side", ...). Each property is registered once here with a
+small numeric ID, its canonical name, the other names it is stored under and
+its StayFlexi hotelId. Names are resolved through a memoized lookup, and
+booking_repository stamps canonical names and IDs on rows when they are
+loaded, so reports don't rewrite every booking on each render.
+"""
+
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# Field added to canonicalized rows: the property's numeric ID (None if unknown)
+PROPERTY_ID_FIELD = "property_id"
+
+
+class Property(NamedTuple):
+    id: int
+    name: str
+    synonyms: Tuple[str, ...] = ()
+    hotel_id: Optional[str] = None
+
+
+PROPERTIES: Tuple[Property, ...] = (
+    Property(1, "Le Poshe Beach view", ("Le Poshe Beach View", "Le Poshe Beach VIEW", "Le Poshe Beachview"), "27719"),
+    Property(2, "La Millionaire Resort", ("La Millionaire Luxury Resort", "Millionaire"), "31550"),
+    Property(3, "Le Poshe Luxury", ("Le Poshe Luxury Resort",), "27720"),
+    Property(4, "Le Poshe Suite", ("Le Poshe Suite Resort",), "27721"),
+    Property(5, "La Paradise Residency", (), "27707"),
+    Property(6, "La Paradise Luxury", ("La Paradise Luxury Resort",), "27706"),
+    Property(7, "La Villa Heritage", (), "27711"),
+    Property(8, "Le Pondy Beachside", ("Le Pondy Beach Side",), "27723"),
+    Property(9, "Le Royce Villa", (), "27722"),
+    Property(10, "La Tamara Luxury", ("La Tamara Luxury Resort",), "27709"),
+    Property(11, "La Antilia Luxury", (), "27704"),
+    Property(12, "La Tamara Suite", (), "27710"),
+    Property(13, "Le Park Resort", (), "32470"),
+    Property(14, "Villa Shakti", ("Villa Shakti Resort",), "27724"),
+    Property(15, "Eden Beach Resort", (), "30357"),
+    Property(16, "Le Terra", ("Le Teera",)),
+    Property(17, "La Coromandel Luxury", ("La Coromandel Luxury Resort",)),
+    Property(18, "Happymates Forest Retreat", ()),
+)
+
+_BY_ID: Dict[int, Property] = {p.id: p for p in PROPERTIES}
+_BY_HOTEL_ID: Dict[str, Property] = {p.hotel_id: p for p in PROPERTIES if p.hotel_id}
+# Canonical names and synonyms, matched case-insensitively
+_BY_NAME: Dict[str, Property] = {
+    name.casefold(): p for p in PROPERTIES for name in (p.name,) + p.synonyms
+}
+
+# ============================================================================
+# RESOLUTION
+# ============================================================================
+
+@lru_cache(maxsize=1024)
+def resolve_property(name) -> Optional[Property]:
+    """Registered property for any of its names (case and surrounding spaces ignored)."""
+    if not isinstance(name, str):
+        return None
+    return _BY_NAME.get(name.strip().casefold())
+
+def canonical_name(name):
+    """Canonical name of `name`; unknown names come back stripped, non-strings unchanged."""
+    prop = resolve_property(name)
+    if prop is not None:
+        return prop.name
+    return name.strip() if isinstance(name, str) else name
+
+def property_id(name) -> Optional[int]:
+    prop = resolve_property(name)
+    return prop.id if prop is not None else None
+
+def get_property(prop_id: int) -> Optional[Property]:
+    return _BY_ID.get(prop_id)
+
+def property_for_hotel(hotel_id) -> Optional[Property]:
+    """Property of a StayFlexi hotelId."""
+    return _BY_HOTEL_ID.get(str(hotel_id))
+
+def stayflexi_hotel_ids() -> List[str]:
+    """hotelIds of every property synced from StayFlexi, in registry order."""
+    return [p.hotel_id for p in PROPERTIES if p.hotel_id]
+
+def stored_names(name: str) -> List[str]:
+    """Every name a property's rows may be stored under, canonical first (for `.in_()` filters)."""
+    prop = resolve_property(name)
+    if prop is None:
+        return [canonical_name(name)]
+    return [prop.name, *prop.synonyms]
+
+# ============================================================================
+# INGESTION
+# ============================================================================
+
+def canonicalize(rows: Iterable[Dict], column: str) -> None:
+    """Rewrite `column` of each row to its canonical name and set PROPERTY_ID_FIELD, in place."""
+    for row in rows:
+        prop = resolve_property(row.get(column))
+        if prop is not None:
+            row[column] = prop.name
+            row[PROPERTY_ID_FIELD] = prop.id
+        else:
+            row[PROPERTY_ID_FIELD] = None
+
+def group_by_property(rows: Iterable[Dict], column: str) -> Dict[str, List[Dict]]:
+    """Rows grouped by the value of `column` in one pass (rows without one are skipped)."""
+    groups: Dict[str, List[Dict]] = {}
+    for row in rows:
+        name = row.get(column)
+        if name:
+            groups.setdefault(name, []).append(row)
+    return groups
@@ -0,0 +1,126 @@
+"""
+report_cache.py - On-disk cache of generated report files
+
+Accounts mostly download reports for closed months whose bookings no longer
+change, yet every click rebuilt the workbook from scratch. Generated files
+are stored here keyed by (report type, property set, period, data version)
+and served straight from disk until the data behind them changes.
+
+The reservation tables have no updated_at column, so the data version is a
+SHA-256 digest of the rows (or table) the report is built from: any edit to
+a contributing booking gives a new key, and stale files are simply never
+read again. The directory is capped at MAX_CACHE_BYTES, evicting the least
+recently used files.
+"""
+
+from collections.abc import Mapping
+from datetime import date, datetime
+from typing import Any, Callable, Iterable, Optional
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import pandas as pd
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+CACHE_DIR = os.environ.get("TIE_REPORT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "tie_report_cache"))
+
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+
+# Bump when a report's layout changes so files built by older code are not served
+CACHE_FORMAT = 1
+
+# ============================================================================
+# KEYS
+# ============================================================================
+
+def _encode(value: Any):
+    if isinstance(value, Mapping):
+        return dict(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    return str(value)
+
+def data_version(data: Any) -> str:
+    """Digest of JSON-like report input (lists/dicts of rows, booking records, metrics)."""
+    payload = json.dumps(data, default=_encode, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def frame_version(df: pd.DataFrame) -> str:
+    """Digest of a DataFrame's columns and cell values."""
+    digest = hashlib.sha256(json.dumps([str(c) for c in df.columns]).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return digest.hexdigest()
+
+def artifact_key(report_type: str, props: Iterable[str], period: str, version: str) -> str:
+    """Cache key of one generated file."""
+    parts = [str(CACHE_FORMAT), report_type, "|".join(sorted(props)), period, version]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+# ============================================================================
+# STORAGE
+# ============================================================================
+
+def _path(key: str) -> str:
+    return os.path.join(CACHE_DIR, f"{key}.bin")
+
+def get_artifact(key: str) -> Optional[bytes]:
+    """Cached file for `key`, or None."""
+    try:
+        with open(_path(key), "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    try:
+        os.utime(_path(key))   # mark as recently used for eviction
+    except OSError:
+        pass
+    return data
+
+def put_artifact(key: str, data: bytes) -> None:
+    """Store `data` under `key` (atomically); failures are logged, never raised."""
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, _path(key))
+        _evict()
+    except OSError as e:
+        logging.warning(f"report_cache: could not store {key}: {e}")
+
+def _evict() -> None:
+    """Delete least recently used files until the cache fits MAX_CACHE_BYTES."""
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        if not name.endswith(".bin"):
+            continue
+        info = os.stat(os.path.join(CACHE_DIR, name))
+        entries.append((info.st_mtime, info.st_size, name))
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= MAX_CACHE_BYTES:
+            break
+        try:
+            os.remove(os.path.join(CACHE_DIR, name))
+            total -= size
+        except OSError:
+            pass
+
+def cached_artifact(report_type: str, props: Iterable[str], period: str, version: str,
+                    build: Callable[[], bytes]) -> bytes:
+    """Serve the cached file for these inputs, or build, store and return it."""
+    key = artifact_key(report_type, props, period, version)
+    data = get_artifact(key)
+    if data is None:
+        data = build()
+        put_artifact(key, data)
+    else:
+        logging.info(f"report_cache: served {report_type} {period} from cache")
+    return data
@@ -0,0 +1,153 @@
+"""
+report_jobs.py - Background report generation
+
+Building a month's Excel workbook is CPU-bound, so generating a year of
+reports inside the Streamlit script run blocked the page for the sum of all
+months. Jobs submitted here run on a shared process pool (one worker per
+core, up to REPORT_WORKERS) and are tracked in st.session_state, so the page
+stays responsive and each file can be downloaded as soon as it is built.
+
+Job functions must be importable without Streamlit or a database connection
+(e.g. monthly_report.generate_monthly_report): workers are spawned fresh, and
+callers load the data in the app process and pass it in.
+"""
+
+import streamlit as st
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+import logging
+import multiprocessing
+import os
+import time
+import report_cache
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+REPORT_WORKERS = max(1, min(6, os.cpu_count() or 1))
+
+# Seconds between refreshes of the jobs panel while jobs are running
+POLL_SECONDS = 2
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+_JOBS_KEY = "report_jobs"
+
+# ============================================================================
+# POOL & QUEUE
+# ============================================================================
+
+@st.cache_resource(show_spinner=False)
+def get_report_pool() -> ProcessPoolExecutor:
+    """Process pool shared by every session; spawned so workers don't inherit Streamlit's threads."""
+    return ProcessPoolExecutor(max_workers=REPORT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+def get_jobs() -> Dict[str, Dict]:
+    """This session's jobs by key, in submission order."""
+    if _JOBS_KEY not in st.session_state:
+        st.session_state[_JOBS_KEY] = {}
+    return st.session_state[_JOBS_KEY]
+
+def submit_report(key: str, label: str, filename: str, build: Callable[..., bytes], *args: Any,
+                  cache_key: Optional[str] = None) -> Dict:
+    """
+    Queue `build(*args)` (returning the file bytes) under `key`.
+
+    A job with the same key that is still running or finished successfully
+    is reused instead of being submitted again. With `cache_key`, a file
+    already in report_cache is served as a finished job, and a newly built
+    one is stored there.
+    """
+    jobs = get_jobs()
+    job = jobs.get(key)
+    if job is not None and job.get("cache_key") == cache_key and \
+            not (job["future"].done() and job["future"].exception() is not None):
+        return job
+    cached = report_cache.get_artifact(cache_key) if cache_key else None
+    if cached is not None:
+        future = Future()
+        future.set_result(cached)
+        job = {"label": label, "filename": filename, "future": future, "submitted": time.time(),
+               "cache_key": cache_key, "stored": True}
+        jobs[key] = job
+        return job
+    try:
+        future = get_report_pool().submit(build, *args)
+    except BrokenProcessPool:
+        # A worker died (e.g. out of memory); start a fresh pool
+        get_report_pool.clear()
+        future = get_report_pool().submit(build, *args)
+    job = {"label": label, "filename": filename, "future": future, "submitted": time.time(),
+           "cache_key": cache_key, "stored": False}
+    jobs[key] = job
+    logging.info(f"report_jobs: submitted {key}")
+    return job
+
+def clear_jobs(finished_only: bool = True) -> None:
+    """Forget finished jobs (or all jobs; running ones still complete in the pool)."""
+    jobs = get_jobs()
+    for key in [k for k, job in jobs.items() if job["future"].done() or not finished_only]:
+        del jobs[key]
+
+def pending_count() -> int:
+    return sum(1 for job in get_jobs().values() if not job["future"].done())
+
+# ============================================================================
+# UI
+# ============================================================================
+
+def _job_result(future: Future):
+    """(bytes, None) for a finished job, or (None, error message)."""
+    e = future.exception()
+    if e is not None:
+        return None, str(e)
+    return future.result(), None
+
+def show_report_jobs(key_prefix: str = "report_job") -> None:
+    """Progress and download buttons for this session's jobs; refreshes itself while any are running."""
+    if not get_jobs():
+        return
+
+    polling = pending_count() > 0
+
+    @st.fragment(run_every=POLL_SECONDS if polling else None)
+    def panel():
+        jobs = get_jobs()
+        if not jobs:
+            return
+        done = sum(1 for job in jobs.values() if job["future"].done())
+        st.progress(done / len(jobs), text=f"{done} of {len(jobs)} reports ready")
+
+        for key, job in jobs.items():
+            future = job["future"]
+            if not future.done():
+                elapsed = time.time() - job["submitted"]
+                st.caption(f"⏳ {job['label']} — generating ({elapsed:.0f}s)")
+                continue
+            data, error = _job_result(future)
+            if error is not None:
+                st.error(f"❌ Failed for {job['label']}: {error}")
+                continue
+            if job["cache_key"] and not job["stored"]:
+                report_cache.put_artifact(job["cache_key"], data)
+                job["stored"] = True
+            st.download_button(
+                label=f"⬇️ {job['label']}",
+                data=data,
+                file_name=job["filename"],
+                mime=XLSX_MIME,
+                key=f"{key_prefix}_{key}",
+            )
+
+        if done < len(jobs):
+            return
+        if polling:
+            # Everything finished: rerun the page once so the panel stops polling
+            st.rerun()
+        if st.button("Clear finished reports", key=f"{key_prefix}_clear"):
+            clear_jobs()
+            st.rerun()
+
+    panel()
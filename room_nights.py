@@ -0,0 +1,89 @@
+"""
+room_nights.py - Room-night table behind the month reports
+
+The Summary, Target and NRD reports all answer "what was sold, for how much,
+per property per day". Instead of re-running each report's day filter and
+room allocation for every metric of every cell, the bookings are expanded
+once into a room-night table (one row per assigned room per night) and every
+metric for every property x day comes out of a single groupby.
+
+Each report passes its own room allocation and value mapping, so overbooked
+or unknown rooms are dropped and amounts are computed exactly as before.
+"""
+
+from datetime import date
+from typing import Callable, Dict, Iterable, List, Tuple
+import pandas as pd
+from booking_index import BookingIndex
+
+# Money/pax columns a report's value mapping may fill (missing ones are 0)
+VALUE_COLUMNS = ["per_night", "room_charges", "gst", "commission", "tax", "pax"]
+
+# Columns only counted on the check-in night of a booking's primary room
+CHECK_IN_COLUMNS = ["room_charges", "gst", "commission", "tax"]
+
+ROOM_NIGHT_COLUMNS = ["property", "date", "room", "booking_id", "mob",
+                      "is_primary", "is_check_in_day"] + VALUE_COLUMNS
+
+METRIC_COLUMNS = ["rooms_sold", "room_nights"] + VALUE_COLUMNS
+
+Allocator = Callable[[List[Dict], str], Tuple[List[Dict], List[Dict]]]
+MonthAllocation = Callable[[str, BookingIndex, List[date]], Iterable[Tuple[date, List[Dict], List[Dict]]]]
+ValueMapping = Callable[[Dict], Dict]
+
+
+def per_day(assign: Allocator) -> MonthAllocation:
+    """Month allocation that runs the per-day allocator `assign(daily, prop)` on each day."""
+    def allocate(prop: str, index: BookingIndex, dates: List[date]):
+        for day in dates:
+            daily = index.active_on(day)
+            if daily:
+                yield (day, *assign(daily, prop))
+    return allocate
+
+
+def build_room_nights(bookings: Dict[str, BookingIndex], dates: Iterable[date],
+                      allocate: MonthAllocation, values: ValueMapping) -> pd.DataFrame:
+    """
+    Expand bookings into one row per assigned room per night.
+
+    `allocate(prop, index, dates)` yields (day, assigned, overbooked) per day,
+    e.g. per_day(assign_inventory_numbers) or a month_allocator sweep; only
+    assigned rows become room-nights. `values(row)` maps an assigned row to
+    VALUE_COLUMNS and an optional "mob".
+    """
+    dates = list(dates)
+    records = []
+    for prop, index in bookings.items():
+        for day, assigned, _ in allocate(prop, index, dates):
+            for row in assigned:
+                mapped = values(row)
+                records.append((
+                    prop, day, row.get("assigned_room"), row.get("booking_id"),
+                    mapped.get("mob", ""),
+                    bool(row.get("is_primary", True)),
+                    date.fromisoformat(row["check_in"]) == day,
+                    *(mapped.get(column, 0.0) for column in VALUE_COLUMNS),
+                ))
+    return pd.DataFrame.from_records(records, columns=ROOM_NIGHT_COLUMNS)
+
+
+def daily_metrics(room_nights: pd.DataFrame, props: List[str], dates: List[date]) -> pd.DataFrame:
+    """
+    Sum the room-night table per (property, date).
+
+    rooms_sold counts distinct rooms and room_nights counts rows. CHECK_IN_COLUMNS
+    only count on the check-in night of a primary room; per_night and pax count
+    on every row. Every property x date is present, with zeros when nothing sold.
+    """
+    counted = room_nights["is_primary"] & room_nights["is_check_in_day"]
+    frame = room_nights.assign(**{
+        column: room_nights[column].where(counted, 0.0) for column in CHECK_IN_COLUMNS
+    })
+    grouped = frame.groupby(["property", "date"])
+    metrics = grouped[VALUE_COLUMNS].sum().astype(float)
+    metrics["room_nights"] = grouped.size()
+    metrics["rooms_sold"] = grouped["room"].nunique()
+
+    full_index = pd.MultiIndex.from_product([props, dates], names=["property", "date"])
+    return metrics.reindex(full_index, fill_value=0)[METRIC_COLUMNS]
@@ -34,10 +34,20 @@ STAYFLEXI_ENDPOINTS = {
     "get_invoice_items": "/getInvoiceItems",
 }
 
+# Hotels whose CM service key differs from STAYFLEXI_API_KEY (hotelId -> key)
+STAYFLEXI_HOTEL_API_KEYS = {}
+
 # Timeout and retry settings
 STAYFLEXI_TIMEOUT = 30  # seconds
 STAYFLEXI_MAX_RETRIES = 3
 
+# Multi-hotel sync: fetch threads, days per request, and limits per API host
+STAYFLEXI_MAX_WORKERS = 8
+STAYFLEXI_CHUNK_DAYS = 31
+STAYFLEXI_RATE_PER_SECOND = 5.0
+STAYFLEXI_RATE_BURST = 5
+STAYFLEXI_MAX_PER_HOST = 4
+
 # Database table mappings for Supabase
 STAYFLEXI_TABLES = {
     "bookings": "reservations",
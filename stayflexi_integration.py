@@ -4,16 +4,23 @@ Handles API connections, authentication, data fetching, and booking synchronizat
 Saves data to the existing online_reservations table
 """
 
-import requests
 import streamlit as st
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 import json
 import logging
+import time
 from functools import wraps
 
 import stayflexi_config as config
+import pms_http
+from pms_backfill import date_chunks
+import booking_repository
+import property_registry
+import sync_cursors
+from utils import UPSERT_BATCH_SIZE, existing_keys, upsert_rows
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -23,11 +30,11 @@ logger = logging.getLogger(__name__)
 class StayFlexiAPIConfig:
     """Configuration management for StayFlexi API"""
     
-    def __init__(self):
+    def __init__(self, hotel_id: Optional[str] = None):
         self.api_base_url = config.STAYFLEXI_API_BASE_URL
         self.pms_id = config.STAYFLEXI_PMS_ID
-        self.hotel_id = config.STAYFLEXI_HOTEL_ID
-        self.api_key = config.STAYFLEXI_API_KEY
+        self.hotel_id = str(hotel_id or config.STAYFLEXI_HOTEL_ID)
+        self.api_key = config.STAYFLEXI_HOTEL_API_KEYS.get(self.hotel_id, config.STAYFLEXI_API_KEY)
         self.timeout = config.STAYFLEXI_TIMEOUT
         self.max_retries = config.STAYFLEXI_MAX_RETRIES
     
@@ -50,7 +57,8 @@ class StayFlexiAPIClient:
     
     def __init__(self, config: StayFlexiAPIConfig):
         self.config = config
-        self.session = requests.Session()
+        self.session = pms_http.get_session()
+        self.headers = config.get_headers()
         self.last_error = None
         self.last_sync_time = None
     
@@ -73,79 +81,21 @@ class StayFlexiAPIClient:
         params["pmsId"] = self.config.pms_id
         params["hotelId"] = self.config.hotel_id
         
-        headers = self.config.get_headers()
+        method = method.upper()
+        if method not in ("GET", "POST", "PUT"):
+            return False, None, f"Unsupported HTTP method: {method}"
         
-        for attempt in range(self.config.max_retries):
-            try:
-                if method.upper() == "GET":
-                    response = self.session.get(
-                        url, 
-                        headers=headers, 
-                        params=params,
-                        timeout=self.config.timeout
-                    )
-                elif method.upper() == "POST":
-                    response = self.session.post(
-                        url, 
-                        headers=headers, 
-                        json=data,
-                        params=params,
-                        timeout=self.config.timeout
-                    )
-                elif method.upper() == "PUT":
-                    response = self.session.put(
-                        url, 
-                        headers=headers, 
-                        json=data,
-                        params=params,
-                        timeout=self.config.timeout
-                    )
-                else:
-                    return False, None, f"Unsupported HTTP method: {method}"
-                
-                # Handle response status codes
-                if response.status_code == 401:
-                    return False, None, "Authentication failed. Check your API key."
-                elif response.status_code == 403:
-                    return False, None, "Access forbidden. Check your permissions."
-                elif response.status_code == 404:
-                    return False, None, "Endpoint not found."
-                elif response.status_code >= 500:
-                    if attempt < self.config.max_retries - 1:
-                        logger.warning(f"Server error (attempt {attempt + 1}): {response.status_code}")
-                        continue
-                    return False, None, "Server error. Please try again later."
-                elif response.status_code >= 400:
-                    try:
-                        error_msg = response.json().get("message", response.text)
-                    except:
-                        error_msg = response.text
-                    return False, None, f"Request failed: {error_msg}"
-                
-                # Success
-                if response.status_code == 204:
-                    return True, {"status": "success"}, "Operation successful"
-                
-                try:
-                    return True, response.json(), "Success"
-                except:
-                    return True, {"raw_response": response.text}, "Success"
-                    
-            except requests.Timeout:
-                if attempt < self.config.max_retries - 1:
-                    logger.warning(f"Timeout (attempt {attempt + 1}/{self.config.max_retries})")
-                    continue
-                return False, None, "Request timeout. Server may be unavailable."
-            except requests.ConnectionError as e:
-                if attempt < self.config.max_retries - 1:
-                    logger.warning(f"Connection error (attempt {attempt + 1}): {str(e)}")
-                    continue
-                return False, None, f"Connection error: {str(e)}"
-            except Exception as e:
-                logger.error(f"Unexpected error: {str(e)}")
-                return False, None, f"Unexpected error: {str(e)}"
-        
-        return False, None, "Failed after multiple retry attempts"
+        return pms_http.request(
+            self.session,
+            method,
+            url,
+            "StayFlexi",
+            attempts=self.config.max_retries,
+            headers=self.headers,
+            json=data if method != "GET" else None,
+            params=params,
+            timeout=self.config.timeout
+        )
     
     def test_connection(self) -> Tuple[bool, str]:
         """Test API connection and authentication"""
@@ -246,19 +196,36 @@ class StayFlexiAPIClient:
 class StayFlexiDataSync:
     """Handle data synchronization between StayFlexi and Supabase online_reservations table"""
     
-    def __init__(self, api_client: StayFlexiAPIClient, supabase_client):
+    def __init__(self, api_client: StayFlexiAPIClient, supabase_client, batch_size: int = UPSERT_BATCH_SIZE):
         self.api_client = api_client
         self.supabase = supabase_client
+        self.batch_size = batch_size
         self.sync_status = {
             "bookings": False,
             "last_sync": None,
             "error_count": 0
         }
     
-    def sync_bookings(self, start_date: str, end_date: str) -> Dict:
-        """Sync bookings from StayFlexi to Supabase online_reservations table"""
+    def sync_bookings(self, start_date: str, end_date: str, full: bool = False,
+                      bookings: Optional[List] = None) -> Dict:
+        """
+        Sync bookings from StayFlexi to Supabase online_reservations table.
+        Bookings an earlier run already handled are left out unless `full`
+        (see sync_cursors). `bookings` already fetched for the range (e.g. by
+        MultiHotelSync) are used instead of calling the API.
+        """
         try:
-            success, bookings, message = self.api_client.fetch_bookings(start_date, end_date)
+            hotel_id = self.api_client.config.hotel_id
+            plan = sync_cursors.plan_sync(
+                self.supabase, hotel_id, "online_reservations",
+                start_date, end_date, full=full,
+            )
+            if bookings is None:
+                success, bookings, message = self.api_client.fetch_bookings(start_date, end_date)
+            else:
+                success, message = True, f"Fetched {len(bookings)} bookings"
+            prop = property_registry.property_for_hotel(hotel_id)
+            property_name = prop.name if prop else config.PROPERTY_NAME
             
             if not success:
                 self.sync_status["error_count"] += 1
@@ -268,49 +235,74 @@ class StayFlexiDataSync:
                     "count": 0
                 }
             
-            # Load existing booking IDs to avoid duplicates
+            candidates, unchanged, watermark = sync_cursors.changed_bookings(
+                plan, bookings, lambda b: b.get("checkInDate") or b.get("check_in_date")
+            )
+            mode = "full" if plan["full"] else "delta"
+            
+            # Look up only the candidate IDs to avoid duplicates
             try:
-                existing_response = self.supabase.table("online_reservations").select("booking_id").execute()
-                existing_ids = {r["booking_id"] for r in existing_response.data} if existing_response.data else set()
+                existing_ids = existing_keys(
+                    self.supabase, "online_reservations",
+                    (b.get("bookingId") or b.get("id") for b in candidates),
+                )
             except Exception as e:
                 logger.warning(f"Could not fetch existing bookings: {str(e)}")
                 existing_ids = set()
             
-            # Transform and insert bookings
-            synced_count = 0
+            # Transform new bookings, then write them in batched upserts
             skipped_count = 0
+            invalid_count = 0
+            pending = []
             
-            for booking in bookings:
+            for booking in candidates:
                 try:
                     booking_id = booking.get("bookingId") or booking.get("id")
+                    if not booking_id:
+                        logger.warning(f"Skipping booking without an ID for property {property_name}")
+                        invalid_count += 1
+                        continue
                     
-                    # Skip if already exists
-                    if booking_id in existing_ids:
+                    # Skip if already exists (or already queued in this run)
+                    if str(booking_id) in existing_ids:
                         skipped_count += 1
                         continue
                     
                     # Transform API format to online_reservations format
-                    transformed = self._transform_booking(booking)
-                    
-                    # Insert to Supabase
-                    response = self.supabase.table("online_reservations").insert(transformed).execute()
-                    
-                    if response.data:
-                        synced_count += 1
-                        existing_ids.add(booking_id)
+                    pending.append(self._transform_booking(booking, property_name))
+                    existing_ids.add(str(booking_id))
                     
                 except Exception as e:
                     logger.error(f"Error syncing booking {booking.get('bookingId')}: {str(e)}")
-                    self.sync_status["error_count"] += 1
+                    invalid_count += 1
+            
+            # Rows inserted concurrently by another sync are left as they are
+            stats = upsert_rows(
+                self.supabase, "online_reservations", pending,
+                on_conflict="booking_id", batch_size=self.batch_size,
+                ignore_duplicates=True, label="StayFlexiDataSync.sync_bookings",
+            )
+            synced_count = stats["written"]
+            if synced_count:
+                booking_repository.clear_cache()
+            self.sync_status["error_count"] += invalid_count + len(stats["failed"])
+            # Unusable source records would fail again on every run; only write failures hold the cursor back
+            sync_cursors.finish_sync(self.supabase, plan, watermark, succeeded=not stats["failed"])
             
             self.sync_status["bookings"] = True
             self.sync_status["last_sync"] = datetime.now()
             
             return {
                 "success": True,
-                "message": f"Successfully synced {synced_count} bookings (skipped {skipped_count} duplicates)",
+                "message": f"Successfully synced {synced_count} bookings ({mode} sync; skipped {skipped_count} "
+                           f"duplicates, {unchanged} unchanged, {invalid_count} invalid)",
                 "count": synced_count,
-                "skipped": skipped_count
+                "skipped": skipped_count,
+                "invalid": invalid_count,
+                "unchanged": unchanged,
+                "mode": mode,
+                "failed": len(stats["failed"]),
+                "stats": {key: stats[key] for key in ("requests", "seconds", "rows_per_second")}
             }
         
         except Exception as e:
@@ -323,7 +315,7 @@ class StayFlexiDataSync:
             }
     
     @staticmethod
-    def _transform_booking(api_booking: Dict) -> Dict:
+    def _transform_booking(api_booking: Dict, property_name: str = config.PROPERTY_NAME) -> Dict:
         """Transform StayFlexi booking format to online_reservations table format"""
         
         # Parse pax information
@@ -339,7 +331,7 @@ class StayFlexiDataSync:
             return str(val)[:length] if len(str(val)) > length else str(val)
         
         return {
-            "property": config.PROPERTY_NAME,
+            "property": property_name,
             "booking_id": truncate(api_booking.get("bookingId") or api_booking.get("id")),
             "booking_made_on": api_booking.get("bookingDate") or api_booking.get("created_at"),
             "guest_name": truncate(api_booking.get("guestName") or api_booking.get("guest_name")),
@@ -386,6 +378,91 @@ class StayFlexiDataSync:
         }
 
 
+class MultiHotelSync:
+    """Sync bookings of several StayFlexi hotels, fetching them concurrently"""
+    
+    def __init__(self, supabase_client, hotel_ids: Optional[List[str]] = None,
+                 max_workers: int = config.STAYFLEXI_MAX_WORKERS,
+                 chunk_days: int = config.STAYFLEXI_CHUNK_DAYS):
+        self.supabase = supabase_client
+        self.hotel_ids = [str(h) for h in (hotel_ids or property_registry.stayflexi_hotel_ids())]
+        self.max_workers = max_workers
+        self.chunk_days = chunk_days
+        self.clients = {h: StayFlexiAPIClient(StayFlexiAPIConfig(h)) for h in self.hotel_ids}
+    
+    def fetch_all(self, start_date: str, end_date: str) -> Dict[str, Tuple[bool, List, str]]:
+        """
+        Fetch every hotel's bookings with one request per (hotel, date chunk)
+        on a bounded thread pool; pms_http caps the rate per host.
+        
+        Returns:
+            {hotel_id: (success, bookings, message)}; a hotel fails if any of its chunks does
+        """
+        fmt = config.STAYFLEXI_DATE_FORMAT
+        chunks = date_chunks(
+            datetime.strptime(start_date, fmt).date(),
+            datetime.strptime(end_date, fmt).date(),
+            self.chunk_days,
+        )
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="stayflexi") as pool:
+            # Chunk-major order, so every hotel makes progress from the start
+            futures = {
+                (hotel_id, i): pool.submit(
+                    self.clients[hotel_id].fetch_bookings, chunk_from.strftime(fmt), chunk_to.strftime(fmt)
+                )
+                for i, (chunk_from, chunk_to) in enumerate(chunks)
+                for hotel_id in self.hotel_ids
+            }
+        
+        results = {}
+        for hotel_id in self.hotel_ids:
+            bookings, errors = [], []
+            for i in range(len(chunks)):
+                try:
+                    success, chunk, message = futures[(hotel_id, i)].result()
+                except Exception as e:
+                    success, chunk, message = False, None, str(e)
+                if success:
+                    bookings.extend(chunk or [])
+                else:
+                    errors.append(message)
+            if errors:
+                results[hotel_id] = (False, bookings, errors[0])
+            else:
+                results[hotel_id] = (True, bookings, f"Fetched {len(bookings)} bookings in {len(chunks)} requests")
+        return results
+    
+    def sync_all(self, start_date: str, end_date: str, full: bool = False) -> Dict:
+        """
+        Fetch all hotels concurrently, then write each hotel's bookings
+        (in this thread) with StayFlexiDataSync.
+        
+        Returns a dict: success, message, count, seconds and hotels
+        ({hotel_id: StayFlexiDataSync.sync_bookings result}).
+        """
+        started = time.perf_counter()
+        fetched = self.fetch_all(start_date, end_date)
+        hotels = {}
+        for hotel_id, (success, bookings, message) in fetched.items():
+            if not success:
+                logger.error(f"StayFlexi fetch failed for hotel {hotel_id}: {message}")
+                hotels[hotel_id] = {"success": False, "message": message, "count": 0}
+                continue
+            data_sync = StayFlexiDataSync(self.clients[hotel_id], self.supabase)
+            hotels[hotel_id] = data_sync.sync_bookings(start_date, end_date, full=full, bookings=bookings)
+        
+        synced = sum(1 for result in hotels.values() if result["success"])
+        count = sum(result.get("count", 0) for result in hotels.values())
+        seconds = round(time.perf_counter() - started, 1)
+        return {
+            "success": synced == len(hotels),
+            "message": f"Synced {synced} of {len(hotels)} hotels: {count} new bookings in {seconds}s",
+            "count": count,
+            "seconds": seconds,
+            "hotels": hotels,
+        }
+
+
 def _compute_payment_status(total_amount: float, paid_amount: float) -> str:
     """Compute payment status based on amounts"""
     if total_amount <= 0:
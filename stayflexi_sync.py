@@ -7,14 +7,20 @@ One-way synchronization: Stayflexi → Local Database only
 - No changes are sent back to Stayflexi
 """
 
-import requests
 import streamlit as st
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 import logging
 from functools import wraps
 
+import booking_repository
+import pms_backfill
+import pms_http
+import property_registry
+import sync_cursors
+from utils import UPSERT_BATCH_SIZE, existing_keys, iter_rows, upsert_rows
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -28,6 +34,7 @@ class StayflexiSyncConfig:
         self.api_token = None
         self.email = None
         self.property_id = "EDEN_BEACH_RESORT"
+        self.hotel_id = property_registry.resolve_property("Eden Beach Resort").hotel_id
         self.timeout = 30
         self.max_retries = 3
     
@@ -57,7 +64,8 @@ class StayflexiAPIClient:
     
     def __init__(self, config: StayflexiSyncConfig):
         self.config = config
-        self.session = requests.Session()
+        self.session = pms_http.get_session()
+        self.headers = config.get_headers()
         self.last_error = None
     
     def _make_request(self, endpoint: str, params: Optional[Dict] = None) -> Tuple[bool, Optional[Dict], str]:
@@ -66,55 +74,17 @@ class StayflexiAPIClient:
             return False, None, "Stayflexi credentials not configured"
         
         url = f"{self.config.api_url}{endpoint}"
-        headers = self.config.get_headers()
-        
-        for attempt in range(self.config.max_retries):
-            try:
-                response = self.session.get(
-                    url,
-                    headers=headers,
-                    params=params,
-                    timeout=self.config.timeout
-                )
-                
-                if response.status_code == 401:
-                    return False, None, "Authentication failed. Invalid API token or email."
-                elif response.status_code == 403:
-                    return False, None, "Access forbidden. Check permissions."
-                elif response.status_code == 404:
-                    return False, None, "Endpoint not found."
-                elif response.status_code >= 500:
-                    if attempt < self.config.max_retries - 1:
-                        logger.warning(f"Server error (attempt {attempt + 1}): {response.status_code}")
-                        continue
-                    return False, None, "Stayflexi server error. Try again later."
-                elif response.status_code >= 400:
-                    try:
-                        error_msg = response.json().get("message", response.text)
-                    except:
-                        error_msg = response.text
-                    return False, None, f"Request failed: {error_msg}"
-                
-                try:
-                    return True, response.json(), "Success"
-                except:
-                    return True, {"raw_response": response.text}, "Success"
-                    
-            except requests.Timeout:
-                if attempt < self.config.max_retries - 1:
-                    logger.warning(f"Timeout (attempt {attempt + 1})")
-                    continue
-                return False, None, "Request timeout. Stayflexi server may be unavailable."
-            except requests.ConnectionError as e:
-                if attempt < self.config.max_retries - 1:
-                    logger.warning(f"Connection error (attempt {attempt + 1}): {str(e)}")
-                    continue
-                return False, None, f"Connection error: {str(e)}"
-            except Exception as e:
-                logger.error(f"Unexpected error: {str(e)}")
-                return False, None, f"Unexpected error: {str(e)}"
         
-        return False, None, "Failed after multiple retry attempts"
+        return pms_http.request(
+            self.session,
+            "GET",
+            url,
+            "Stayflexi",
+            attempts=self.config.max_retries,
+            headers=self.headers,
+            params=params,
+            timeout=self.config.timeout
+        )
     
     def test_connection(self) -> Tuple[bool, str]:
         """Test Stayflexi connection"""
@@ -165,30 +135,109 @@ class StayflexiAPIClient:
 class LocalDatabaseSync:
     """Handle syncing from Stayflexi to local database"""
     
-    def __init__(self, api_client: StayflexiAPIClient, supabase_client):
+    def __init__(self, api_client: StayflexiAPIClient, supabase_client, batch_size: int = UPSERT_BATCH_SIZE):
         self.api_client = api_client
         self.supabase = supabase_client
+        self.batch_size = batch_size
         self.sync_log = []
     
     def get_existing_booking_ids(self) -> set:
         """Get all existing booking IDs from local database"""
         try:
-            response = self.supabase.table("reservations").select("booking_id").execute()
-            return {record["booking_id"] for record in response.data} if response.data else set()
+            rows = iter_rows(
+                lambda: self.supabase.table("reservations").select("booking_id").order("booking_id"),
+                label="get_existing_booking_ids",
+            )
+            return {record["booking_id"] for record in rows}
         except Exception as e:
             logger.error(f"Error fetching existing booking IDs: {str(e)}")
             return set()
     
+    def import_bookings(self, bookings: List[Dict]) -> Dict:
+        """
+        Insert the given Stayflexi bookings that are not in the local database yet.
+        
+        Returns a dict: imported, skipped, invalid (source records without an
+        ID or that could not be transformed), errors (rows the database
+        rejected), log and stats.
+        """
+        skipped = 0
+        invalid = 0
+        sync_log = []
+        pending = []
+        
+        queued = {}
+        for booking in bookings:
+            booking_id = booking.get("id") or booking.get("booking_id") or booking.get("referenceNumber")
+            
+            if not booking_id:
+                invalid += 1
+                sync_log.append(f"⚠️ Skipped booking with no ID")
+                continue
+            
+            booking_id = str(booking_id)
+            if booking_id in queued:
+                skipped += 1
+                sync_log.append(f"⏭️ Skipped duplicate: {booking_id}")
+                continue
+            queued[booking_id] = booking
+        
+        # Only these IDs are looked up, not the whole table
+        existing_ids = existing_keys(self.supabase, "reservations", queued)
+        
+        for booking_id, booking in queued.items():
+            try:
+                # Check if booking already exists
+                if booking_id in existing_ids:
+                    skipped += 1
+                    sync_log.append(f"⏭️ Skipped duplicate: {booking_id}")
+                    continue
+                
+                # Transform booking data and queue it for the batched write
+                pending.append(self._transform_booking(booking))
+            
+            except Exception as e:
+                invalid += 1
+                logger.error(f"Error syncing booking {booking.get('id')}: {str(e)}")
+                sync_log.append(f"❌ Error: {str(e)}")
+        
+        # Insert into local database; existing rows keep their local status
+        stats = upsert_rows(
+            self.supabase, "reservations", pending,
+            on_conflict="booking_id", batch_size=self.batch_size,
+            ignore_duplicates=True, label="LocalDatabaseSync.import_bookings",
+        )
+        imported = stats["written"]
+        if imported:
+            booking_repository.clear_cache()
+        errors = len(stats["failed"])
+        for row, error in stats["failed"]:
+            sync_log.append(f"❌ Failed to import {row.get('booking_id')}: {error}")
+        sync_log.insert(
+            0, f"✅ Imported {imported} bookings in {stats['requests']} requests "
+            f"({stats['seconds']}s, {stats['rows_per_second']} rows/s)"
+        )
+        return {
+            "imported": imported,
+            "skipped": skipped,
+            "invalid": invalid,
+            "errors": errors,
+            "log": sync_log,
+            "stats": {key: stats[key] for key in ("requests", "seconds", "rows_per_second")}
+        }
+    
     def sync_bookings(self, start_date: Optional[str] = None, 
-                     end_date: Optional[str] = None) -> Dict:
+                     end_date: Optional[str] = None, full: bool = False) -> Dict:
         """
         Sync bookings from Stayflexi to local database
-        Only imports new bookings (not in local DB)
+        Only imports new bookings (not in local DB). Bookings an earlier run
+        already handled are left out unless `full` (see sync_cursors).
         """
         try:
-            # Get existing booking IDs to avoid duplicates
-            existing_ids = self.get_existing_booking_ids()
-            logger.info(f"Found {len(existing_ids)} existing bookings in local database")
+            plan = sync_cursors.plan_sync(
+                self.supabase, self.api_client.config.hotel_id, "reservations",
+                start_date, end_date, full=full,
+            )
             
             # Fetch bookings from Stayflexi
             success, bookings, message = self.api_client.fetch_bookings(start_date, end_date)
@@ -203,54 +252,29 @@ class LocalDatabaseSync:
                     "log": []
                 }
             
-            imported = 0
-            skipped = 0
-            errors = 0
-            sync_log = []
+            candidates, unchanged, watermark = sync_cursors.changed_bookings(
+                plan, bookings, lambda b: b.get("checkInDate") or b.get("check_in")
+            )
+            mode = "full" if plan["full"] else "delta"
+            logger.info(f"{mode} sync: {len(candidates)} of {len(bookings)} bookings to check")
             
-            for booking in bookings:
-                try:
-                    booking_id = booking.get("id") or booking.get("booking_id") or booking.get("referenceNumber")
-                    
-                    if not booking_id:
-                        errors += 1
-                        sync_log.append(f"⚠️ Skipped booking with no ID")
-                        continue
-                    
-                    booking_id = str(booking_id)
-                    
-                    # Check if booking already exists
-                    if booking_id in existing_ids:
-                        skipped += 1
-                        sync_log.append(f"⏭️ Skipped duplicate: {booking_id}")
-                        continue
-                    
-                    # Transform booking data
-                    transformed = self._transform_booking(booking)
-                    
-                    # Insert into local database
-                    response = self.supabase.table("reservations").insert(transformed).execute()
-                    
-                    if response.data:
-                        imported += 1
-                        existing_ids.add(booking_id)
-                        sync_log.append(f"✅ Imported: {booking_id}")
-                    else:
-                        errors += 1
-                        sync_log.append(f"❌ Failed to import: {booking_id}")
-                
-                except Exception as e:
-                    errors += 1
-                    logger.error(f"Error syncing booking {booking.get('id')}: {str(e)}")
-                    sync_log.append(f"❌ Error: {str(e)}")
+            result = self.import_bookings(candidates)
+            imported, skipped, errors = result["imported"], result["skipped"], result["errors"]
+            # Unusable source records would fail again on every run; only write failures hold the cursor back
+            sync_cursors.finish_sync(self.supabase, plan, watermark, succeeded=errors == 0)
             
             return {
                 "success": True,
-                "message": f"Sync completed. Imported: {imported}, Skipped (duplicates): {skipped}, Errors: {errors}",
+                "message": f"Sync completed ({mode}). Imported: {imported}, Skipped (duplicates): {skipped}, "
+                           f"Unchanged: {unchanged}, Invalid: {result['invalid']}, Errors: {errors}",
                 "imported": imported,
                 "skipped": skipped,
+                "unchanged": unchanged,
+                "invalid": result["invalid"],
                 "errors": errors,
-                "log": sync_log
+                "mode": mode,
+                "log": result["log"],
+                "stats": result["stats"]
             }
         
         except Exception as e:
@@ -264,6 +288,27 @@ class LocalDatabaseSync:
                 "log": [f"❌ Error: {str(e)}"]
             }
     
+    def backfill_bookings(self, start_date: date, end_date: date,
+                          chunk_days: int = pms_backfill.DEFAULT_CHUNK_DAYS,
+                          max_seconds: Optional[float] = None, on_chunk=None) -> Dict:
+        """
+        Import a long check-in range one chunk at a time (see pms_backfill).
+        Finished chunks are checkpointed, so calling again with the same range
+        and chunk size resumes an interrupted backfill.
+        """
+        def fetch(chunk_from: date, chunk_to: date):
+            return self.api_client.fetch_bookings(chunk_from.isoformat(), chunk_to.isoformat())
+        
+        def write(bookings: List[Dict]):
+            result = self.import_bookings(bookings)
+            return result["imported"], result["errors"]
+        
+        return pms_backfill.run_backfill(
+            self.supabase, f"stayflexi:{self.api_client.config.hotel_id}:reservations",
+            start_date, end_date, fetch, write,
+            chunk_days=chunk_days, max_seconds=max_seconds, on_chunk=on_chunk,
+        )
+    
     def _transform_booking(self, stayflexi_booking: Dict) -> Dict:
         """
         Transform Stayflexi booking format to local database format
@@ -11,6 +11,7 @@ from stayflexi_sync import (
     StayflexiAPIClient,
     LocalDatabaseSync
 )
+import pms_backfill
 
 
 def initialize_stayflexi_session():
@@ -76,13 +77,17 @@ def show_stayflexi_quick_sync_button(supabase):
                             st.success(result["message"])
                             
                             # Show sync results
-                            col_a, col_b, col_c = st.columns(3)
+                            col_a, col_b, col_c, col_d = st.columns(4)
                             with col_a:
                                 st.metric("✅ Imported", result["imported"])
                             with col_b:
                                 st.metric("⏭️ Skipped (Duplicates)", result["skipped"])
                             with col_c:
-                                st.metric("❌ Errors", result["errors"])
+                                st.metric("💤 Unchanged", result.get("unchanged", 0))
+                            with col_d:
+                                st.metric("❌ Errors", result["errors"],
+                                          help=f"Rows that failed to write; {result.get('invalid', 0)} "
+                                               f"bookings without usable data were left out")
                             
                             # Show sync log
                             if result["log"]:
@@ -98,6 +103,49 @@ def show_stayflexi_quick_sync_button(supabase):
                     except Exception as e:
                         st.error(f"❌ Error: {str(e)}")
     
+    # Backfill of long ranges, chunk by chunk and resumable
+    with st.expander("📦 Backfill History from Stayflexi"):
+        col_from, col_to, col_chunk = st.columns([2, 2, 1])
+        with col_from:
+            backfill_start = st.date_input(
+                "From", value=datetime.now() - timedelta(days=365), key="stayflexi_backfill_start"
+            )
+        with col_to:
+            backfill_end = st.date_input("To", value=datetime.now(), key="stayflexi_backfill_end")
+        with col_chunk:
+            chunk_days = st.number_input(
+                "Days per request", min_value=1, max_value=366,
+                value=pms_backfill.DEFAULT_CHUNK_DAYS, key="stayflexi_backfill_chunk_days"
+            )
+        st.caption(
+            f"Each run stops after about {pms_backfill.UI_RUN_SECONDS // 60} minutes; "
+            f"run it again with the same range to resume."
+        )
+        if st.button("📦 Run / Resume Backfill", use_container_width=True, key="stayflexi_backfill_btn"):
+            if not st.session_state.stayflexi_stored_token or not st.session_state.stayflexi_stored_email:
+                st.warning("⚠️ Please setup Stayflexi credentials first")
+            elif backfill_start > backfill_end:
+                st.error("❌ 'From' must be on or before 'To'")
+            else:
+                config = StayflexiSyncConfig()
+                config.set_credentials(st.session_state.stayflexi_stored_token, st.session_state.stayflexi_stored_email)
+                sync = LocalDatabaseSync(StayflexiAPIClient(config), supabase)
+                progress = st.progress(0.0, text="Starting backfill...")
+                result = sync.backfill_bookings(
+                    backfill_start, backfill_end, chunk_days=int(chunk_days),
+                    max_seconds=pms_backfill.UI_RUN_SECONDS,
+                    on_chunk=lambda i, total, chunk_from, chunk_to: progress.progress(
+                        i / total, text=f"Chunk {i + 1} of {total}: {chunk_from} to {chunk_to}"
+                    ),
+                )
+                progress.progress(1.0 if result["complete"] else (result["chunks"] - result["remaining"]) / result["chunks"])
+                if result["complete"] and result["success"]:
+                    st.success(f"✅ {result['message']}")
+                else:
+                    st.warning(f"⚠️ {result['message']}")
+                for chunk_from, chunk_to, error in result["failed"]:
+                    st.error(f"❌ {chunk_from} to {chunk_to}: {error}")
+    
     # Setup panel (only show if clicked)
     if st.session_state.get("show_stayflexi_setup", False):
         st.markdown("---")
@@ -6,8 +6,12 @@ Provides Streamlit interface for syncing bookings from StayFlexi to Supabase
 import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
-from stayflexi_integration import StayFlexiAPIConfig, StayFlexiAPIClient, StayFlexiDataSync
+from stayflexi_integration import StayFlexiAPIConfig, StayFlexiAPIClient, StayFlexiDataSync, MultiHotelSync
 from log import log_activity
+from utils import get_property_name
+import stayflexi_config as config
+import pms_http
+import sync_cursors
 
 def show_stayflexi_sync():
     """Main interface for StayFlexi booking synchronization"""
@@ -75,6 +79,13 @@ def show_stayflexi_sync():
         end_date_str = end_date.strftime("%d-%m-%Y")
         
         st.info(f"📅 Fetching bookings from {start_date_str} to {end_date_str}")
+        full_sync = st.checkbox(
+            "Full reconciliation",
+            value=False,
+            key="sync_full",
+            help=f"Re-check every booking in the range. Otherwise only bookings changed since the last sync "
+                 f"are checked, with a full pass at least every {sync_cursors.FULL_SYNC_HOURS} hours."
+        )
         
         if st.button("🚀 Start Sync", key="sync_bookings", use_container_width=True):
             with st.spinner("Synchronizing bookings..."):
@@ -100,7 +111,7 @@ def show_stayflexi_sync():
                         # Sync to Supabase
                         if st.button("✅ Confirm & Sync to Database", key="confirm_sync"):
                             with st.spinner("Syncing to database..."):
-                                sync_result = data_sync.sync_bookings(start_date_str, end_date_str)
+                                sync_result = data_sync.sync_bookings(start_date_str, end_date_str, full=full_sync)
                                 progress_bar.progress(100)
                                 
                                 if sync_result["success"]:
@@ -128,6 +139,32 @@ def show_stayflexi_sync():
                         f"Failed to fetch bookings from StayFlexi: {message}"
                     )
     
+        st.markdown("---")
+        st.markdown("**🌐 All Properties**")
+        st.caption(
+            f"Fetches every StayFlexi property in parallel ({config.STAYFLEXI_MAX_WORKERS} workers, "
+            f"{config.STAYFLEXI_CHUNK_DAYS}-day requests) and imports new bookings for the same date range."
+        )
+        if st.button("🌐 Sync All Properties", key="sync_all_hotels", use_container_width=True):
+            with st.spinner("Synchronizing all properties..."):
+                multi_result = MultiHotelSync(supabase).sync_all(start_date_str, end_date_str, full=full_sync)
+            if multi_result["success"]:
+                st.success(f"✅ {multi_result['message']}")
+            else:
+                st.warning(f"⚠️ {multi_result['message']}")
+            st.dataframe(pd.DataFrame([
+                {
+                    "Property": get_property_name(hotel_id),
+                    "Hotel ID": hotel_id,
+                    "New": result.get("count", 0),
+                    "Skipped": result.get("skipped", 0),
+                    "Unchanged": result.get("unchanged", 0),
+                    "Result": result["message"],
+                }
+                for hotel_id, result in multi_result["hotels"].items()
+            ]), use_container_width=True)
+            log_activity(supabase, st.session_state.username, f"StayFlexi all-properties sync: {multi_result['message']}")
+    
     # TAB 3: View Bookings
     with tab3:
         st.subheader("📊 View Synced Bookings")
@@ -191,6 +228,14 @@ def show_stayflexi_sync():
         
         for key, value in config_info.items():
             st.write(f"• **{key}:** {value}")
+        
+        st.markdown("---")
+        st.write("**HTTP Connections (all PMS clients):**")
+        connection_stats = pms_http.connection_stats()
+        if connection_stats:
+            st.dataframe(pd.DataFrame(connection_stats), use_container_width=True)
+        else:
+            st.caption("No PMS requests made by this server yet.")
 
 
 def show_booking_details(booking_id: str):
@@ -5,37 +5,13 @@ import streamlit as st
 from datetime import date
 import calendar
 import pandas as pd
-from supabase import create_client, Client
 from typing import List, Dict
-import os
-
-# -------------------------- Supabase --------------------------
-try:
-    supabase: Client = create_client(
-        st.secrets["supabase"]["url"],
-        st.secrets["supabase"]["key"]
-    )
-except (KeyError, FileNotFoundError):
-    try:
-        supabase: Client = create_client(
-            os.environ["SUPABASE_URL"],
-            os.environ["SUPABASE_KEY"]
-        )
-    except KeyError as e:
-        st.error(f"Missing Supabase configuration: {e}")
-        st.stop()
-
-# -------------------------- Property Mapping --------------------------
-PROPERTY_MAPPING = {
-    "La Millionaire Luxury Resort": "La Millionaire Resort",
-    "Le Poshe Beach View": "Le Poshe Beach view",
-    "Le Poshe Beach view": "Le Poshe Beach view",
-    "Le Poshe Beach VIEW": "Le Poshe Beach view",
-    "Le Poshe Beachview": "Le Poshe Beach view",
-    "Millionaire": "La Millionaire Resort",
-    "Le Pondy Beach Side": "Le Pondy Beachside",
-    "Le Teera": "Le Terra"
-}
+import booking_repository
+from booking_repository import METRIC_FIELDS
+from booking_index import BookingIndex, index_by_property
+from room_nights import build_room_nights, daily_metrics, per_day
+from property_inventory import INVENTORY, get_inventory
+from property_registry import stored_names
 
 PROPERTY_SHORT_NAMES = {
     "Eden Beach Resort": "EBR",
@@ -58,108 +34,55 @@ PROPERTY_SHORT_NAMES = {
     "Le Terra": "LT"
 }
 
-reverse_mapping = {c: [] for c in set(PROPERTY_MAPPING.values())}
-for v, c in PROPERTY_MAPPING.items():
-    reverse_mapping[c].append(v)
-
-def normalize_property_name(prop_name: str) -> str:
-    return PROPERTY_MAPPING.get(prop_name, prop_name) if prop_name else prop_name
-
 def get_short_name(prop_name: str) -> str:
     return PROPERTY_SHORT_NAMES.get(prop_name, prop_name)
 
+# (metric, title) of each table shown on the page, in display order
+SUMMARY_REPORTS = [
+    ("rooms_sold", "Rooms Report"),
+    ("room_charges", "Room Charges Report"),
+    ("gst", "GST Report"),
+    ("total", "Total Report"),
+    ("commission", "Commission Report"),
+    ("tax_deduction", "Tax Deduction Report"),
+    ("receivable", "Receivable Report"),
+    ("receivable_per_night", "Receivable Per Night Report"),
+]
+
 # -------------------------- Helpers --------------------------
 def load_properties() -> List[str]:
-    """Return all 18 properties from PROPERTY_INVENTORY"""
-    PROPERTY_INVENTORY = {
-        "Le Poshe Beach view": {},
-        "La Millionaire Resort": {},
-        "Le Poshe Luxury": {},
-        "Le Poshe Suite": {},
-        "La Paradise Residency": {},
-        "La Paradise Luxury": {},
-        "La Villa Heritage": {},
-        "Le Pondy Beachside": {},
-        "Le Royce Villa": {},
-        "La Tamara Luxury": {},
-        "La Antilia Luxury": {},
-        "La Tamara Suite": {},
-        "Le Park Resort": {},
-        "Villa Shakti": {},
-        "Eden Beach Resort": {},
-        "Le Terra": {},
-        "La Coromandel Luxury": {},
-        "Happymates Forest Retreat": {}
-    }
-    return sorted(list(PROPERTY_INVENTORY.keys()))
-
-@st.cache_data(ttl=1800)
-def load_combined_bookings(prop: str, start: date, end: date) -> List[Dict]:
-    normalized_prop = normalize_property_name(prop)
-    query_props = [normalized_prop] + reverse_mapping.get(normalized_prop, [])
+    """Return all 18 properties from property_inventory"""
+    return sorted(INVENTORY.keys())
+
+def load_combined_bookings(props: List[str], start: date, end: date) -> Dict[str, List[Dict]]:
+    """Bookings of all `props`, fetched with one query per table and grouped by property."""
+    synonyms = {}
+    for prop in props:
+        synonyms[prop] = stored_names(prop)
     try:
-        direct = (supabase.table("reservations").select("*")
-                  .in_("property_name", query_props)
-                  .lte("check_in", str(end))
-                  .gte("check_out", str(start))
-                  .in_("plan_status", ["Confirmed", "Completed"])
-                  .in_("payment_status", ["Partially Paid", "Fully Paid"])
-                  .execute().data or [])
-
-        online = (supabase.table("online_reservations").select("*")
-                  .in_("property", query_props)
-                  .lte("check_in", str(end))
-                  .gte("check_out", str(start))
-                  .in_("booking_status", ["Confirmed", "Completed"])
-                  .in_("payment_status", ["Partially Paid", "Fully Paid"])
-                  .execute().data or [])
-
-        all_bookings = []
-        for b in direct:
-            if normalize_property_name(b.get("property_name")) == prop:
+        direct, online = booking_repository.fetch_both(
+            booking_repository.fetch_confirmed_bookings_by_property,
+            synonyms, start, end, fields=METRIC_FIELDS)
+
+        all_bookings = {}
+        for prop in props:
+            bookings = []
+            for b in direct[prop]:
                 b["property_name"] = prop
                 b["type"] = "direct"
-                all_bookings.append(b)
-        for b in online:
-            if normalize_property_name(b.get("property")) == prop:
+                bookings.append(b)
+            for b in online[prop]:
                 b["property"] = prop
                 b["type"] = "online"
-                all_bookings.append(b)
+                bookings.append(b)
+            all_bookings[prop] = bookings
         return all_bookings
     except Exception as e:
-        st.error(f"Error loading bookings for {prop}: {e}")
-        return []
-
-def filter_bookings_for_day(bookings: List[Dict], target: date) -> List[Dict]:
-    return [
-        b for b in bookings
-        if date.fromisoformat(b["check_in"]) <= target < date.fromisoformat(b["check_out"])
-    ]
+        st.error(f"Error loading bookings: {e}")
+        return {prop: [] for prop in props}
 
 def assign_inventory_numbers(daily: List[Dict], prop: str):
-    PROPERTY_INVENTORY = {
-        "Le Poshe Beach view": {"all": ["101","102","201","202","203","204","301","302","303","304","Day Use 1","Day Use 2","No Show"]},
-        "La Millionaire Resort": {"all": ["101","102","103","105","201","202","203","204","205","206","207","208","301","302","303","304","305","306","307","308","401","402","Day Use 1","Day Use 2","Day Use 3","Day Use 4","Day Use 5","No Show"]},
-        "Le Poshe Luxury": {"all": ["101","102","201","202","203","204","205","301","302","303","304","305","401","402","403","404","405","501","Day Use 1","Day Use 2","No Show"]},
-        "Le Poshe Suite": {"all": ["601","602","603","604","701","702","703","704","801","Day Use 1","Day Use 2","No Show"]},
-        "La Paradise Residency": {"all": ["101","102","103","201","202","203","301","302","303","304","Day Use 1","Day Use 2","No Show"]},
-        "La Paradise Luxury": {"all": ["101","102","103","201","202","203","Day Use 1","Day Use 2","No Show"]},
-        "La Villa Heritage": {"all": ["101","102","103","201","202","203","301","Day Use 1","Day Use 2","No Show"]},
-        "Le Pondy Beachside": {"all": ["101","102","201","202","Day Use 1","Day Use 2","No Show"]},
-        "Le Royce Villa": {"all": ["101","102","201","202","Day Use 1","Day Use 2","No Show"]},
-        "La Tamara Luxury": {"all": ["101","102","103","104","105","106","201","202","203","204","205","206","301","302","303","304","305","306","401","402","403","404","Day Use 1","Day Use 2","No Show"]},
-        "La Antilia Luxury": {"all": ["101","201","202","203","204","301","302","303","304","401","Day Use 1","Day Use 2","No Show"]},
-        "La Tamara Suite": {"all": ["101","102","103","104","201","202","203","204","205","206","Day Use 1","Day Use 2","No Show"]},
-        "Le Park Resort": {"all": ["111","222","333","444","555","666","Day Use 1","Day Use 2","No Show"]},
-        "Villa Shakti": {"all": ["101","102","201","201A","202","203","301","301A","302","303","401","Day Use 1","Day Use 2","No Show"]},
-        "Eden Beach Resort": {"all": ["101","102","103","201","202","Day Use 1","Day Use 2","No Show"]},
-        "Le Terra": {"all": ["101","102","103","104","105","106","107","Day Use 1","Day Use 2","No Show"]},
-        "La Coromandel Luxury": {"all": ["101","102","103","201","202","203","204","205","206","301","Day Use 1","Day Use 2","No Show"]},
-        "Happymates Forest Retreat": {"all": ["101","102","Day Use 1","Day Use 2","No Show"]}
-    }
-    
-    inv = PROPERTY_INVENTORY.get(prop, {"all": []})["all"]
-    inv_lookup = {i.strip().lower(): i for i in inv}
+    inv_lookup = get_inventory(prop).lookup
     assigned = []
     over = []
     already_assigned = set()
@@ -201,83 +124,86 @@ def safe_float(value, default=0.0):
     except:
         return default
 
-def compute_daily_metrics(bookings: List[Dict], prop: str, day: date) -> Dict:
-    daily = filter_bookings_for_day(bookings, day)
-    assigned, _ = assign_inventory_numbers(daily, prop)
-    
-    # ✅ FIX: Count ALL occupied rooms on this day, not just check-ins
-    rooms_sold = len(set(b.get("assigned_room") for b in assigned if b.get("assigned_room")))
-    
-    # Only calculate financial metrics for check-in day primaries
-    check_in_primaries = [b for b in assigned if b.get("is_primary", True) and date.fromisoformat(b["check_in"]) == day]
-
-    room_charges = gst = commission = 0.0
-    for b in check_in_primaries:
-        if b.get("type") == "online":
-            total_amount = safe_float(b.get("booking_amount"))
-            gst += safe_float(b.get("ota_tax"))
-            commission += safe_float(b.get("ota_commission"))
-            room_charges += total_amount - safe_float(b.get("ota_tax"))
-        else:
-            room_charges += safe_float(b.get("total_tariff"))
-
-    total = room_charges + gst
-    receivable = total - commission
-    tax_deduction = receivable * 0.003
-
-    # Calculate per-night receivable for ALL occupied rooms on this day
-    daily_per_night_sum = 0.0
-    for b in assigned:
-        if b.get("is_primary", True):
-            is_online = b.get("type") == "online"
-            if is_online:
-                booking_total = safe_float(b.get("booking_amount"))
-                booking_gst = safe_float(b.get("ota_tax"))
-                booking_commission = safe_float(b.get("ota_commission"))
-            else:
-                booking_total = safe_float(b.get("total_tariff"))
-                booking_gst = booking_commission = 0.0
-            booking_receivable = booking_total - booking_gst - booking_commission
-            days = max(b.get("days", 1), 1)
-            raw_room = str(b.get("room_no") or "").strip()
-            num_rooms = len([r.strip() for r in raw_room.split(",") if r.strip()]) if raw_room else 1
-            total_nights = days * num_rooms
-            per_night = booking_receivable / total_nights if total_nights > 0 else 0.0
-            daily_per_night_sum += per_night
-
-    return {
-        "rooms_sold": rooms_sold,
-        "room_charges": room_charges,
-        "gst": gst,
-        "total": total,
-        "commission": commission,
-        "tax_deduction": tax_deduction,
-        "receivable": receivable,
-        "receivable_per_night": daily_per_night_sum,
-    }
-
-def build_report(props: List[str], dates: List[date], bookings: Dict[str, List[Dict]], metric: str) -> pd.DataFrame:
-    rows = []
-    prop_totals = {p: 0.0 for p in props}
-    grand_total = 0.0
+def metric_values(b: Dict) -> Dict:
+    """Room charges, GST, commission and per-night receivable of one assigned room-night."""
+    if b.get("type") == "online":
+        booking_total = safe_float(b.get("booking_amount"))
+        gst = safe_float(b.get("ota_tax"))
+        commission = safe_float(b.get("ota_commission"))
+        room_charges = booking_total - gst
+    else:
+        booking_total = room_charges = safe_float(b.get("total_tariff"))
+        gst = commission = 0.0
+
+    # Per-night receivable is carried by the primary room of each booking
+    per_night = 0.0
+    if b.get("is_primary", True):
+        days = max(b.get("days", 1), 1)
+        raw_room = str(b.get("room_no") or "").strip()
+        num_rooms = len([r.strip() for r in raw_room.split(",") if r.strip()]) if raw_room else 1
+        total_nights = days * num_rooms
+        per_night = (booking_total - gst - commission) / total_nights if total_nights > 0 else 0.0
+
+    return {"room_charges": room_charges, "gst": gst, "commission": commission, "per_night": per_night}
+
+def compute_month_metrics(props: List[str], dates: List[date], bookings: Dict[str, BookingIndex]) -> pd.DataFrame:
+    """Every summary metric for every (property, date), from one room-night table."""
+    room_nights = build_room_nights(bookings, dates, per_day(assign_inventory_numbers), metric_values)
+    metrics = daily_metrics(room_nights, props, dates)
+    # Financial metrics only count check-in day primaries; rooms sold counts every occupied room
+    metrics["total"] = metrics["room_charges"] + metrics["gst"]
+    metrics["receivable"] = metrics["total"] - metrics["commission"]
+    metrics["tax_deduction"] = metrics["receivable"] * 0.003
+    metrics["receivable_per_night"] = metrics["per_night"]
+    return metrics
+
+def build_reports(props: List[str], dates: List[date], metrics: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """Every Summary table in one pass: each (property, day) cell's metric dict is read once."""
+    names = [metric for metric, _ in SUMMARY_REPORTS]
+    cells = metrics[names].to_dict("index")
+    rows = {m: [] for m in names}
+    prop_totals = {m: {p: 0.0 for p in props} for m in names}
+    grand_totals = {m: 0.0 for m in names}
     for d in dates:
-        row = {"Date": d.strftime("%Y-%m-%d")}
-        day_sum = 0.0
+        day_rows = {m: {"Date": d.strftime("%Y-%m-%d")} for m in names}
+        day_sums = {m: 0.0 for m in names}
         for p in props:
-            val = compute_daily_metrics(bookings.get(p, []), p, d).get(metric, 0.0)
+            cell = cells[(p, d)]
             short_name = get_short_name(p)
-            row[short_name] = val
-            day_sum += val
-            prop_totals[p] += val
-        row["Total"] = day_sum
-        grand_total += day_sum
-        rows.append(row)
-    total_row = {"Date": "Total"}
-    for p in props:
-        total_row[get_short_name(p)] = prop_totals[p]
-    total_row["Total"] = grand_total
-    rows.append(total_row)
-    return pd.DataFrame(rows)
+            for m in names:
+                val = cell[m]
+                day_rows[m][short_name] = val
+                day_sums[m] += val
+                prop_totals[m][p] += val
+        for m in names:
+            day_rows[m]["Total"] = day_sums[m]
+            grand_totals[m] += day_sums[m]
+            rows[m].append(day_rows[m])
+    for m in names:
+        total_row = {"Date": "Total"}
+        for p in props:
+            total_row[get_short_name(p)] = prop_totals[m][p]
+        total_row["Total"] = grand_totals[m]
+        rows[m].append(total_row)
+    return {m: pd.DataFrame(rows[m]) for m in names}
+
+def bookings_fingerprint(bookings: Dict[str, List[Dict]]) -> int:
+    """Hash of the loaded bookings, so memoized tables are rebuilt whenever the data changes."""
+    return hash(tuple(
+        (prop, tuple(sorted(tuple(sorted((k, str(v)) for k, v in b.items())) for b in rows)))
+        for prop, rows in sorted(bookings.items())
+    ))
+
+def get_report_tables(props: List[str], dates: List[date], bookings: Dict[str, List[Dict]]) -> Dict[str, pd.DataFrame]:
+    """Summary tables for the month, memoized in the session until the bookings change."""
+    key = (tuple(props), dates[0], dates[-1], bookings_fingerprint(bookings))
+    cached = st.session_state.get("summary_report_tables")
+    if cached and cached["key"] == key:
+        return cached["tables"]
+    metrics = compute_month_metrics(props, dates, index_by_property(bookings))
+    tables = build_reports(props, dates, metrics)
+    st.session_state.summary_report_tables = {"key": key, "tables": tables}
+    return tables
 
 # -------------------------- Styling with Horizontal Scroll --------------------------
 def style_dataframe_with_highlights(df: pd.DataFrame) -> str:
@@ -358,22 +284,13 @@ def show_summary_report():
     month_dates = [date(year, month, d) for d in range(1, days_in_month + 1)]
 
     with st.spinner("Loading all booking data..."):
-        bookings = {p: load_combined_bookings(p, month_dates[0], month_dates[-1]) for p in properties}
+        bookings = load_combined_bookings(properties, month_dates[0], month_dates[-1])
 
-    reports = [
-        ("rooms_sold", "Rooms Report"),
-        ("room_charges", "Room Charges Report"),
-        ("gst", "GST Report"),
-        ("total", "Total Report"),
-        ("commission", "Commission Report"),
-        ("tax_deduction", "Tax Deduction Report"),
-        ("receivable", "Receivable Report"),
-        ("receivable_per_night", "Receivable Per Night Report"),
-    ]
+    tables = get_report_tables(properties, month_dates, bookings)
 
-    for metric, title in reports:
+    for metric, title in SUMMARY_REPORTS:
         st.subheader(f"TIE Hotels & Resort {title}")
-        df = build_report(properties, month_dates, bookings, metric)
+        df = tables[metric]
         html = style_dataframe_with_highlights(df)
         st.markdown(html, unsafe_allow_html=True)
         st.markdown("---")
@@ -0,0 +1,208 @@
+"""
+sync_cursors.py - Persisted per-hotel cursors for incremental PMS syncs
+
+Both StayFlexi syncs fetched a check-in window and then downloaded every
+booking ID of the target table to find the new ones, so a run cost
+O(all bookings) however little had changed. A cursor per (hotelId, target
+table) now records the last successful window and the newest booking
+modification time seen (the watermark). A delta run:
+
+- drops fetched bookings whose check-in lies inside the previous window and
+  whose modification time is older than the watermark (less OVERLAP_MINUTES
+  for clock skew) - an earlier run already handled them;
+- looks up only the remaining booking IDs in the database.
+
+The StayFlexi endpoints have no modified-since filter, so the window itself
+is still fetched; everything after the fetch is O(changes). Bookings without
+a modification time are always kept. A full reconciliation (every fetched
+booking re-checked) runs on request, when there is no cursor yet, and at
+least every FULL_SYNC_HOURS. Cursors only advance after a run with no write
+failures; source records too broken to import do not hold them back.
+
+Run once in the Supabase SQL editor to install the cursor table:
+
+    CREATE TABLE IF NOT EXISTS pms_sync_cursors (
+        hotel_id          TEXT NOT NULL,
+        target_table      TEXT NOT NULL,
+        window_start      DATE,
+        window_end        DATE,
+        watermark         TIMESTAMP,
+        last_sync_at      TIMESTAMP,
+        last_full_sync_at TIMESTAMP,
+        PRIMARY KEY (hotel_id, target_table)
+    );
+
+Until the table exists every run is a full reconciliation (still without
+the table-wide ID download).
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import logging
+import pandas as pd
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+CURSOR_TABLE = "pms_sync_cursors"
+
+# A delta run becomes a full reconciliation once the last one is this old
+FULL_SYNC_HOURS = 24
+
+# Bookings modified this long before the watermark are still re-checked
+OVERLAP_MINUTES = 30
+
+# Booking fields holding its last modification (or, failing that, creation) time
+MODIFIED_FIELDS = (
+    "updatedAt", "updated_at", "lastModified", "lastModifiedOn", "modifiedOn", "modifiedAt",
+    "bookingDate", "booking_date", "createdAt", "created_at",
+)
+
+# StayFlexi sends DD-MM-YYYY (cmservice) or ISO dates; explicit formats avoid day/month swaps
+_DATE_FORMATS = ("%d-%m-%Y %H:%M:%S", "%d-%m-%Y")
+
+# ============================================================================
+# PARSING
+# ============================================================================
+
+def parse_timestamp(value) -> Optional[datetime]:
+    """Naive datetime of a PMS date/time value (timezone-aware ones in UTC), or None."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, date):
+        parsed = datetime(value.year, value.month, value.day)
+    else:
+        text = str(value).strip()
+        parsed = None
+        for fmt in _DATE_FORMATS:
+            try:
+                parsed = datetime.strptime(text, fmt)
+                break
+            except ValueError:
+                continue
+        if parsed is None:
+            stamp = pd.to_datetime(text, errors="coerce")
+            if pd.isna(stamp):
+                return None
+            parsed = stamp.to_pydatetime()
+    if parsed.tzinfo is not None:
+        parsed = pd.Timestamp(parsed).tz_convert("UTC").tz_localize(None).to_pydatetime()
+    return parsed
+
+def parse_date(value) -> Optional[date]:
+    parsed = parse_timestamp(value)
+    return parsed.date() if parsed else None
+
+def modified_at(booking: Dict) -> Optional[datetime]:
+    """The booking's modification time from the first MODIFIED_FIELDS entry that parses."""
+    for field in MODIFIED_FIELDS:
+        stamp = parse_timestamp(booking.get(field))
+        if stamp is not None:
+            return stamp
+    return None
+
+# ============================================================================
+# CURSOR STORAGE
+# ============================================================================
+
+def load_cursor(supabase, hotel_id: str, target_table: str) -> Optional[Dict]:
+    """Stored cursor for (hotel_id, target_table), or None if there is none or the table is missing."""
+    try:
+        rows = (
+            supabase.table(CURSOR_TABLE).select("*")
+            .eq("hotel_id", str(hotel_id)).eq("target_table", target_table)
+            .limit(1).execute().data
+        )
+    except Exception as e:
+        logging.warning(f"{CURSOR_TABLE} unavailable ({e}); running a full sync")
+        return None
+    return rows[0] if rows else None
+
+def save_cursor(supabase, cursor: Dict) -> bool:
+    """Upsert `cursor`; failures are logged, never raised."""
+    try:
+        supabase.table(CURSOR_TABLE).upsert(cursor, on_conflict="hotel_id,target_table").execute()
+        return True
+    except Exception as e:
+        logging.warning(f"Could not save sync cursor for {cursor.get('hotel_id')}: {e}")
+        return False
+
+# ============================================================================
+# DELTA PLANNING
+# ============================================================================
+
+def plan_sync(supabase, hotel_id: str, target_table: str, window_start=None, window_end=None,
+              full: bool = False) -> Dict:
+    """
+    Decide how a run over [window_start, window_end] (None = open) proceeds.
+
+    Returns a dict: hotel_id, target_table, window_start, window_end (dates),
+    full (bool), cursor (the previous one or None) and started.
+    """
+    now = datetime.now()
+    cursor = load_cursor(supabase, hotel_id, target_table)
+    if cursor is not None and not full:
+        last_full = parse_timestamp(cursor.get("last_full_sync_at"))
+        full = last_full is None or now - last_full >= timedelta(hours=FULL_SYNC_HOURS)
+    return {
+        "hotel_id": str(hotel_id),
+        "target_table": target_table,
+        "window_start": parse_date(window_start),
+        "window_end": parse_date(window_end),
+        "full": full or cursor is None,
+        "cursor": cursor,
+        "started": now,
+    }
+
+def _in_window(day: Optional[date], start: Optional[date], end: Optional[date]) -> bool:
+    if day is None:
+        return False
+    return (start is None or day >= start) and (end is None or day <= end)
+
+def changed_bookings(plan: Dict, bookings: Iterable[Dict],
+                     check_in_of: Callable[[Dict], object]) -> Tuple[List[Dict], int, Optional[datetime]]:
+    """
+    Split fetched `bookings` for `plan`.
+
+    Returns (bookings to process, number left out as unchanged, newest
+    modification time seen). A full run keeps every booking.
+    """
+    cursor = plan["cursor"] or {}
+    watermark = parse_timestamp(cursor.get("watermark"))
+    prev_start = parse_date(cursor.get("window_start"))
+    prev_end = parse_date(cursor.get("window_end"))
+    # A previous window without bounds was stored as NULLs, like one never synced
+    covered = prev_start is not None or prev_end is not None
+    since = watermark - timedelta(minutes=OVERLAP_MINUTES) if watermark else None
+
+    changed, unchanged, newest = [], 0, watermark
+    for booking in bookings:
+        stamp = modified_at(booking)
+        if stamp is not None and (newest is None or stamp > newest):
+            newest = stamp
+        if (not plan["full"] and since is not None and covered and stamp is not None and stamp < since
+                and _in_window(parse_date(check_in_of(booking)), prev_start, prev_end)):
+            unchanged += 1
+            continue
+        changed.append(booking)
+    return changed, unchanged, newest
+
+def finish_sync(supabase, plan: Dict, watermark: Optional[datetime], succeeded: bool) -> bool:
+    """Advance the cursor after a run; a run with write failures leaves it where it was."""
+    if not succeeded:
+        logging.info(f"Sync of {plan['hotel_id']} -> {plan['target_table']} had errors; cursor not advanced")
+        return False
+    previous = plan["cursor"] or {}
+    started = plan["started"].isoformat(timespec="seconds")
+    return save_cursor(supabase, {
+        "hotel_id": plan["hotel_id"],
+        "target_table": plan["target_table"],
+        "window_start": plan["window_start"].isoformat() if plan["window_start"] else None,
+        "window_end": plan["window_end"].isoformat() if plan["window_end"] else None,
+        "watermark": watermark.isoformat(timespec="seconds") if watermark else None,
+        "last_sync_at": started,
+        "last_full_sync_at": started if plan["full"] else previous.get("last_full_sync_at"),
+    })
@@ -4,44 +4,14 @@ import streamlit as st
 from datetime import date, datetime
 import calendar
 import pandas as pd
-from supabase import create_client, Client
 from typing import List, Dict
-import os
+import booking_repository
+from booking_repository import METRIC_FIELDS, WINDOW_CHECK_IN
+from booking_index import BookingIndex, index_by_property
+from room_nights import build_room_nights, daily_metrics, per_day
+from property_inventory import get_inventory
+from property_registry import stored_names
 
-# -------------------------- Supabase --------------------------
-try:
-    supabase: Client = create_client(st.secrets["supabase"]["url"], st.secrets["supabase"]["key"])
-except:
-    try:
-        supabase: Client = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"])
-    except Exception as e:
-        st.error(f"Supabase config error: {e}")
-        st.stop()
-
-# -------------------------- Property Mapping --------------------------
-PROPERTY_MAPPING = {
-    "La Millionaire Luxury Resort": "La Millionaire Resort",
-    "Le Poshe Beach View": "Le Poshe Beach view",
-    "Le Poshe Beach view": "Le Poshe Beach view",
-    "Le Poshe Beach VIEW": "Le Poshe Beach view",
-    "Le Poshe Beachview": "Le Poshe Beach view",
-    "Millionaire": "La Millionaire Resort",
-    "Le Pondy Beach Side": "Le Pondy Beachside",
-    "Le Teera": "Le Terra",
-    "La Tamara Luxury Resort": "La Tamara Luxury",
-    "La Coromandel Luxury Resort": "La Coromandel Luxury",
-    "Le Poshe Luxury Resort": "Le Poshe Luxury",
-    "Le Poshe Suite Resort": "Le Poshe Suite",
-    "La Paradise Luxury Resort": "La Paradise Luxury",
-    "Villa Shakti Resort": "Villa Shakti",
-}
-reverse_mapping = {c: [] for c in set(PROPERTY_MAPPING.values())}
-for v, c in PROPERTY_MAPPING.items():
-    reverse_mapping[c].append(v)
-def normalize_property_name(prop_name: str) -> str:
-    if not prop_name:
-        return ""
-    return PROPERTY_MAPPING.get(prop_name.strip(), prop_name.strip())
 # -------------------------- Monthly Targets --------------------------
 MONTHLY_TARGETS = {
     "December 2025": {
@@ -153,84 +123,56 @@ MONTHLY_TARGETS = {
     },
 }
 # -------------------------- Property Inventory --------------------------
-PROPERTY_INVENTORY = {
-    "Le Poshe Beach view": {"all": ["101","102","201","202","203","204","301","302","303","304","Day Use 1","Day Use 2","No Show"]},
-    "La Millionaire Resort": {"all": ["101","102","103","105","201","202","203","204","205","206","207","208","301","302","303","304","305","306","307","308","401","402","Day Use 1","Day Use 2","Day Use 3","Day Use 4","Day Use 5","No Show"]},
-    "Le Poshe Luxury": {"all": ["101","102","201","202","203","204","205","301","302","303","304","305","401","402","403","404","405","501","Day Use 1","Day Use 2","No Show"]},
-    "Le Poshe Suite": {"all": ["601","602","603","604","701","702","703","704","801","Day Use 1","Day Use 2","No Show"]},
-    "La Paradise Residency": {"all": ["101","102","103","201","202","203","301","302","303","304","Day Use 1","Day Use 2","No Show"]},
-    "La Paradise Luxury": {"all": ["101","102","103","201","202","203","Day Use 1","Day Use 2","No Show"]},
-    "La Villa Heritage": {"all": ["101","102","103","201","202","203","301","Day Use 1","Day Use 2","No Show"]},
-    "Le Pondy Beachside": {"all": ["101","102","201","202","Day Use 1","Day Use 2","No Show"]},
-    "Le Royce Villa": {"all": ["101","102","201","202","Day Use 1","Day Use 2","No Show"]},
-    "La Tamara Luxury": {"all": ["101","102","103","104","105","106","201","202","203","204","205","206","301","302","303","304","305","306","401","402","403","404","Day Use 1","Day Use 2","No Show"]},
-    "La Antilia Luxury": {"all": ["101","201","202","203","204","301","302","303","304","401","Day Use 1","Day Use 2","No Show"]},
-    "La Tamara Suite": {"all": ["101","102","103","104","201","202","203","204","205","206","Day Use 1","Day Use 2","No Show"]},
-    "Le Park Resort": {"all": ["111","222","333","444","555","666","Day Use 1","Day Use 2","No Show"]},
-    "Villa Shakti": {"all": ["101","102","201","201A","202","203","301","301A","302","303","401","Day Use 1","Day Use 2","No Show"]},
-    "Eden Beach Resort": {"all": ["101","102","103","201","202","Day Use 1","Day Use 2","No Show"]},
-    "La Coromandel Luxury": {"all": ["101","102","103","201","202","203","204","205","206","301","Day Use 1","Day Use 2","No Show"]},
-}
+# Properties with targets (room lists live in property_inventory)
+TARGET_PROPERTIES = (
+    "Le Poshe Beach view", "La Millionaire Resort", "Le Poshe Luxury", "Le Poshe Suite",
+    "La Paradise Residency", "La Paradise Luxury", "La Villa Heritage", "Le Pondy Beachside",
+    "Le Royce Villa", "La Tamara Luxury", "La Antilia Luxury", "La Tamara Suite",
+    "Le Park Resort", "Villa Shakti", "Eden Beach Resort", "La Coromandel Luxury",
+)
 
 def get_total_rooms(prop: str) -> int:
-    inv = PROPERTY_INVENTORY.get(prop, {"all": []})["all"]
-    return len([r for r in inv if not r.startswith(("Day Use", "No Show"))])
+    return get_inventory(prop).sellable_count
 
 # -------------------------- Safe Property Loading --------------------------
 def load_properties() -> List[str]:
-    """Return all 18 properties from PROPERTY_INVENTORY"""
-    return sorted(list(PROPERTY_INVENTORY.keys()))
+    """Return the properties that have targets"""
+    return sorted(TARGET_PROPERTIES)
 
 # -------------------------- Booking Functions --------------------------
-@st.cache_data(ttl=1800)
-def load_combined_bookings(prop: str, start: date, end: date) -> List[Dict]:
-    """Load bookings with caching and optimized date filtering."""
-    normalized = normalize_property_name(prop)
-    query_props = [normalized] + reverse_mapping.get(normalized, [])
+def load_combined_bookings(props: List[str], start: date, end: date) -> Dict[str, List[Dict]]:
+    """Load bookings checking in within [start, end] for all `props` in one query per table."""
+    synonyms = {}
+    for prop in props:
+        synonyms[prop] = stored_names(prop)
     try:
-        direct = supabase.table("reservations").select("*")\
-            .in_("property_name", query_props)\
-            .gte("check_in", str(start))\
-            .lte("check_in", str(end))\
-            .in_("plan_status", ["Confirmed", "Completed"])\
-            .in_("payment_status", ["Partially Paid", "Fully Paid"])\
-            .execute().data or []
-
-        online = supabase.table("online_reservations").select("*")\
-            .in_("property", query_props)\
-            .gte("check_in", str(start))\
-            .lte("check_in", str(end))\
-            .in_("booking_status", ["Confirmed", "Completed"])\
-            .in_("payment_status", ["Partially Paid", "Fully Paid"])\
-            .execute().data or []
-
-        all_bookings = []
-        
-        for b in direct:
-            name = b.get("property_name")
-            if normalize_property_name(name) == prop:
+        direct, online = booking_repository.fetch_both(
+            booking_repository.fetch_confirmed_bookings_by_property,
+            synonyms, start, end, window=WINDOW_CHECK_IN, fields=METRIC_FIELDS)
+
+        all_bookings = {}
+        for prop in props:
+            bookings = []
+            
+            for b in direct[prop]:
                 b["property_name"] = prop
                 b["type"] = "direct"
-                all_bookings.append(b)
-        
-        for b in online:
-            name = b.get("property")
-            if normalize_property_name(name) == prop:
+                bookings.append(b)
+            
+            for b in online[prop]:
                 b["property_name"] = prop
                 b["type"] = "online"
-                all_bookings.append(b)
+                bookings.append(b)
+            
+            all_bookings[prop] = bookings
                 
         return all_bookings
     except Exception as e:
-        st.warning(f"Failed to load bookings for {prop}: {e}")
-        return []
-
-def filter_bookings_for_day(bookings: List[Dict], day: date):
-    return [b for b in bookings if date.fromisoformat(b["check_in"]) <= day < date.fromisoformat(b["check_out"])]
+        st.warning(f"Failed to load bookings: {e}")
+        return {prop: [] for prop in props}
 
 def assign_inventory_numbers(daily: List[Dict], prop: str):
-    inv = PROPERTY_INVENTORY.get(prop, {"all": []})["all"]
-    lookup = {r.strip().lower(): r for r in inv}
+    lookup = get_inventory(prop).lookup
     assigned = []; used = set()
     for b in daily:
         rooms = [r.strip() for r in str(b.get("room_no") or "").split(",") if r.strip()]
@@ -252,37 +194,27 @@ def safe_float(v, default=0.0):
     try: return float(v) if v not in [None, "", " "] else default
     except: return default
 
-def compute_daily_metrics(bookings: List[Dict], prop: str, day: date) -> Dict:
-    daily = filter_bookings_for_day(bookings, day)
-    assigned, _ = assign_inventory_numbers(daily, prop)
-    rooms_sold = len({b.get("assigned_room") for b in assigned if b.get("assigned_room")})
-    
-    check_in_primaries = [b for b in assigned if b.get("is_primary", True) and date.fromisoformat(b["check_in"]) == day]
-    
-    room_charges = gst = commission = 0.0
-    for b in check_in_primaries:
-        booking_type = b.get("type", "")
-        if booking_type == "online":
-            total_amount = safe_float(b.get("booking_amount"))
-            gst += safe_float(b.get("ota_tax"))
-            commission += safe_float(b.get("ota_commission"))
-            room_charges += total_amount - safe_float(b.get("ota_tax"))
-        else:
-            room_charges += safe_float(b.get("total_tariff"))
-    
-    total = room_charges + gst
-    receivable = total - commission
-    
-    return {
-        "rooms_sold": rooms_sold, 
-        "total": total,
-        "receivable": receivable,
-        "commission": commission,
-        "gst": gst
-    }
+def metric_values(b: Dict) -> Dict:
+    """Room charges, GST and commission of one assigned room-night."""
+    if b.get("type", "") == "online":
+        gst = safe_float(b.get("ota_tax"))
+        return {
+            "room_charges": safe_float(b.get("booking_amount")) - gst,
+            "gst": gst,
+            "commission": safe_float(b.get("ota_commission")),
+        }
+    return {"room_charges": safe_float(b.get("total_tariff"))}
+
+def compute_month_metrics(props: List[str], dates: List[date], bookings: Dict[str, BookingIndex]) -> pd.DataFrame:
+    """Rooms sold, total, GST, commission and receivable for every (property, date)."""
+    room_nights = build_room_nights(bookings, dates, per_day(assign_inventory_numbers), metric_values)
+    metrics = daily_metrics(room_nights, props, dates)
+    metrics["total"] = metrics["room_charges"] + metrics["gst"]
+    metrics["receivable"] = metrics["total"] - metrics["commission"]
+    return metrics
 
 # -------------------------- MAIN REPORT --------------------------
-def build_target_achievement_report(props: List[str], dates: List[date], bookings_dict: Dict[str, List[Dict]], current_date: date, targets: Dict) -> pd.DataFrame:
+def build_target_achievement_report(props: List[str], dates: List[date], metrics: pd.DataFrame, current_date: date, targets: Dict) -> pd.DataFrame:
     rows = []
     balance_days = len([d for d in dates if d > current_date])
 
@@ -292,19 +224,13 @@ def build_target_achievement_report(props: List[str], dates: List[date], booking
             total_rooms = get_total_rooms(prop)
             total_room_nights = total_rooms * len(dates)
 
-            achieved = rooms_sold = future_booked = 0.0
-            commission_total = receivable_total = gst_total = 0.0
-            
-            for d in dates:
-                m = compute_daily_metrics(bookings_dict.get(prop, []), prop, d)
-                achieved += m["total"]
-                commission_total += m["commission"]
-                gst_total += m["gst"]
-                receivable_total += m["receivable"]
-                rooms_sold += m["rooms_sold"]
-                
-                if d > current_date:
-                    future_booked += m["rooms_sold"]
+            m = metrics.loc[prop]
+            achieved = float(m["total"].sum())
+            commission_total = float(m["commission"].sum())
+            gst_total = float(m["gst"].sum())
+            receivable_total = float(m["receivable"].sum())
+            rooms_sold = float(m["rooms_sold"].sum())
+            future_booked = float(m.loc[[d for d in dates if d > current_date], "rooms_sold"].sum())
 
             balance_rooms = max((total_rooms * balance_days) - future_booked, 0)
             balance = target - achieved
@@ -343,7 +269,7 @@ def build_target_achievement_report(props: List[str], dates: List[date], booking
     return df
 
 # -------------------------- TILL TODAY REPORT --------------------------
-def build_till_today_report(props: List[str], dates: List[date], bookings_dict: Dict[str, List[Dict]], current_date: date, targets: Dict) -> pd.DataFrame:
+def build_till_today_report(props: List[str], dates: List[date], metrics: pd.DataFrame, current_date: date, targets: Dict) -> pd.DataFrame:
     """Calculate metrics only till current system date - ARR based on total room inventory"""
     rows = []
     dates_till_today = [d for d in dates if d <= current_date]
@@ -357,13 +283,9 @@ def build_till_today_report(props: List[str], dates: List[date], bookings_dict:
             total_rooms = get_total_rooms(prop)
             total_room_nights_till_today = total_rooms * len(dates_till_today)
 
-            achieved_till_today = 0.0
-            rooms_sold_till_today = 0.0
-            
-            for d in dates_till_today:
-                m = compute_daily_metrics(bookings_dict.get(prop, []), prop, d)
-                achieved_till_today += m["total"]
-                rooms_sold_till_today += m["rooms_sold"]
+            m = metrics.loc[prop].loc[dates_till_today]
+            achieved_till_today = float(m["total"].sum())
+            rooms_sold_till_today = float(m["rooms_sold"].sum())
 
             unsold_rooms = total_room_nights_till_today - rooms_sold_till_today
             achieved_pct = (achieved_till_today / target * 100) if target > 0 else 0
@@ -493,19 +415,14 @@ def show_target_achievement_report():
     properties = load_properties()
 
     with st.spinner("Generating report..."):
-        bookings = {}
-        total_bookings_count = 0
-        for p in properties:
-            try:
-                bookings[p] = load_combined_bookings(p, dates[0], dates[-1])
-                total_bookings_count += len(bookings[p])
-            except:
-                bookings[p] = []
+        bookings = index_by_property(load_combined_bookings(properties, dates[0], dates[-1]))
+        total_bookings_count = sum(len(b) for b in bookings.values())
+        metrics = compute_month_metrics(properties, dates, bookings)
         
         st.info(f"📊 Loaded {total_bookings_count} total bookings across all properties for {selected_month}")
 
         # Main Report
-        df = build_target_achievement_report(properties, dates, bookings, current_date, targets)
+        df = build_target_achievement_report(properties, dates, metrics, current_date, targets)
         styled = style_dataframe(df)
 
     st.dataframe(styled, use_container_width=True, hide_index=True)
@@ -527,7 +444,7 @@ def show_target_achievement_report():
     if current_date >= dates[0]:
         st.caption(f"Performance metrics calculated from {dates[0].strftime('%B %d, %Y')} to {min(current_date, dates[-1]).strftime('%B %d, %Y')} | ARR = Revenue ÷ Total Room Inventory")
         
-        df_today = build_till_today_report(properties, dates, bookings, current_date, targets)
+        df_today = build_till_today_report(properties, dates, metrics, current_date, targets)
         styled_today = style_dataframe(df_today)
         
         st.dataframe(styled_today, use_container_width=True, hide_index=True)
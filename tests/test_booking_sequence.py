@@ -0,0 +1,201 @@
+"""
+booking_sequence.reserve_booking_ids against a SQLite stand-in for Supabase.
+
+SqliteSupabase answers the two calls booking_sequence makes: the
+reserve_booking_sequence RPC, implemented with the same statements as the
+plpgsql function in the module docstring, and the prefix query of the
+fallback scan.
+"""
+
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import booking_sequence
+from booking_sequence import DIRECT_PREFIX, ONLINE_PREFIX, reserve_booking_ids
+
+DAY = "20260301"
+
+
+class FakeAPIError(Exception):
+    """Stands in for postgrest's APIError, which carries a PostgREST or SQLSTATE `code`."""
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+class _Query:
+    def __init__(self, run):
+        self._run = run
+
+    def execute(self):
+        return SimpleNamespace(data=self._run())
+
+
+class _Table:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+        self.column = self.pattern = None
+
+    def select(self, column):
+        self.column = column
+        return self
+
+    def like(self, column, pattern):
+        self.pattern = pattern
+        return self
+
+    def execute(self):
+        self.client.scans += 1
+        rows = self.client.db.execute(
+            f"SELECT {self.column} FROM {self.name} WHERE {self.column} LIKE ?", (self.pattern,)
+        ).fetchall()
+        return SimpleNamespace(data=[{self.column: value} for (value,) in rows])
+
+
+class SqliteSupabase:
+    """In-memory database with the booking tables and, unless `rpc_error` is set, the counter function."""
+
+    def __init__(self, rpc_error=None):
+        self.db = sqlite3.connect(":memory:", check_same_thread=False, isolation_level=None)
+        self.db.executescript("""
+            CREATE TABLE reservations (booking_id TEXT);
+            CREATE TABLE online_reservations (booking_id TEXT);
+            CREATE TABLE booking_id_counters (
+                prefix     TEXT NOT NULL,
+                day        TEXT NOT NULL,
+                last_value INTEGER NOT NULL,
+                PRIMARY KEY (prefix, day)
+            );
+        """)
+        # One writer at a time, as the counter row lock gives in Postgres
+        self.lock = threading.Lock()
+        self.rpc_error = rpc_error
+        self.scans = 0
+
+    def add_bookings(self, table, *booking_ids):
+        self.db.executemany(f"INSERT INTO {table} (booking_id) VALUES (?)", [(b,) for b in booking_ids])
+
+    def table(self, name):
+        return _Table(self, name)
+
+    def rpc(self, name, params):
+        if self.rpc_error is not None:
+            raise self.rpc_error
+        assert name == booking_sequence.SEQUENCE_RPC
+        return _Query(lambda: self._reserve(params["p_prefix"], params["p_day"], params["p_count"]))
+
+    def _reserve(self, prefix, day, count):
+        stem = prefix + day
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.db.execute(
+                    "UPDATE booking_id_counters SET last_value = last_value + ? "
+                    "WHERE prefix = ? AND day = ? RETURNING last_value", (count, prefix, day),
+                ).fetchone()
+                if row is None:
+                    (seeded,) = self.db.execute(
+                        "SELECT COALESCE(MAX(CAST(substr(booking_id, ? + 1) AS INTEGER)), 0) FROM ("
+                        "  SELECT booking_id FROM reservations UNION ALL SELECT booking_id FROM online_reservations"
+                        ") WHERE booking_id LIKE ? || '%' "
+                        "AND substr(booking_id, ? + 1) <> '' AND substr(booking_id, ? + 1) NOT GLOB '*[^0-9]*'",
+                        (len(stem), stem, len(stem), len(stem)),
+                    ).fetchone()
+                    row = self.db.execute(
+                        "INSERT INTO booking_id_counters (prefix, day, last_value) VALUES (?, ?, ?) "
+                        "ON CONFLICT (prefix, day) DO UPDATE SET last_value = last_value + ? "
+                        "RETURNING last_value", (prefix, day, seeded + count, count),
+                    ).fetchone()
+                self.db.execute("COMMIT")
+            except Exception:
+                self.db.execute("ROLLBACK")
+                raise
+        return row[0]
+
+
+@pytest.fixture
+def warnings(monkeypatch):
+    shown = []
+    monkeypatch.setattr(booking_sequence.st, "warning", shown.append)
+    return shown
+
+
+def test_batches_are_contiguous_and_do_not_overlap():
+    client = SqliteSupabase()
+    first = reserve_booking_ids(DIRECT_PREFIX, 3, day=DAY, supabase=client)
+    second = reserve_booking_ids(DIRECT_PREFIX, 2, day=DAY, supabase=client)
+    single = reserve_booking_ids(DIRECT_PREFIX, day=DAY, supabase=client)
+    assert first == ["TIE20260301001", "TIE20260301002", "TIE20260301003"]
+    assert second == ["TIE20260301004", "TIE20260301005"]
+    assert single == ["TIE20260301006"]
+    # Each prefix and day has its own counter
+    assert reserve_booking_ids(ONLINE_PREFIX, 2, day=DAY, supabase=client) == ["SFX20260301001", "SFX20260301002"]
+    assert reserve_booking_ids(DIRECT_PREFIX, day="20260302", supabase=client) == ["TIE20260302001"]
+    assert client.scans == 0
+
+
+def test_counter_is_seeded_from_the_highest_existing_suffix():
+    client = SqliteSupabase()
+    client.add_bookings("reservations", "TIE20260301004", "TIE20260301012", "TIE2026030199x", "TIE20260228999")
+    client.add_bookings("online_reservations", "SFX20260301020")
+    assert reserve_booking_ids(DIRECT_PREFIX, 2, day=DAY, supabase=client) == ["TIE20260301013", "TIE20260301014"]
+    # Rows added after seeding are not re-scanned: the counter is authoritative
+    client.add_bookings("reservations", "TIE20260301100")
+    assert reserve_booking_ids(DIRECT_PREFIX, day=DAY, supabase=client) == ["TIE20260301015"]
+    assert reserve_booking_ids(ONLINE_PREFIX, day=DAY, supabase=client) == ["SFX20260301021"]
+
+
+def test_concurrent_reservations_never_collide():
+    client = SqliteSupabase()
+    reserved, errors = [], []
+
+    def reserve():
+        try:
+            for _ in range(10):
+                reserved.extend(reserve_booking_ids(DIRECT_PREFIX, 2, day=DAY, supabase=client))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=reserve) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert sorted(reserved) == [f"TIE{DAY}{n:03d}" for n in range(1, 161)]
+
+
+@pytest.mark.parametrize("code", ["PGRST202", "42883"])
+def test_bulk_reservation_is_refused_without_the_function(code, warnings):
+    client = SqliteSupabase(rpc_error=FakeAPIError(code, "function not found"))
+    with pytest.raises(RuntimeError, match="atomically"):
+        reserve_booking_ids(DIRECT_PREFIX, 2, day=DAY, supabase=client)
+    assert client.scans == 0 and warnings == []
+
+
+def test_single_id_falls_back_to_a_prefix_scan_with_a_warning(warnings):
+    client = SqliteSupabase(rpc_error=FakeAPIError("PGRST202", "function not found"))
+    client.add_bookings("reservations", "TIE20260301007")
+    assert reserve_booking_ids(DIRECT_PREFIX, day=DAY, supabase=client) == ["TIE20260301008"]
+    assert client.scans == 1 and len(warnings) == 1
+
+
+@pytest.mark.parametrize("error", [
+    FakeAPIError("57014", "canceling statement due to statement timeout"),
+    FakeAPIError("42501", "permission denied for function reserve_booking_sequence"),
+    TimeoutError("read timed out"),
+])
+def test_other_rpc_failures_are_raised_without_falling_back(error, warnings):
+    client = SqliteSupabase(rpc_error=error)
+    with pytest.raises(type(error)):
+        reserve_booking_ids(DIRECT_PREFIX, day=DAY, supabase=client)
+    assert client.scans == 0 and warnings == []
@@ -0,0 +1,136 @@
+"""
+month_allocator.allocate_month must give the same (assigned, over) lists as
+inventory.assign_inventory_numbers run on each day's in-house bookings.
+"""
+
+import importlib
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from booking_index import BookingIndex
+from booking_records import BookingRecord
+from month_allocator import allocate_month
+from property_inventory import get_inventory
+
+PROPERTY = "Le Poshe Suite"    # rooms 601-604, 701-704, 801, Day Use 1-2, No Show
+
+MARCH = [date(2026, 3, 1) + timedelta(days=i) for i in range(31)]
+
+
+@pytest.fixture(scope="module")
+def inventory(tmp_path_factory):
+    """The inventory page module, imported with placeholder secrets (it builds a client at import)."""
+    streamlit = pytest.importorskip("streamlit")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(streamlit, "secrets", {"supabase": {"url": "https://example.supabase.co", "key": "test.test.test"}})
+        # It also points logging at ./app.log
+        mp.chdir(tmp_path_factory.mktemp("inventory"))
+        return importlib.import_module("inventory")
+
+
+def booking(booking_id, room_no, check_in, check_out, total_pax=2, receivable=1000.0):
+    return {
+        "booking_id": booking_id,
+        "room_no": room_no,
+        "check_in": check_in,
+        "check_out": check_out,
+        "days": (date.fromisoformat(check_out) - date.fromisoformat(check_in)).days,
+        "total_pax": total_pax,
+        "receivable": receivable,
+    }
+
+
+BOOKINGS = [
+    # Overlapping: B asks for 601 while A holds it, and gets it once A leaves
+    booking("A", "601", "2026-03-01", "2026-03-05"),
+    booking("B", "601", "2026-03-03", "2026-03-08"),
+    # Arrives the day B departs
+    booking("C", "601", "2026-03-08", "2026-03-10"),
+    # Multi-room, with pax and receivable split over both rooms
+    booking("D", "602, 603", "2026-03-02", "2026-03-06", total_pax=5, receivable=4000.0),
+    # Wants 603 while D holds it: over until D leaves, and 604 is not taken meanwhile
+    booking("E", "604,603", "2026-03-04", "2026-03-07"),
+    # Unknown rooms, alone and next to a known one, and no room at all
+    booking("F", "999", "2026-03-05", "2026-03-09"),
+    booking("G", "702, 999", "2026-03-05", "2026-03-09"),
+    booking("H", "", "2026-03-10", "2026-03-12"),
+    # Room numbers as typed: case and padding
+    booking("I", " day use 1 ", "2026-03-15", "2026-03-16"),
+    # Over 31 nights, from February into April
+    booking("J", "701", "2026-02-20", "2026-04-05"),
+    booking("K", "701", "2026-03-10", "2026-03-12"),
+    # Same check-in and booking ID on two rows: input order breaks the tie
+    booking("L", "801", "2026-03-20", "2026-03-23"),
+    booking("L", "801", "2026-03-20", "2026-03-22"),
+    booking("M", "801", "2026-03-20", "2026-03-21"),
+    # Same check-in, the lower booking ID wins the room
+    booking("O", "703", "2026-03-25", "2026-03-28"),
+    booking("N", "703", "2026-03-25", "2026-03-27"),
+    # Departs on the 1st, so never in-house in March
+    booking("P", "704", "2026-02-27", "2026-03-01"),
+]
+
+
+def as_record(row):
+    fields = {k: v for k, v in row.items() if k not in ("check_in", "check_out")}
+    return BookingRecord(date.fromisoformat(row["check_in"]), date.fromisoformat(row["check_out"]), **fields)
+
+
+def month_mismatches(bookings, dates, assign, prop=PROPERTY):
+    """Days on which allocate_month() differs from the per-day `assign`."""
+    mismatches = []
+    for day, assigned, over in allocate_month(bookings, dates, get_inventory(prop)):
+        expected = tuple(assign(bookings.active_on(day), prop))
+        if (assigned, over) != expected:
+            mismatches.append((day, (assigned, over), expected))
+    return mismatches
+
+
+@pytest.mark.parametrize("make", [dict, as_record], ids=["dicts", "records"])
+def test_month_matches_per_day_assignment(inventory, make):
+    bookings = BookingIndex([make(row) for row in BOOKINGS])
+    assert month_mismatches(bookings, MARCH, inventory.assign_inventory_numbers) == []
+
+
+def test_partial_month_matches_per_day_assignment(inventory):
+    bookings = BookingIndex(BOOKINGS)
+    # Starting mid-stay, with gaps between the days
+    dates = [date(2026, 3, 4), date(2026, 3, 5), date(2026, 3, 8), date(2026, 3, 21), date(2026, 4, 2)]
+    assert month_mismatches(bookings, dates, inventory.assign_inventory_numbers) == []
+
+
+def test_unknown_property_matches_per_day_assignment(inventory):
+    bookings = BookingIndex(BOOKINGS)
+    assert month_mismatches(bookings, MARCH, inventory.assign_inventory_numbers, prop="Nowhere Inn") == []
+
+
+def test_fixtures_exercise_each_outcome():
+    """Guards the fixtures: every case above still ends up where its comment says."""
+    bookings = BookingIndex(BOOKINGS)
+    days = {day: (assigned, over) for day, assigned, over in allocate_month(bookings, MARCH, get_inventory(PROPERTY))}
+
+    def rooms(day):
+        return {(row["booking_id"], row["assigned_room"]) for row in days[day][0]}
+
+    def over(day):
+        return {b["booking_id"] for b in days[day][1]}
+
+    assert ("A", "601") in rooms(date(2026, 3, 4)) and "B" in over(date(2026, 3, 4))
+    assert ("B", "601") in rooms(date(2026, 3, 5))
+    assert ("C", "601") in rooms(date(2026, 3, 8))
+    assert {("D", "602"), ("D", "603")} <= rooms(date(2026, 3, 3))
+    assert [row["total_pax"] for row in days[date(2026, 3, 3)][0] if row["booking_id"] == "D"] == [3, 2]
+    assert "E" in over(date(2026, 3, 5)) and ("E", "603") in rooms(date(2026, 3, 6))
+    assert {"F", "G"} <= over(date(2026, 3, 6)) and "H" in over(date(2026, 3, 10))
+    assert ("I", "Day Use 1") in rooms(date(2026, 3, 15))
+    assert ("J", "701") in rooms(date(2026, 3, 1)) and ("J", "701") in rooms(date(2026, 3, 31))
+    assert "K" in over(date(2026, 3, 10))
+    assert [r for r in days[date(2026, 3, 20)][0] if r["assigned_room"] == "801"] and "M" in over(date(2026, 3, 20))
+    assert ("N", "703") in rooms(date(2026, 3, 25)) and "O" in over(date(2026, 3, 25))
+    assert ("O", "703") in rooms(date(2026, 3, 27))
+    assert "P" not in over(date(2026, 3, 1)) and all(b != "P" for b, _ in rooms(date(2026, 3, 1)))
@@ -1,6 +1,21 @@
-from datetime import datetime
+from collections import Counter
+import logging
+import time
 import streamlit as st
 import requests
+import property_registry
+
+# PostgREST returns at most this many rows per request
+PAGE_SIZE = 1000
+
+# How often each labelled query came back holding exactly PAGE_SIZE rows
+ROW_CAP_HITS = Counter()
+
+# Rows written per upsert request by upsert_rows
+UPSERT_BATCH_SIZE = 500
+
+# Values per `.in_()` filter in existing_keys (keeps request URLs short)
+IN_FILTER_CHUNK = 200
 
 def safe_int(value, default=0):
     """Convert value to integer with a default if invalid."""
@@ -23,55 +38,148 @@ def calculate_days(check_in, check_out):
         return delta.days
     return 0
 
+def check_row_cap(rows, label):
+    """Flag a single-request result holding exactly PAGE_SIZE rows, which means it was probably truncated."""
+    if len(rows) == PAGE_SIZE:
+        ROW_CAP_HITS[label] += 1
+        logging.warning(f"{label}: returned exactly {PAGE_SIZE} rows, result is probably truncated")
+        return True
+    return False
+
+def execute_guarded(query, label):
+    """Execute an unpaginated query and flag it if it hit the row cap."""
+    rows = query.execute().data or []
+    check_row_cap(rows, label)
+    return rows
+
+def iter_rows(query_factory, page_size=PAGE_SIZE, label="query"):
+    """
+    Yield every row of a query, one page at a time.
+
+    `query_factory` must return a fresh, filtered and ordered query builder on
+    each call (builders are mutable, so one cannot be re-ranged). Rows are
+    streamed, so callers can stop early or process tables of any size with
+    flat memory.
+    """
+    offset = 0
+    while True:
+        page = query_factory().range(offset, offset + page_size - 1).execute().data or []
+        yield from page
+        if len(page) < page_size:
+            # A page cut short at the server cap means page_size exceeds it
+            if page_size != PAGE_SIZE:
+                check_row_cap(page, label)
+            return
+        offset += page_size
+
+def existing_keys(supabase, table_name, keys, column="booking_id", chunk_size=IN_FILTER_CHUNK):
+    """Which of `keys` already exist in `table_name`, looked up by `.in_()` in chunks (not a table scan)."""
+    keys = list(dict.fromkeys(str(k) for k in keys if k))
+    found = set()
+    for offset in range(0, len(keys), chunk_size):
+        chunk = keys[offset:offset + chunk_size]
+        rows = supabase.table(table_name).select(column).in_(column, chunk).execute().data or []
+        found.update(str(row[column]) for row in rows)
+    return found
+
+def is_row_error(error):
+    """Whether a PostgREST error is about the rows' data (SQLSTATE class 22 or 23) rather than the request."""
+    code = getattr(error, "code", None)
+    return isinstance(code, str) and code[:2] in ("22", "23")
+
+def upsert_rows(supabase, table_name, rows, on_conflict="booking_id",
+                batch_size=UPSERT_BATCH_SIZE, ignore_duplicates=False, label=None):
+    """
+    Write `rows` to `table_name` with one upsert request per batch.
+
+    A batch rejected for its data (Postgres error classes 22 and 23, e.g. a
+    bad value or a violated constraint) is split in half and retried until
+    the failing rows are isolated, so one bad booking does not sink its whole
+    batch. Any other error (network, auth, 5xx, schema) would fail every half
+    too, so it stops the write: that batch and all later rows are marked
+    failed without further requests.
+    With `ignore_duplicates`, rows whose `on_conflict` key already exists are
+    left untouched instead of being overwritten.
+
+    Returns a dict: written (rows the server stored), failed (list of
+    (row, error) pairs), error (the error that stopped the write, or None),
+    requests, seconds and rows_per_second.
+    """
+    label = label or f"upsert_rows({table_name})"
+    stats = {"written": 0, "failed": [], "error": None, "requests": 0}
+    started = time.perf_counter()
+
+    def write(batch):
+        stats["requests"] += 1
+        try:
+            response = supabase.table(table_name).upsert(
+                batch, on_conflict=on_conflict, ignore_duplicates=ignore_duplicates
+            ).execute()
+            stats["written"] += len(response.data or [])
+        except Exception as e:
+            if not is_row_error(e):
+                logging.error(f"{label}: batch of {len(batch)} rows failed, stopping: {e}")
+                stats["error"] = str(e)
+                stats["failed"].extend((row, str(e)) for row in batch)
+                return
+            if len(batch) == 1:
+                logging.error(f"{label}: row {batch[0].get(on_conflict)} failed: {e}")
+                stats["failed"].append((batch[0], str(e)))
+                return
+            middle = len(batch) // 2
+            write(batch[:middle])
+            if stats["error"] is None:
+                write(batch[middle:])
+            else:
+                stats["failed"].extend((row, stats["error"]) for row in batch[middle:])
+
+    rows = list(rows)
+    for offset in range(0, len(rows), batch_size):
+        if stats["error"] is not None:
+            stats["failed"].extend((row, stats["error"]) for row in rows[offset:])
+            break
+        write(rows[offset:offset + batch_size])
+
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    stats["rows_per_second"] = round(stats["written"] / stats["seconds"], 1) if stats["seconds"] else 0.0
+    logging.info(
+        f"{label}: wrote {stats['written']}/{len(rows)} rows in {stats['requests']} requests "
+        f"({stats['seconds']}s, {stats['rows_per_second']} rows/s)"
+    )
+    return stats
+
 def generate_booking_id(supabase, table_name="reservations"):
     """Generate a unique booking ID for the specified table."""
+    # Imported here: booking_sequence depends on this module
+    import booking_sequence
     try:
-        today = datetime.now().strftime('%Y%m%d')
-        prefix = "SFX" if table_name == "online_reservations" else "TIE"
-        response = supabase.table(table_name).select("booking_id").like("booking_id", f"{prefix}{today}%").execute()
-        existing_ids = [record["booking_id"] for record in response.data]
-        sequence = 1
-        while f"{prefix}{today}{sequence:03d}" in existing_ids:
-            sequence += 1
-        return f"{prefix}{today}{sequence:03d}"
+        prefix = booking_sequence.ONLINE_PREFIX if table_name == "online_reservations" else booking_sequence.DIRECT_PREFIX
+        return booking_sequence.next_booking_id(prefix, supabase=supabase)
     except Exception as e:
         st.error(f"Error generating booking ID: {e}")
         return None
 
+def escape_like(value):
+    """Escape LIKE/ILIKE wildcards so `value` only matches itself."""
+    return str(value).replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
 def check_duplicate_guest(supabase, table_name, guest_name, guest_phone, room_no, exclude_booking_id=None):
-    """Check for duplicate guest in the specified table."""
+    """Check for duplicate guest in the specified table (see booking_repository.find_guest_bookings)."""
+    # Imported here: booking_repository depends on this module
+    import booking_repository
     try:
-        response = supabase.table(table_name).select("*").execute()
-        for reservation in response.data:
-            if exclude_booking_id and reservation["booking_id"] == exclude_booking_id:
-                continue
-            if (reservation["guest_name"].lower() == guest_name.lower() and
-                reservation.get("guest_phone") == guest_phone and
-                reservation["room_no"] == room_no):
-                return True, reservation["booking_id"]
+        matches = booking_repository.find_guest_bookings(
+            table_name, guest_name, guest_phone, room_no, exclude_booking_id=exclude_booking_id,
+        )
+        if matches:
+            return True, matches[0]["booking_id"]
         return False, None
     except Exception as e:
         st.error(f"Error checking duplicate guest: {e}")
         return False, None
 
 def get_property_name(hotel_id):
-    """Map Stayflexi hotelId to property_name."""
-    property_mapping = {
-        "27704": "La Antilia Luxury",
-        "27706": "La Paradise Luxury",
-        "27707": "La Paradise Residency",
-        "27709": "La Tamara Luxury",
-        "27710": "La Tamara Suite",
-        "27711": "La Villa Heritage",
-        "27719": "Le Poshe Beach View",
-        "27720": "Le Poshe Luxury",
-        "27721": "Le Poshe Suite",
-        "27722": "Le Royce Villa",
-        "27723": "Le Pondy Beachside",
-        "27724": "Villa Shakti",
-        "30357": "Eden Beach Resort",
-        "31550": "La Millionaire Luxury Resort",
-        "32470": "Le Park Resort"
-    }
-    return property_mapping.get(hotel_id, "Unknown Property")
+    """Map Stayflexi hotelId to its canonical property_name."""
+    prop = property_registry.property_for_hotel(hotel_id)
+    return prop.name if prop else "Unknown Property"
 